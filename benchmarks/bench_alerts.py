@@ -0,0 +1,95 @@
+"""
+Бенчмарк индекса алертов: проверка снимка при сотнях тысяч алертов.
+
+    python -m benchmarks.bench_alerts --alerts 500000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from valutatrade_hub.core.alerts import AlertIndex
+
+PAIRS = ("BTC_USD", "ETH_USD", "SOL_USD", "EUR_USD", "GBP_USD", "RUB_USD")
+
+
+def make_alerts(n: int, seed: int = 7):
+    """Синтетические алерты с порогами ±30% от 100."""
+    rnd = random.Random(seed)
+    alerts = []
+    for i in range(n):
+        condition = "above" if rnd.getrandbits(1) else "below"
+        offset = rnd.uniform(0.0001, 0.3) * 100.0
+        alerts.append({
+            "alert_id": f"a{i}",
+            "user_id": i % 1000,
+            "pair": PAIRS[i % len(PAIRS)],
+            "condition": condition,
+            "threshold": 100.0 + offset if condition == "above" else 100.0 - offset,
+        })
+    return alerts
+
+
+def bench(n: int, moves: list[float]) -> dict:
+    """
+    build — разбор alerts.json и построение индекса; cold_ms — это же
+    плюс проверка снимка (индекс строится заново на каждом обновлении);
+    ms — проверка по индексу, который живет между обновлениями
+    (AppLogic.check_alerts).
+    """
+    text = json.dumps(make_alerts(n))
+
+    t0 = time.perf_counter()
+    index = AlertIndex(json.loads(text))
+    build = time.perf_counter() - t0
+
+    results = {"alerts": n, "build_s": build, "refreshes": []}
+    for move in moves:
+        snapshot = {pair: {"rate": 100.0 * (1 + move)} for pair in PAIRS}
+
+        t0 = time.perf_counter()
+        cold = AlertIndex(json.loads(text))
+        for pair, meta in snapshot.items():
+            cold.evaluate(pair, meta["rate"])
+        cold_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        fired = sum(len(index.evaluate(pair, meta["rate"])) for pair, meta in snapshot.items())
+        results["refreshes"].append({
+            "move": move, "fired": fired, "ms": (time.perf_counter() - t0) * 1000,
+            "cold_ms": cold_s * 1000,
+        })
+    return results
+
+
+def run(sizes: list[int]) -> dict[str, dict]:
+    """
+    Случай для общего набора: обновление со сдвигом 1% при n алертах.
+    update — с сохраненным индексом, cold_update — с перестроением.
+    """
+    results = {}
+    for n in sizes:
+        res = bench(n, [0.01])
+        refresh = res["refreshes"][0]
+        results[f"alerts.build[n={n}]"] = {"runs": 1, "median_s": res["build_s"]}
+        results[f"alerts.update[n={n}]"] = {"runs": 1, "median_s": refresh["ms"] / 1000}
+        results[f"alerts.cold_update[n={n}]"] = {"runs": 1, "median_s": refresh["cold_ms"] / 1000}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк алертов")
+    parser.add_argument("--alerts", type=int, default=500_000)
+    args = parser.parse_args()
+
+    res = bench(args.alerts, [0.0, 0.001, 0.01, -0.01, 0.0])
+    print(f"Алертов: {res['alerts']}, разбор и построение индекса: {res['build_s']:.2f} с")
+    for r in res["refreshes"]:
+        print(f"  сдвиг {r['move']:+.4f}: сработало {r['fired']:>6}, {r['ms']:8.3f} мс, "
+              f"с перестроением {r['cold_ms']:8.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
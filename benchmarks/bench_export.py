@@ -0,0 +1,25 @@
+"""Бенчмарки выгрузки: export портфелей и истории в CSV / VTCF (с gzip и без)."""
+from __future__ import annotations
+
+import os
+
+from .common import dataset, measure
+
+
+def run(sizes: list[int]) -> dict[str, dict]:
+    from valutatrade_hub.core.usecases import AppLogic
+    from valutatrade_hub.export import export_rows
+
+    results = {}
+    for n in sizes:
+        with dataset(users=n, history=n) as tmp:
+            app = AppLogic()
+            out = os.path.join(tmp, "out")
+            for data in ("portfolios", "history"):
+                for fmt, compress in (("csv", False), ("columnar", False), ("csv", True)):
+                    name = f"export.{data}.{fmt}{'.gz' if compress else ''}[n={n}]"
+                    path = os.path.join(out, name)
+                    results[name] = measure(
+                        lambda: export_rows(app.export_rows(data), data, path, fmt, compress),
+                        max_runs=10)
+    return results
@@ -0,0 +1,120 @@
+"""
+Бенчмарк книги ордеров: матчинг при 1M отложенных ордеров.
+
+    python -m benchmarks.bench_orderbook --orders 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time
+
+from valutatrade_hub.core.orders import OrderBook, order_direction
+
+
+def make_orders(n: int, pair: str = "BTC_USD", mid: float = 50000.0, seed: int = 42):
+    """Синтетические ордера с ценами около mid (±20%)."""
+    rnd = random.Random(seed)
+    sides = ("buy", "sell")
+    types = ("limit", "stop")
+    orders = []
+    for i in range(n):
+        side = sides[rnd.getrandbits(1)]
+        order_type = types[rnd.getrandbits(1)]
+        direction = order_direction(side, order_type)
+        # ордер ставится по "правильную" сторону от текущего курса
+        offset = rnd.uniform(0.0001, 0.2) * mid
+        price = mid + offset if direction == "up" else mid - offset
+        orders.append({
+            "order_id": f"o{i}",
+            "user_id": i % 1000,
+            "side": side,
+            "type": order_type,
+            "pair": pair,
+            "amount": 1.0,
+            "price": price,
+        })
+    return orders
+
+
+def linear_scan(orders, rate: float):
+    """Наивный матчинг: проверка каждого открытого ордера."""
+    fired = []
+    for o in orders:
+        if order_direction(o["side"], o["type"]) == "up":
+            if o["price"] <= rate:
+                fired.append(o)
+        elif o["price"] >= rate:
+            fired.append(o)
+    return fired
+
+
+def bench(n: int, moves: list[float]) -> dict:
+    """
+    build — разбор orders.json и построение книги, как при первом
+    обновлении процесса; cold_ms — это же плюс матчинг (книга строится
+    заново на каждом обновлении); heap_ms — матчинг по книге, которая
+    живет между обновлениями (AppLogic.match_orders).
+    """
+    text = json.dumps(make_orders(n))
+
+    t0 = time.perf_counter()
+    book = OrderBook(json.loads(text))
+    build = time.perf_counter() - t0
+
+    results = {"orders": n, "build_s": build, "moves": []}
+    for move in moves:
+        rate = 50000.0 * (1 + move)
+
+        t0 = time.perf_counter()
+        cold = OrderBook(json.loads(text))
+        cold.triggered("BTC_USD", rate)
+        cold_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        fired = book.triggered("BTC_USD", rate)
+        heap_s = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        linear_scan(book.to_list(), rate)
+        scan_s = time.perf_counter() - t0
+
+        results["moves"].append({
+            "move": move, "filled": len(fired), "cold_ms": cold_s * 1000,
+            "heap_ms": heap_s * 1000, "scan_ms": scan_s * 1000,
+        })
+    return results
+
+
+def run(sizes: list[int]) -> dict[str, dict]:
+    """
+    Случай для общего набора: сдвиг курса на 0.1% при n ордерах.
+    update — стоимость обновления при сохраненной книге, cold_update —
+    при книге, перестраиваемой из файла на каждом обновлении.
+    """
+    results = {}
+    for n in sizes:
+        res = bench(n, [0.001])
+        move = res["moves"][0]
+        results[f"orderbook.build[n={n}]"] = {"runs": 1, "median_s": res["build_s"]}
+        results[f"orderbook.update[n={n}]"] = {"runs": 1, "median_s": move["heap_ms"] / 1000}
+        results[f"orderbook.cold_update[n={n}]"] = {"runs": 1, "median_s": move["cold_ms"] / 1000}
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк книги ордеров")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    res = bench(args.orders, [0.0001, 0.001, 0.01, -0.01])
+    print(f"Ордеров: {res['orders']}, разбор и построение книги: {res['build_s']:.2f} с")
+    for m in res["moves"]:
+        print(f"  сдвиг {m['move']:+.4f}: исполнено {m['filled']:>6}, "
+              f"кучи {m['heap_ms']:8.2f} мс, с перестроением {m['cold_ms']:8.2f} мс, "
+              f"полный проход {m['scan_ms']:8.2f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Бенчмарки курсов: история на длинной истории, полный цикл обновления офлайн, вывод show-rates."""
+from __future__ import annotations
+
+from .common import dataset, make_rates, measure
+
+
+def run(sizes: list[int]) -> dict[str, dict]:
+    from valutatrade_hub.core.events import EventBus
+    from valutatrade_hub.parser_service.offline import RandomWalk, RandomWalkClient
+    from valutatrade_hub.parser_service.storage import RatesStorage
+    from valutatrade_hub.parser_service.updater import RatesUpdater
+
+    results = {}
+    for n in sizes:
+        with dataset(history=n):
+            storage = RatesStorage("data/rates.json", "data/exchange_rates.json")
+            pairs = make_rates()["pairs"]
+            results[f"rates.append_history[n={n}]"] = measure(lambda: storage.append_history(pairs))
+            results[f"rates.write_snapshot[n={n}]"] = measure(
+                lambda: storage.write_rates_snapshot(pairs)
+            )
+            # Источник -> слияние -> снимок -> история -> событие, без сети
+            updater = RatesUpdater([RandomWalkClient(RandomWalk(seed=1))], storage, EventBus())
+            results[f"rates.update_offline[n={n}]"] = measure(updater.run_update)
+
+    # Вывод show-rates: PrettyTable против потокового plain (cli/render.py)
+    import io
+    from valutatrade_hub.cli.interface import _table
+    from valutatrade_hub.cli.render import render
+
+    rows = [{"pair": f"C{i:05d}_USD", "rate": 1.0 + i / 7, "updated_at": "2025-01-01T00:00:00Z",
+             "source": "bench"} for i in range(10000)]
+    columns = [("pair", "Пара", 12), ("rate", "Курс", 20), ("updated_at", "Обновлено", 27), ("source", "Источник", 0)]
+
+    def pretty():
+        table = _table(["Пара", "Курс", "Обновлено", "Источник"])
+        for row in rows:
+            table.add_row([row["pair"], row["rate"], row["updated_at"], row["source"]])
+        return table.get_string()
+
+    results["render.show_rates_table[rows=10000]"] = measure(pretty, max_runs=10)
+    results["render.show_rates_plain[rows=10000]"] = measure(lambda: render(rows, columns, "plain", io.StringIO()),
+                                                             max_runs=10)
+    return results
@@ -0,0 +1,70 @@
+"""
+Холодный старт CLI: отдельный процесс на каждый запуск.
+
+Регрессионная проверка времени старта: бюджет задается на накладные
+расходы сверх пустого интерпретатора (`python -c pass`), чтобы
+результат не зависел от скорости машины.
+
+    python -m benchmarks.bench_startup --budget-ms 60
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from .common import ROOT, dataset, measure
+
+COMMANDS = {
+    "python": [sys.executable, "-c", "pass"],
+    "import": [sys.executable, "-c", "import valutatrade_hub.cli.interface"],
+    "whoami": [sys.executable, "-m", "valutatrade_hub", "whoami"],
+    "help": [sys.executable, "-m", "valutatrade_hub", "--help"],
+}
+
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def startup_time(cmd: list[str]) -> float:
+    env = _env()
+    t0 = time.perf_counter()
+    subprocess.run(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def run(sizes: list[int]) -> dict[str, dict]:
+    results = {}
+    with dataset(users=1):
+        for name, cmd in COMMANDS.items():
+            results[f"startup.{name}"] = measure(lambda: startup_time(cmd), min_runs=5, budget_s=3.0)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Время холодного старта CLI")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Завершиться с ошибкой, если медиана выше бюджета")
+    args = parser.parse_args()
+
+    results = run([])
+    baseline = results.pop("startup.python")["median_s"] * 1000
+    print(f"  {'python -c pass':<20} медиана {baseline:8.1f} мс")
+
+    failed = False
+    for name, stats in results.items():
+        ms = stats["median_s"] * 1000
+        overhead = ms - baseline
+        over = args.budget_ms is not None and overhead > args.budget_ms
+        failed |= over
+        print(f"  {name:<20} медиана {ms:8.1f} мс (+{overhead:.1f} мс){'  > бюджета' if over else ''}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
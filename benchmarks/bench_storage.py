@@ -0,0 +1,23 @@
+"""Бенчмарки хранилища: Database.find_user / save_portfolio (один файл и шарды)."""
+from __future__ import annotations
+
+from .common import dataset, measure
+
+
+def run(sizes: list[int]) -> dict[str, dict]:
+    from valutatrade_hub.infra.database import Database
+
+    results = {}
+    for n in sizes:
+        with dataset(users=n):
+            db = Database()
+            # худший случай — последний пользователь в файле
+            results[f"storage.find_user[n={n}]"] = measure(lambda: db.find_user(f"user{n}"))
+
+            portfolio = db.get_portfolio(n)
+            results[f"storage.save_portfolio[n={n}]"] = measure(lambda: db.save_portfolio(portfolio))
+
+            db.reshard(16)
+            results[f"storage.save_portfolio_sharded[n={n},shards=16]"] = measure(
+                lambda: db.save_portfolio(portfolio))
+    return results
@@ -0,0 +1,47 @@
+"""Бенчмарки торговли: AppLogic.buy/sell, get_rate, Portfolio.get_total_value."""
+from __future__ import annotations
+
+from .common import dataset, measure
+
+
+def run(sizes: list[int]) -> dict[str, dict]:
+    from valutatrade_hub.core.models import User, Portfolio
+    from valutatrade_hub.core.session import session
+    from valutatrade_hub.core.usecases import AppLogic
+    from valutatrade_hub.infra.rates_mmap import RatesMmapWriter
+
+    results = {}
+    for n in sizes:
+        with dataset(users=n):
+            app = AppLogic()
+            session.login(User.from_dict(app.db.find_user(f"user{n}")))
+
+            results[f"trading.buy[n={n}]"] = measure(lambda: app.buy("BTC", 0.001))
+            results[f"trading.sell[n={n}]"] = measure(lambda: app.sell("BTC", 0.001))
+            # Повторное чтение портфеля: попадание в LRU-кеш (только stat файла)
+            results[f"trading.get_portfolio_cached[n={n}]"] = measure(
+                lambda: app.get_portfolio(n), max_runs=2000)
+            session.logout()
+
+    with dataset(users=1):
+        app = AppLogic()
+        results["rates.get_rate"] = measure(lambda: app.get_rate("BTC", "USD"), max_runs=2000)
+        results["rates.get_rate_inverse"] = measure(lambda: app.get_rate("USD", "ETH"), max_runs=2000)
+        # Тот же снимок через бинарную копию (mmap, без json.load)
+        RatesMmapWriter(app.config.rates_binary_file).publish(app.db.get_rates()["pairs"])
+        results["rates.get_rate_mmap"] = measure(lambda: app.get_rate("BTC", "USD"), max_runs=2000)
+        # Закрепленный срез: словарь в памяти, без обращения к файлам
+        with app.pin_rates():
+            results["rates.get_rate_pinned"] = measure(lambda: app.get_rate("BTC", "USD"), max_runs=2000)
+
+    portfolio = Portfolio.from_dict({
+        "user_id": 1,
+        "wallets": {
+            code: {"currency_code": code, "balance": 1.0}
+            for code in ("USD", "EUR", "BTC", "ETH", "RUB")
+        },
+    })
+    results["portfolio.get_total_value"] = measure(
+        lambda: portfolio.get_total_value("EUR"), max_runs=5000
+    )
+    return results
@@ -0,0 +1,132 @@
+"""Общие утилиты бенчмарков: синтетические данные и замеры."""
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CRYPTO = {"BTC": 50000.0, "ETH": 3000.0, "SOL": 130.0}
+FIAT = {"EUR": 1.08, "GBP": 1.27, "RUB": 0.011}
+
+
+def measure(func: Callable[[], object], min_runs: int = 3, max_runs: int = 50,
+            budget_s: float = 1.0, setup: Callable[[], object] | None = None) -> dict:
+    """
+    Запускает func несколько раз (не меньше min_runs, пока не исчерпан
+    бюджет времени) и возвращает статистику в секундах.
+    """
+    times = []
+    started = time.perf_counter()
+    while len(times) < max_runs:
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+        if len(times) >= min_runs and time.perf_counter() - started > budget_s:
+            break
+    return {
+        "runs": len(times),
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "mean_s": statistics.fmean(times),
+    }
+
+
+def save_json(path: str, data) -> None:
+    """Запись без метрик приложения — генерация данных не замеряется."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def make_users(n: int) -> list[dict]:
+    """n пользователей с одинаковым паролем '1234' (хеш считается один раз)."""
+    from valutatrade_hub.core.utils import hash_password
+
+    hashed, salt = hash_password("1234", "bench")
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "user_id": i,
+            "username": f"user{i}",
+            "hashed_password": hashed,
+            "salt": salt,
+            "registration_date": now,
+        }
+        for i in range(1, n + 1)
+    ]
+
+
+def make_portfolios(n: int, seed: int = 1) -> list[dict]:
+    """Портфели с USD и 1–3 случайными кошельками."""
+    rnd = random.Random(seed)
+    codes = list(CRYPTO) + list(FIAT)
+    portfolios = []
+    for i in range(1, n + 1):
+        wallets = {"USD": {"currency_code": "USD", "balance": 1_000_000.0}}
+        for code in rnd.sample(codes, rnd.randint(1, 3)):
+            wallets[code] = {"currency_code": code, "balance": round(rnd.uniform(0.1, 10), 4)}
+        portfolios.append({"user_id": i, "wallets": wallets})
+    return portfolios
+
+
+def make_rates(updated_at: datetime | None = None) -> dict:
+    """Снимок курсов в формате rates.json."""
+    ts = (updated_at or datetime.now(timezone.utc)).isoformat().replace("+00:00", "Z")
+    pairs = {
+        f"{code}_USD": {"rate": rate, "updated_at": ts, "source": "bench"}
+        for code, rate in {**CRYPTO, **FIAT}.items()
+    }
+    return {"pairs": pairs, "last_refresh": ts}
+
+
+def make_history(n: int, seed: int = 2) -> list[dict]:
+    """История курсов: n записей случайного блуждания."""
+    rnd = random.Random(seed)
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    codes = list({**CRYPTO, **FIAT}.items())
+    history = []
+    for i in range(n):
+        code, base = codes[i % len(codes)]
+        ts = (start + timedelta(minutes=i)).isoformat().replace("+00:00", "Z")
+        history.append({
+            "id": f"{code}_USD_{ts}",
+            "from_currency": code,
+            "to_currency": "USD",
+            "rate": base * (1 + rnd.uniform(-0.05, 0.05)),
+            "timestamp": ts,
+            "source": "bench",
+            "meta": {},
+        })
+    return history
+
+
+@contextlib.contextmanager
+def dataset(users: int = 0, history: int = 0):
+    """
+    Временная рабочая папка с data/ на users пользователей и портфелей.
+    Приложение работает с относительными путями, поэтому на время
+    замера меняется текущая директория.
+    """
+    prev = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="vt_bench_") as tmp:
+        data = os.path.join(tmp, "data")
+        os.makedirs(data)
+        save_json(os.path.join(data, "users.json"), make_users(users))
+        save_json(os.path.join(data, "portfolios.json"), make_portfolios(users))
+        save_json(os.path.join(data, "rates.json"), make_rates())
+        if history:
+            save_json(os.path.join(data, "exchange_rates.json"), make_history(history))
+        os.chdir(tmp)
+        try:
+            yield tmp
+        finally:
+            os.chdir(prev)
@@ -0,0 +1,121 @@
+"""
+Набор бенчмарков ValutaTrade Hub.
+
+    python -m benchmarks.run                          # замер, результат в benchmarks/results/
+    python -m benchmarks.run --sizes 1000,100000,1000000 --only storage,trading
+    python -m benchmarks.run --compare old.json new.json --threshold 0.1
+"""
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from .common import ROOT
+
+SUITES = ("storage", "trading", "rates", "orderbook", "alerts", "export", "startup")
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def run_suites(names: list[str], sizes: list[int]) -> dict:
+    results: dict[str, dict] = {}
+    # Приложение пишет логи и метрики относительно текущей папки —
+    # уводим их во временную, чтобы не трогать рабочее дерево
+    prev = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="vt_bench_run_") as tmp:
+        os.chdir(tmp)
+        try:
+            for name in names:
+                module = importlib.import_module(f"benchmarks.bench_{name}")
+                print(f"[{name}]", flush=True)
+                for case, stats in module.run(sizes).items():
+                    results[case] = stats
+                    print(f"  {case:<40} {stats['median_s'] * 1000:12.3f} мс", flush=True)
+        finally:
+            from valutatrade_hub.metrics import metrics
+            metrics.reset()
+            os.chdir(prev)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+
+
+def compare(old_path: str, new_path: str, threshold: float) -> bool:
+    """Печатает сравнение медиан. Возвращает True, если есть регрессии."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"{old['meta']['commit']} -> {new['meta']['commit']} (порог {threshold:.0%})")
+    regressed = False
+    for case in sorted(set(old["results"]) & set(new["results"])):
+        a = old["results"][case]["median_s"]
+        b = new["results"][case]["median_s"]
+        change = (b - a) / a if a else 0.0
+        mark = ""
+        if change > threshold:
+            mark = "  РЕГРЕССИЯ"
+            regressed = True
+        elif change < -threshold:
+            mark = "  ускорение"
+        print(f"  {case:<40} {a * 1000:12.3f} -> {b * 1000:12.3f} мс {change:+8.1%}{mark}")
+    return regressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарки ValutaTrade Hub")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="Размеры наборов данных через запятую (до 1000000)")
+    parser.add_argument("--only", default=",".join(SUITES),
+                        help=f"Наборы через запятую: {', '.join(SUITES)}")
+    parser.add_argument("--out", default=None, help="Файл результатов (JSON)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"),
+                        help="Сравнить два файла результатов")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Допустимое замедление медианы (доля), по умолчанию 0.10")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+
+    names = [n.strip() for n in args.only.split(",") if n.strip()]
+    unknown = set(names) - set(SUITES)
+    if unknown:
+        parser.error(f"неизвестные наборы: {', '.join(sorted(unknown))}")
+    sizes = [int(x) for x in args.sizes.split(",")]
+
+    out = os.path.abspath(args.out or os.path.join(RESULTS_DIR, f"{_git_commit()}.json"))
+    report = run_suites(names, sizes)
+
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nРезультаты: {out}")
+
+
+if __name__ == "__main__":
+    main()
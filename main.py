@@ -8,13 +8,7 @@ def main() -> None:
     os.makedirs("logs", exist_ok=True)
     os.makedirs("data", exist_ok=True)
 
-    try:
-        from valutatrade_hub.logging_config import setup_logging
-
-        setup_logging()
-    except Exception:
-        pass
-
+    # Логирование настраивается по требованию (logging_config.ensure_logging)
     from valutatrade_hub.cli.interface import main as cli_main
 
     cli_main()
@@ -0,0 +1,27 @@
+import json
+
+import pytest
+
+from valutatrade_hub.infra.settings import settings
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Пустой каталог данных во временной папке; настройки перечитываются."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "config.json").write_text(json.dumps({"data_dir": str(tmp_path / "data"), "metrics_file": None}))
+    settings._snapshot = None
+    yield tmp_path / "data"
+    settings._snapshot = None
+
+
+@pytest.fixture
+def app(data_dir):
+    """AppLogic с зарегистрированным и вошедшим пользователем."""
+    from valutatrade_hub.core.session import session
+    from valutatrade_hub.core.usecases import AppLogic
+
+    app = AppLogic()
+    app.register("tester", "secret")
+    yield app
+    session.logout()
@@ -0,0 +1,12 @@
+from valutatrade_hub.infra.user_io import read_user_rows
+
+
+def test_non_object_rows_are_rejected_per_line(app, tmp_path):
+    path = tmp_path / "users.jsonl"
+    path.write_text('[1, 2]\n"x"\n{"username": "bob", "password": "secret"}\n', encoding="utf-8")
+
+    result = app.import_users(read_user_rows(str(path)), workers=1)
+
+    assert result["imported"] == 1
+    assert result["errors"][:2] == ["строка 1: ожидался объект с полями пользователя",
+                                    "строка 2: ожидался объект с полями пользователя"]
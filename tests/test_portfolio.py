@@ -0,0 +1,20 @@
+def test_portfolio_shows_wallets_without_rate_as_unvalued(app):
+    app.add_money('USD', 100)
+    app.add_money('SOL', 2)
+
+    data = app.show_my_portfolio()
+
+    values = {w['currency']: w['value'] for w in data['wallets']}
+    assert values == {'USD': 100.0, 'SOL': None}
+    assert data['total'] == 100.0
+    assert data['unvalued'] == ['SOL']
+
+
+def test_export_leaves_value_empty_without_rate(app):
+    app.add_money('USD', 100)
+    app.add_money('SOL', 2)
+
+    rows = {row[1]: row for row in app.export_rows('portfolios')}
+
+    assert rows['USD'][3] == 100.0
+    assert rows['SOL'][3] is None
@@ -0,0 +1,34 @@
+import os
+
+from valutatrade_hub.infra import rates_mmap
+from valutatrade_hub.infra.rates_mmap import RatesMmapReader, RatesMmapWriter
+
+
+def pairs(n):
+    return {f"C{i:04d}_USD": {"rate": float(i + 1), "updated_at": "2026-01-01T00:00:00Z"} for i in range(n)}
+
+
+def test_grown_file_is_complete_when_it_replaces_the_old_one(tmp_path, monkeypatch):
+    path = tmp_path / "rates.bin"
+    writer = RatesMmapWriter(path)
+    writer.publish(pairs(3), version=1)
+
+    seen = []
+    real_replace = os.replace
+
+    def replace(src, dst):
+        reader = RatesMmapReader.open(src)
+        seen.append(reader.versioned_snapshot())
+        reader.close()
+        real_replace(src, dst)
+
+    monkeypatch.setattr(rates_mmap.os, "replace", replace)
+    writer.publish(pairs(300), version=2)
+
+    version, snapshot = seen[-1]
+    assert version == 2
+    assert len(snapshot) == 300
+    reader = RatesMmapReader.open(path)
+    assert reader.get("C0299_USD")[0] == 300.0
+    assert reader.version == 2
+    reader.close()
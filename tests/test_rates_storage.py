@@ -0,0 +1,35 @@
+from valutatrade_hub.parser_service.storage import RatesStorage, load_rates_snapshot
+
+
+def quote(rate, source="random"):
+    return {"rate": rate, "updated_at": "2026-01-01T00:00:00Z", "source": source}
+
+
+def test_writers_reread_state_changed_by_another_process(tmp_path):
+    paths = (str(tmp_path / "rates.json"), str(tmp_path / "history.json"))
+    first = RatesStorage(*paths, full_every=3)
+    second = RatesStorage(*paths, full_every=3)
+
+    first.write_rates_snapshot({"BTC_USD": quote(50000.0)})
+    second.write_rates_snapshot({"BTC_USD": quote(50000.0), "ETH_USD": quote(3000.0)})
+    changed = first.write_rates_snapshot({"BTC_USD": quote(51000.0), "ETH_USD": quote(3000.0)})
+
+    assert list(changed) == ["BTC_USD"]
+    snapshot = load_rates_snapshot(paths[0])
+    assert snapshot["seq"] == 3
+    assert snapshot["pairs"]["BTC_USD"]["rate"] == 51000.0
+    assert snapshot["pairs"]["ETH_USD"]["rate"] == 3000.0
+
+
+def test_prefix_snapshot_matches_filtered_full_snapshot(tmp_path):
+    path = str(tmp_path / "rates.json")
+    storage = RatesStorage(path, str(tmp_path / "history.json"), full_every=3)
+    storage.write_rates_snapshot({"BTC_USD": quote(50000.0), "ETH_USD": quote(3000.0), "BTC_EUR": quote(46000.0)})
+    storage.write_rates_snapshot({"BTC_USD": quote(51000.0), "ETH_USD": quote(3100.0)})
+
+    full = load_rates_snapshot(path)
+    btc = load_rates_snapshot(path, "BTC_")
+
+    assert btc["seq"] == full["seq"] == 2
+    assert btc["last_refresh"] == full["last_refresh"]
+    assert btc["pairs"] == {"BTC_USD": full["pairs"]["BTC_USD"]}
@@ -0,0 +1,59 @@
+from valutatrade_hub.parser_service.registry import SourceRegistry
+from valutatrade_hub.parser_service.storage import RatesStorage, load_rates_snapshot
+
+
+def quote(rate, source="random", updated_at="2026-01-01T00:00:01Z"):
+    return {"rate": rate, "updated_at": updated_at, "source": source}
+
+
+def test_all_rejected_keeps_previous_rate_as_stale():
+    registry = SourceRegistry(quorum=2, max_deviation=0.2)
+    previous = {"BTC_USD": quote(90000.0, updated_at="2026-01-01T00:00:00Z")}
+
+    merged = registry.merge({"random": {"BTC_USD": quote(50000.0)}}, previous)
+
+    assert merged["BTC_USD"]["rate"] == 90000.0
+    assert merged["BTC_USD"]["updated_at"] == "2026-01-01T00:00:00Z"
+    assert merged["BTC_USD"]["stale"] is True
+
+
+def test_single_source_pair_recovers_after_consistent_updates(tmp_path):
+    registry = SourceRegistry(quorum=2, max_deviation=0.2, confirm_after=3)
+    storage = RatesStorage(str(tmp_path / "rates.json"), str(tmp_path / "history.json"))
+    storage.write_rates_snapshot({"BTC_USD": quote(50000.0, updated_at="2026-01-01T00:00:00Z")})
+
+    for _ in range(2):
+        merged = registry.merge({"random": {"BTC_USD": quote(62000.0)}}, storage.read_pairs())
+        storage.write_rates_snapshot(merged)
+        pairs = load_rates_snapshot(tmp_path / "rates.json")["pairs"]
+        assert pairs["BTC_USD"]["rate"] == 50000.0
+        assert pairs["BTC_USD"]["stale"] is True
+
+    merged = registry.merge({"random": {"BTC_USD": quote(62000.0)}}, storage.read_pairs())
+    storage.write_rates_snapshot(merged)
+
+    pairs = load_rates_snapshot(tmp_path / "rates.json")["pairs"]
+    assert pairs["BTC_USD"]["rate"] == 62000.0
+    assert "stale" not in pairs["BTC_USD"]
+    assert "pending" not in pairs["BTC_USD"]
+
+
+def test_inconsistent_outliers_restart_confirmation():
+    registry = SourceRegistry(quorum=2, max_deviation=0.2, confirm_after=2)
+    previous = {"BTC_USD": quote(50000.0, updated_at="2026-01-01T00:00:00Z")}
+
+    previous = registry.merge({"random": {"BTC_USD": quote(62000.0)}}, previous)
+    previous = registry.merge({"random": {"BTC_USD": quote(90000.0)}}, previous)
+
+    assert previous["BTC_USD"]["rate"] == 50000.0
+    assert previous["BTC_USD"]["pending"] == [90000.0, 1]
+
+
+def test_fresh_quote_clears_stale_mark():
+    registry = SourceRegistry(quorum=2, max_deviation=0.2)
+    previous = {"BTC_USD": dict(quote(90000.0), stale=True)}
+
+    merged = registry.merge({"random": {"BTC_USD": quote(90500.0)}}, previous)
+
+    assert merged["BTC_USD"]["rate"] == 90500.0
+    assert "stale" not in merged["BTC_USD"]
@@ -0,0 +1,65 @@
+import multiprocessing
+
+import pytest
+
+from valutatrade_hub.core.usecases import AppLogic
+
+
+def _buy(user_id):
+    AppLogic()._execute_buy(user_id, 'ETH', 0.001, 3000.0)
+
+
+def test_concurrent_buys_all_reach_the_wallet(data_dir):
+    app = AppLogic()
+    app.db.add_portfolios([
+        {'user_id': 1, 'wallets': {'USD': {'currency_code': 'USD', 'balance': 1000.0}}},
+    ])
+
+    with multiprocessing.get_context('fork').Pool(8) as pool:
+        pool.map(_buy, [1] * 20)
+
+    trades = app.ledger.last(1, limit=100)
+    wallets = app.db.get_portfolio(1)['wallets']
+    assert len(trades) == 20
+    assert wallets['ETH']['balance'] == pytest.approx(sum(t['amount'] for t in trades))
+    assert wallets['USD']['balance'] == pytest.approx(1000.0 - sum(t['cost'] for t in trades))
+
+
+def test_trade_rereads_portfolio_written_by_another_process(data_dir):
+    first, second = AppLogic(), AppLogic()
+    first.db.add_portfolios([
+        {'user_id': 1, 'wallets': {'USD': {'currency_code': 'USD', 'balance': 1000.0}}},
+    ])
+    first.get_portfolio(1)
+
+    second._execute_buy(1, 'ETH', 0.001, 3000.0)
+    first._execute_buy(1, 'ETH', 0.001, 3000.0)
+
+    wallets = first.db.get_portfolio(1)['wallets']
+    assert wallets['ETH']['balance'] == pytest.approx(0.002)
+    assert wallets['USD']['balance'] == pytest.approx(994.0)
+
+
+def test_failed_save_does_not_leave_the_trade_in_cache(data_dir, monkeypatch):
+    app = AppLogic()
+    app.db.add_portfolios([
+        {'user_id': 1, 'wallets': {'USD': {'currency_code': 'USD', 'balance': 1000.0}}},
+    ])
+    app.get_portfolio(1)
+
+    def fail(*args):
+        raise TimeoutError("forced")
+    monkeypatch.setattr(app.db, '_save_portfolio_file', fail)
+    with pytest.raises(TimeoutError):
+        app._execute_buy(1, 'ETH', 0.001, 3000.0)
+
+    assert app.get_portfolio(1).get_wallet('USD').balance == 1000.0
+
+
+def test_deposit_without_rate_is_credited(app):
+    result = app.add_money('GBP', 100)
+
+    wallet = app.get_portfolio().get_wallet('GBP')
+    assert result['now'] == 100
+    assert wallet.balance == 100
+    assert wallet.basis.quantity == 0
@@ -1,25 +1,71 @@
 import argparse
 import sys
-from prettytable import PrettyTable
+from datetime import datetime, timezone
 
-from ..core.usecases import AppLogic
-from ..core.exceptions import *
+from ..core.exceptions import MyError
+from .render import FORMATS, render
 
-from ..parser_service.config import DEFAULT_CONFIG
-from ..parser_service.api_clients import CoinGeckoClient, ExchangeRateApiClient
-from ..parser_service.storage import RatesStorage
-from ..parser_service.updater import RatesUpdater
-from ..core.utils import load_json
+# Тяжелые модули (prettytable, parser_service, бизнес-логика) импортируются
+# внутри команд, чтобы быстрые команды не платили за них при старте.
+
+
+class _LazyApp:
+    """Создает AppLogic при первом обращении."""
+
+    _app = None
+
+    def __getattr__(self, name):
+        if self._app is None:
+            from ..core.usecases import AppLogic
+            self._app = AppLogic()
+        return getattr(self._app, name)
+
+
+def _table(field_names):
+    """PrettyTable с заголовками (prettytable импортируется по требованию)."""
+    from prettytable import PrettyTable
+    table = PrettyTable()
+    table.field_names = field_names
+    return table
+
+
+def _parse_date(value):
+    """Дата для фильтров истории: YYYY-MM-DD или ISO, по умолчанию UTC."""
+    try:
+        dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"некорректная дата: {value}")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def _month_range(value):
+    """Месяц YYYY-MM -> (начало, начало следующего)."""
+    try:
+        start = datetime.strptime(value, "%Y-%m").replace(tzinfo=timezone.utc)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"некорректный месяц: {value}")
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
 
 
 def main():
     """Главная функция."""
-    app = AppLogic()
+    app = _LazyApp()
 
     parser = argparse.ArgumentParser(
         description="Торговля валютами - консольное приложение"
     )
 
+    parser.add_argument('--profile', nargs='?', const='profile.pstats', metavar='PATH',
+                        help='Профилировать команду (cProfile, tracemalloc, время импортов)')
+    parser.add_argument('--profile-top', type=int, default=20, metavar='N',
+                        help='Сколько строк показать в сводке профиля')
+
     subparsers = parser.add_subparsers(dest='command', help='Команды')
 
     # Регистрация
@@ -38,9 +84,15 @@ def main():
     # Портфель
     port = subparsers.add_parser('portfolio', help='Показать портфель')
     port.add_argument('--base', default='USD')
+    port.add_argument('--method', choices=['fifo', 'avg'], default='fifo')
+    port.add_argument('--currency', required=False, help='Только кошелек этой валюты')
+    port.add_argument('--format', choices=FORMATS, default='table', help='plain/csv/json — для скриптов')
 
     show_port = subparsers.add_parser('show-portfolio', help='Показать портфель (алиас)')
     show_port.add_argument('--base', default='USD')
+    show_port.add_argument('--method', choices=['fifo', 'avg'], default='fifo')
+    show_port.add_argument('--currency', required=False, help='Только кошелек этой валюты')
+    show_port.add_argument('--format', choices=FORMATS, default='table', help='plain/csv/json — для скриптов')
 
     # Купить
     buy = subparsers.add_parser('buy', help='Купить валюту')
@@ -52,6 +104,50 @@ def main():
     sell.add_argument('--currency', required=True)
     sell.add_argument('--amount', type=float, required=True)
 
+    # Отложенные ордера
+    quote = subparsers.add_parser('quote', help='Котировка: курс фиксируется на quote_ttl_seconds')
+    quote.add_argument('--side', choices=['buy', 'sell'], required=True)
+    quote.add_argument('--currency', required=True)
+    quote.add_argument('--amount', type=float, required=True)
+
+    confirm = subparsers.add_parser('confirm', help='Исполнить котировку по зафиксированному курсу')
+    confirm.add_argument('--id', dest='quote_id', required=True)
+
+    order = subparsers.add_parser('order', help='Выставить limit/stop ордер')
+    order.add_argument('--side', choices=['buy', 'sell'], required=True)
+    order.add_argument('--type', dest='order_type', choices=['limit', 'stop'], required=True)
+    order.add_argument('--currency', required=True)
+    order.add_argument('--amount', type=float, required=True)
+    order.add_argument('--price', type=float, required=True, help='Цена в USD')
+
+    subparsers.add_parser('orders', help='Мои открытые ордера')
+
+    cancel = subparsers.add_parser('cancel-order', help='Отменить ордер')
+    cancel.add_argument('--id', dest='order_id', required=True)
+
+    # Алерты по курсам
+    alert_add = subparsers.add_parser('alert-add', help='Алерт: курс выше/ниже порога')
+    alert_add.add_argument('--pair', required=True, help='Например BTC_USD')
+    cond = alert_add.add_mutually_exclusive_group(required=True)
+    cond.add_argument('--above', type=float)
+    cond.add_argument('--below', type=float)
+
+    alerts = subparsers.add_parser('alerts', help='Мои алерты')
+    alerts.add_argument('--fired', action='store_true', help='Показать сработавшие')
+
+    alert_rm = subparsers.add_parser('alert-remove', help='Удалить алерт')
+    alert_rm.add_argument('--id', dest='alert_id', required=True)
+
+    # История сделок
+    for name in ('history', 'trades'):
+        hist = subparsers.add_parser(name, help='История сделок')
+        hist.add_argument('--limit', type=int, default=20)
+        hist.add_argument('--page', type=int, default=1)
+        hist.add_argument('--since', type=_parse_date, required=False)
+        hist.add_argument('--until', type=_parse_date, required=False)
+        hist.add_argument('--month', type=_month_range, required=False,
+                          help='Месяц в формате YYYY-MM')
+
     # Курс
     rate = subparsers.add_parser('rate', help='Узнать курс')
     rate.add_argument('--from', dest='from_curr', required=True)
@@ -63,11 +159,15 @@ def main():
 
     # Обновить курсы
     upd = subparsers.add_parser('update-rates', help='Обновить курсы валют')
-    upd.add_argument('--source', choices=['coingecko', 'exchangerate'], required=False)
+    upd.add_argument('--source', choices=['coingecko', 'exchangerate', 'openerapi', 'replay', 'random'],
+                     required=False, help='replay — записанная фикстура, random — случайное блуждание')
+    upd.add_argument('--record', metavar='PATH', help='Дописывать ответы источников в фикстуру')
+    upd.add_argument('--repeat', type=int, default=1, help='Число обновлений подряд (нагрузочный прогон)')
 
     # Показать курсы
     show_rates = subparsers.add_parser('show-rates', help='Показать курсы из кеша')
-    show_rates.add_argument('--currency', required=False)
+    show_rates.add_argument('--currency', required=False, help='Пары, начинающиеся с кода')
+    show_rates.add_argument('--format', choices=FORMATS, default='table', help='plain/csv/json — для скриптов')
 
     # Добавить деньги 
     add = subparsers.add_parser('add-money', help='Добавить деньги (тест)')
@@ -76,130 +176,59 @@ def main():
 
     subparsers.add_parser('whoami', help='Показать кто я')
 
-    subparsers.add_parser('debug-session', help='Показать сессию (отладка)')
-
-    if len(sys.argv) == 1:
-        parser.print_help()
-        return
-
-    args = parser.parse_args()
-
-    try:
-        if args.command == 'register':
-            user = app.register(args.username, args.password)
-            print(f" Создан пользователь: {user.username} (ID: {user.user_id})")
-            print("   Вы автоматически вошли в систему!")
-
-        elif args.command == 'login':
-            user = app.login(args.username, args.password)
-            print(f" Вход выполнен: {user.username}")
-
-        elif args.command == 'logout':
-            app.logout()
-            print(" Вы вышли")
-
-        elif args.command in ('portfolio', 'show-portfolio'):
-            data = app.show_my_portfolio(args.base)
-
-            print(f"\n Портфель: {data['user']}")
-            print("=" * 50)
-
-            table = PrettyTable()
-            table.field_names = ["Валюта", "Количество", f"В {args.base}"]
-
-            for wallet in data['wallets']:
-                table.add_row([
-                    wallet['currency'],
-                    f"{wallet['balance']:.4f}",
-                    f"{wallet.get('value', 0):.2f}"
-                ])
-
-            print(table)
-            print("=" * 50)
-            print(f"Всего в {args.base}: {data['total']:.2f}")
-
-        elif args.command == 'buy':
-            result = app.buy(args.currency, args.amount)
-            print(f"\n Куплено {result['amount']:.4f} {result['currency']}")
-            print(f"   Стоимость: {result['cost']:.2f} USD")
-            print(f"   Новый баланс: {result['new_balance']:.4f} {result['currency']}")
-            print(f"   USD осталось: {result['usd_left']:.2f}")
+    log_stats = subparsers.add_parser('log-stats', help='Статистика по логу действий')
+    log_stats.add_argument('--file', required=False, help='По умолчанию action_log_file')
+    log_stats.add_argument('--action', required=False)
 
-        elif args.command == 'sell':
-            result = app.sell(args.currency, args.amount)
-            print(f"\n Продано {result['amount']:.4f} {result['currency']}")
-            print(f"   Выручка: {result['revenue']:.2f} USD")
-            print(f"   Новый баланс: {result['new_balance']:.4f} {result['currency']}")
-            print(f"   USD теперь: {result['usd_now']:.2f}")
+    metrics_cmd = subparsers.add_parser('metrics', help='Накопленные метрики производительности')
+    metrics_cmd.add_argument('--prometheus', required=False, metavar='PATH',
+                             help='Записать в текстовом формате Prometheus')
+    metrics_cmd.add_argument('--reset', action='store_true', help='Обнулить накопленные метрики')
 
-        elif args.command in ('rate', 'get-rate'):
-            rate_val = app.get_rate(args.from_curr, args.to_curr)
-            print(f"\n Курс: 1 {args.from_curr} = {rate_val:.6f} {args.to_curr}")
-            if rate_val > 0:
-                print(f"   Обратно: 1 {args.to_curr} = {1 / rate_val:.6f} {args.from_curr}")
+    imp = subparsers.add_parser('import-users', help='Массовая регистрация из CSV/JSONL')
+    imp.add_argument('--file', required=True, help='username,password[,balance_usd] (или хеш и соль из export-users)')
+    imp.add_argument('--format', choices=['csv', 'jsonl'], required=False, help='По умолчанию — по расширению')
+    imp.add_argument('--workers', type=int, required=False, help='Процессов для хеширования паролей')
 
-        elif args.command == 'update-rates':
-            cfg = DEFAULT_CONFIG
-            clients = []
+    exp = subparsers.add_parser('export-users', help='Выгрузить пользователей в CSV/JSONL')
+    exp.add_argument('--file', required=True)
+    exp.add_argument('--format', choices=['csv', 'jsonl'], required=False, help='По умолчанию — по расширению')
 
-            if args.source in (None, 'coingecko'):
-                clients.append(CoinGeckoClient(cfg))
+    export = subparsers.add_parser('export', help='Выгрузка портфелей, курсов или истории (CSV / колоночный формат)')
+    export.add_argument('dataset', choices=['portfolios', 'rates', 'history'])
+    export.add_argument('--out', required=True, help='Файл выгрузки')
+    export.add_argument('--format', choices=['csv', 'columnar'], default='csv')
+    export.add_argument('--gzip', action='store_true', help='Сжать gzip')
+    export.add_argument('--base', default='USD', help='Валюта оценки портфелей')
+    export.add_argument('--chunk-size', type=int, default=10000, help='Строк в группе записи')
 
-            if args.source in (None, 'exchangerate'):
-                clients.append(ExchangeRateApiClient(cfg))
+    reshard = subparsers.add_parser('reshard', help='Разложить портфели по N файлам-шардам')
+    reshard.add_argument('--shards', type=int, required=True,
+                         help='Число шардов (0 или 1 — один файл portfolios.json)')
 
-            storage = RatesStorage(cfg.RATES_FILE_PATH, cfg.HISTORY_FILE_PATH)
-            updater = RatesUpdater(clients, storage)
-
-            updated = updater.run_update()
-            print(f"\n Курсы обновлены: {len(updated)} пар")
-
-        elif args.command == 'show-rates':
-            data = load_json("data/rates.json")
-            pairs = data.get("pairs", {})
+    subparsers.add_parser('debug-session', help='Показать сессию (отладка)')
 
-            if not pairs:
-                print(" Кеш курсов пуст. Выполните update-rates")
-                return
+    if len(sys.argv) == 1:
+        parser.print_help()
+        return
 
-            table = PrettyTable()
-            table.field_names = ["Пара", "Курс", "Обновлено", "Источник"]
+    args = parser.parse_args()
 
-            for pair, info in pairs.items():
-                if args.currency and not pair.startswith(args.currency.upper()):
-                    continue
-                table.add_row([
-                    pair,
-                    info.get("rate"),
-                    info.get("updated_at"),
-                    info.get("source"),
-                ])
-
-            print("\n💱 Курсы валют:")
-            print(table)
-
-        elif args.command == 'add-money':
-            result = app.add_money(args.currency, args.amount)
-            print(f"\n Добавлено {result['added']:.2f} {result['currency']}")
-            print(f"   Было: {result['was']:.2f}, стало: {result['now']:.2f}")
-
-        elif args.command == 'whoami':
-            user = app.get_current_user()
-            info = user.get_info()
-            print(f"\n Вы: {info['name']} (ID: {info['id']})")
-            print(f"   Зарегистрирован: {info['registered']}")
-
-        elif args.command == 'debug-session':
-            import os
-            if os.path.exists("data/session.json"):
-                with open("data/session.json", 'r') as f:
-                    print(f.read())
-            else:
-                print("Файл сессии не найден")
+    from ..metrics import metrics
+    metrics.enable_flush()
 
+    try:
+        if args.profile:
+            from ..profiling import profile_call
+            profile_call(lambda: _run_command(app, args, parser), args.profile, args.profile_top)
         else:
-            parser.print_help()
+            _run_command(app, args, parser)
 
+    except BrokenPipeError:
+        # Вывод обрезан (| head): молча выходим, без трассировки
+        import os
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
     except MyError as e:
         print(f"\n Ошибка: {e}")
         sys.exit(1)
@@ -210,5 +239,403 @@ def main():
         sys.exit(1)
 
 
+def _print_buy(result):
+    """Итог покупки (buy и confirm)."""
+    print(f"\n Куплено {result['amount']:.4f} {result['currency']}")
+    print(f"   Курс: {result['rate']:.6f} USD (снимок #{result['rates_version']})")
+    print(f"   Стоимость: {result['cost']:.2f} USD")
+    print(f"   Новый баланс: {result['new_balance']:.4f} {result['currency']}")
+    print(f"   USD осталось: {result['usd_left']:.2f}")
+
+
+def _print_sell(result):
+    """Итог продажи (sell и confirm)."""
+    print(f"\n Продано {result['amount']:.4f} {result['currency']}")
+    print(f"   Курс: {result['rate']:.6f} USD (снимок #{result['rates_version']})")
+    print(f"   Выручка: {result['revenue']:.2f} USD")
+    print(f"   Новый баланс: {result['new_balance']:.4f} {result['currency']}")
+    print(f"   USD теперь: {result['usd_now']:.2f}")
+    if result.get('realized'):
+        print(f"   Реализованный P&L: {result['realized']['fifo']:.2f} USD (FIFO), "
+              f"{result['realized']['avg']:.2f} USD (средняя)")
+
+
+def _run_command(app, args, parser):
+    """Выполняет выбранную команду."""
+    if args.command == 'register':
+        user = app.register(args.username, args.password)
+        print(f" Создан пользователь: {user.username} (ID: {user.user_id})")
+        print("   Вы автоматически вошли в систему!")
+
+    elif args.command == 'login':
+        user = app.login(args.username, args.password)
+        print(f" Вход выполнен: {user.username}")
+
+    elif args.command == 'logout':
+        app.logout()
+        print(" Вы вышли")
+
+    elif args.command in ('portfolio', 'show-portfolio'):
+        data = app.show_my_portfolio(args.base, args.method, args.currency)
+        base = data['base']
+
+        if args.format != 'table':
+            columns = [('currency', 'Валюта', 6), ('balance', 'Количество', 16),
+                       ('value', f'В {base}', 16), ('cost', 'Себестоимость', 16),
+                       ('unrealized', 'Нереализ. P&L', 16), ('realized', 'Реализ. P&L', 16)]
+            meta = {key: data[key] for key in ('user', 'base', 'method', 'total', 'unrealized',
+                                               'realized', 'unvalued')}
+            render(data['wallets'], columns, args.format, meta=meta, key='wallets')
+            if args.format == 'plain':
+                print(f"Всего в {base}: {data['total']:.2f}")
+            return
+
+        print(f"\n Портфель: {data['user']}")
+        print("=" * 50)
+
+        table = _table(["Валюта", "Количество", f"В {base}",
+                             "Себестоимость", "Нереализ. P&L", "Реализ. P&L"])
+
+        for wallet in data['wallets']:
+            pnl = [
+                f"{wallet[key]:.2f}" if key in wallet else "-"
+                for key in ('cost', 'unrealized', 'realized')
+            ]
+            table.add_row([
+                wallet['currency'],
+                f"{wallet['balance']:.4f}",
+                "?" if wallet['value'] is None else f"{wallet['value']:.2f}",
+                *pnl
+            ])
+
+        print(table)
+        print("=" * 50)
+        print(f"Всего в {base}: {data['total']:.2f}")
+        if data['unvalued']:
+            print(f"Без оценки (нет курса): {', '.join(data['unvalued'])}")
+        print(f"P&L ({data['method']}): нереализованный {data['unrealized']:.2f}, "
+              f"реализованный {data['realized']:.2f} {base}")
+
+    elif args.command == 'buy':
+        _print_buy(app.buy(args.currency, args.amount))
+
+    elif args.command == 'sell':
+        _print_sell(app.sell(args.currency, args.amount))
+
+    elif args.command == 'quote':
+        q = app.quote(args.side, args.currency, args.amount)
+        action = "Покупка" if q['side'] == 'buy' else "Продажа"
+        print(f"\n Котировка {q['quote_id']}: {action} {q['amount']:.4f} {q['currency']}")
+        print(f"   Курс: {q['rate']:.6f} USD (снимок #{q['rates_version']}), итого {q['total']:.2f} USD")
+        print(f"   Действует до {q['expires_at']}")
+        print(f"   Подтвердить: confirm --id {q['quote_id']}")
+
+    elif args.command == 'confirm':
+        result = app.confirm_quote(args.quote_id)
+        if 'cost' in result:
+            _print_buy(result)
+        else:
+            _print_sell(result)
+
+    elif args.command == 'order':
+        order = app.place_order(args.side, args.order_type, args.currency,
+                                args.amount, args.price)
+        print(f"\n Ордер {order['order_id']} выставлен: {order['type']} {order['side']} "
+              f"{order['amount']:.4f} {order['currency']} по {order['price']:.2f} USD")
+
+    elif args.command == 'orders':
+        orders = app.list_orders()
+        if not orders:
+            print(" Открытых ордеров нет")
+            return
+
+        table = _table(["ID", "Тип", "Сторона", "Валюта", "Количество", "Цена USD", "Создан"])
+        for o in orders:
+            table.add_row([
+                o['order_id'], o['type'], o['side'], o['currency'],
+                f"{o['amount']:.4f}", f"{o['price']:.2f}",
+                o['created_at'][:19].replace('T', ' ')
+            ])
+        print(table)
+
+    elif args.command == 'cancel-order':
+        order = app.cancel_order(args.order_id)
+        print(f" Ордер {order['order_id']} отменен")
+
+    elif args.command == 'alert-add':
+        if args.above is not None:
+            alert = app.add_alert(args.pair, 'above', args.above)
+        else:
+            alert = app.add_alert(args.pair, 'below', args.below)
+        sign = '>' if alert['condition'] == 'above' else '<'
+        print(f"\n Алерт {alert['alert_id']}: {alert['pair']} {sign} {alert['threshold']}")
+
+    elif args.command == 'alerts':
+        if args.fired:
+            from ..core.utils import load_json_lines
+            user_id = app.get_current_user().user_id
+            items = [a for a in load_json_lines(app.config.alerts_fired_file) if a['user_id'] == user_id]
+        else:
+            items = app.list_alerts()
+        if not items:
+            print(" Алертов нет")
+            return
+
+        table = _table(["ID", "Пара", "Условие", "Порог", "Курс", "Сработал"])
+        for a in items:
+            table.add_row([
+                a['alert_id'], a['pair'],
+                '>' if a['condition'] == 'above' else '<',
+                a['threshold'], a.get('rate', '-'),
+                a.get('fired_at', '-')[:19].replace('T', ' ')
+            ])
+        print(table)
+
+    elif args.command == 'alert-remove':
+        alert = app.remove_alert(args.alert_id)
+        print(f" Алерт {alert['alert_id']} удален")
+
+    elif args.command in ('history', 'trades'):
+        since, until = args.since, args.until
+        if args.month:
+            since, until = args.month
+
+        data = app.get_trades(args.limit, args.page, since, until)
+        if not data['trades']:
+            print(" Сделок не найдено")
+            return
+
+        table = _table(["Время", "Тип", "Валюта", "Количество", "Курс", "Сумма USD"])
+
+        for trade in data['trades']:
+            table.add_row([
+                trade['timestamp'][:19].replace('T', ' '),
+                trade['side'],
+                trade['currency'],
+                f"{trade['amount']:.4f}",
+                f"{trade['rate']:.6f}",
+                f"{trade['cost']:.2f}"
+            ])
+
+        print(f"\n История сделок: {data['user']} (стр. {data['page']})")
+        print(table)
+        if data['has_more']:
+            print(f"   Дальше: --page {data['page'] + 1}")
+
+    elif args.command in ('rate', 'get-rate'):
+        rate_val = app.get_rate(args.from_curr, args.to_curr)
+        print(f"\n Курс: 1 {args.from_curr} = {rate_val:.6f} {args.to_curr}")
+        if rate_val > 0:
+            print(f"   Обратно: 1 {args.to_curr} = {1 / rate_val:.6f} {args.from_curr}")
+
+    elif args.command == 'update-rates':
+        from ..logging_config import ensure_logging
+        from ..parser_service.config import ParserConfig
+        from ..parser_service.registry import build_registry
+        from ..parser_service.storage import RatesStorage
+        from ..parser_service.updater import RatesUpdater
+        from ..core.alerts import FileAlertSink
+        from ..core.events import bus, RatesUpdated
+
+        import time
+
+        ensure_logging()
+        cfg = ParserConfig.from_settings(app.config)
+        storage = RatesStorage(cfg.RATES_FILE_PATH, cfg.HISTORY_FILE_PATH,
+                               cfg.FULL_SNAPSHOT_EVERY, cfg.RATES_BINARY_PATH)
+        registry = build_registry(cfg, args.source, storage.read_pairs())
+        if args.record:
+            registry.record(args.record)
+        updater = RatesUpdater(registry, storage)
+
+        fills = []
+        fired = []
+        sink = FileAlertSink(app.config.alerts_fired_file)
+        bus.subscribe(RatesUpdated, lambda e: fills.extend(app.match_orders(e.pairs, e.version)))
+        bus.subscribe(RatesUpdated, lambda e: fired.extend(app.check_alerts(e.pairs, sink)))
+
+        start = time.perf_counter()
+        for _ in range(max(args.repeat, 1)):
+            updated = updater.run_update()
+        elapsed = time.perf_counter() - start
+        print(f"\n Курсы обновлены: {len(updated)} пар")
+        if args.repeat > 1:
+            print(f"   {args.repeat} обновлений за {elapsed:.2f} с ({args.repeat / elapsed:.1f}/с)")
+        for o in fills:
+            status = "исполнен" if o['status'] == 'filled' else f"отклонен ({o['error']})"
+            print(f"   Ордер {o['order_id']} ({o['type']} {o['side']} {o['currency']}) "
+                  f"по {o['fill_rate']:.2f}: {status}")
+        if fired:
+            print(f"   Сработало алертов: {len(fired)} (см. alerts --fired)")
+
+    elif args.command == 'show-rates':
+        from ..parser_service.storage import load_rates_snapshot
+        from ..infra.settings import settings
+
+        prefix = args.currency.upper() if args.currency else None
+        data = load_rates_snapshot(settings.snapshot().rates_file, prefix)
+        pairs = data.get("pairs", {})
+
+        if args.format != 'table':
+            columns = [('pair', 'Пара', 12), ('rate', 'Курс', 20),
+                       ('updated_at', 'Обновлено', 27), ('source', 'Источник', 0)]
+            rows = ({'pair': pair, **info} for pair, info in pairs.items())
+            render(rows, columns, args.format)
+            return
+
+        if not pairs:
+            print(" Кеш курсов пуст. Выполните update-rates")
+            return
+
+        table = _table(["Пара", "Курс", "Обновлено", "Источник"])
+
+        for pair, info in pairs.items():
+            table.add_row([
+                pair,
+                info.get("rate"),
+                info.get("updated_at"),
+                info.get("source"),
+            ])
+
+        print("\n💱 Курсы валют:")
+        print(table)
+
+    elif args.command == 'add-money':
+        result = app.add_money(args.currency, args.amount)
+        print(f"\n Добавлено {result['added']:.2f} {result['currency']}")
+        print(f"   Было: {result['was']:.2f}, стало: {result['now']:.2f}")
+
+    elif args.command == 'whoami':
+        user = app.get_current_user()
+        info = user.get_info()
+        print(f"\n Вы: {info['name']} (ID: {info['id']})")
+        print(f"   Зарегистрирован: {info['registered']}")
+
+    elif args.command == 'log-stats':
+        from ..log_stats import collect_stats
+        from ..infra.settings import settings
+
+        path = args.file or settings.snapshot().action_log_file
+        stats = collect_stats(path, args.action)
+        if not stats:
+            print(f" Нет записей в {path}")
+            return
+
+        table = _table(["Действие", "Вызовов", "Ошибок", "p50 мс", "p95 мс", "p99 мс", "max мс"])
+        for name, item in sorted(stats.items(), key=lambda x: -x[1]['count']):
+            sk = item['sketch']
+            table.add_row([
+                name, item['count'], item['errors'],
+                f"{sk.quantile(0.5):.3f}", f"{sk.quantile(0.95):.3f}",
+                f"{sk.quantile(0.99):.3f}", f"{sk.max:.3f}"
+            ])
+        print(table)
+
+    elif args.command == 'metrics':
+        import os
+        from ..metrics import load_snapshot, to_prometheus, histogram_quantile
+        from ..infra.settings import settings
+
+        path = settings.snapshot().metrics_file or 'logs/metrics.json'
+        if args.reset:
+            if os.path.exists(path):
+                os.remove(path)
+            print(" Метрики обнулены")
+            return
+
+        data = load_snapshot(path)
+        if not data:
+            print(f" Метрик пока нет ({path})")
+            return
+
+        if args.prometheus:
+            with open(args.prometheus, 'w', encoding='utf-8') as f:
+                f.write(to_prometheus(data))
+            print(f" Записано в {args.prometheus}")
+            return
+
+        table = _table(["Метрика", "Значение", "Среднее мс", "p50 мс", "p99 мс"])
+        table.align["Метрика"] = "l"
+        for key in sorted(data):
+            item = data[key]
+            if item['type'] == 'histogram':
+                avg = item['sum_ns'] / item['count'] / 1e6 if item['count'] else 0.0
+                table.add_row([
+                    key, item['count'], f"{avg:.3f}",
+                    f"<= {histogram_quantile(item, 0.5) * 1000:.3f}",
+                    f"<= {histogram_quantile(item, 0.99) * 1000:.3f}"
+                ])
+            else:
+                table.add_row([key, item['value'], "-", "-", "-"])
+        print(table)
+
+    elif args.command == 'import-users':
+        import time
+        from ..infra.user_io import read_user_rows
+        start = time.perf_counter()
+        try:
+            rows = list(read_user_rows(args.file, args.format))
+        except (OSError, ValueError) as e:
+            raise MyError(f"не удалось прочитать {args.file}: {e}")
+        result = app.import_users(rows, args.workers)
+        elapsed = time.perf_counter() - start
+        for error in result['errors'][:10]:
+            print(f"   пропущено: {error}")
+        if len(result['errors']) > 10:
+            print(f"   ... и еще {len(result['errors']) - 10}")
+        rate = result['imported'] / elapsed if elapsed > 0 else 0.0
+        print(f"\n Импортировано {result['imported']} пользователей, пропущено {result['skipped']}"
+              f" за {elapsed:.2f} с ({rate:.0f} польз./с)")
+
+    elif args.command == 'export-users':
+        import time
+        from ..infra.user_io import write_users
+        start = time.perf_counter()
+        try:
+            count = write_users(args.file, app.export_users(), args.format)
+        except (OSError, ValueError) as e:
+            raise MyError(f"не удалось записать {args.file}: {e}")
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed > 0 else 0.0
+        print(f"\n Выгружено {count} пользователей в {args.file} за {elapsed:.2f} с ({rate:.0f} польз./с)")
+
+    elif args.command == 'export':
+        from ..export import export_rows
+        rows = app.export_rows(args.dataset, args.base)
+        try:
+            stats = export_rows(rows, args.dataset, args.out, args.format, args.gzip, args.chunk_size)
+        except OSError as e:
+            raise MyError(f"не удалось записать {args.out}: {e}")
+        seconds = stats['seconds'] or 1e-9
+        print(f"\n Выгружено {stats['rows']} строк ({args.dataset}) в {args.out}: "
+              f"{stats['bytes'] / 1e6:.2f} МБ за {seconds:.2f} с "
+              f"({stats['rows'] / seconds:.0f} строк/с, {stats['bytes'] / 1e6 / seconds:.1f} МБ/с)")
+
+    elif args.command == 'reshard':
+        import time
+        if args.shards < 0:
+            raise MyError("число шардов не может быть отрицательным")
+        old = app.db.portfolio_shards()
+        start = time.perf_counter()
+        moved = app.db.reshard(args.shards)
+        elapsed = time.perf_counter() - start
+        new = app.db.portfolio_shards()
+        print(f"\n Портфели: {old or 1} -> {new or 1} файл(ов), перенесено {moved} за {elapsed * 1000:.1f} мс")
+
+    elif args.command == 'debug-session':
+        import os
+        from ..infra.settings import settings
+
+        session_file = settings.snapshot().session_file
+        if os.path.exists(session_file):
+            with open(session_file, 'r') as f:
+                print(f.read())
+        else:
+            print("Файл сессии не найден")
+
+    else:
+        parser.print_help()
+
+
 if __name__ == '__main__':
     main()
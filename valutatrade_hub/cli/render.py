@@ -0,0 +1,86 @@
+"""
+Потоковый вывод таблиц для скриптов: каждая строка пишется сразу, без
+сбора всей таблицы в памяти (в отличие от PrettyTable).
+
+    plain — колонки фиксированной ширины, шапка + строки
+    csv   — заголовок + строки
+    json  — массив объектов (или объект с полями meta и массивом строк)
+
+Колонки задаются кортежами (ключ, заголовок, ширина); строки — словари.
+"""
+from __future__ import annotations
+
+import csv
+import json
+import sys
+from typing import Any, Iterable, TextIO
+
+FORMATS = ("table", "plain", "csv", "json")
+
+Column = tuple[str, str, int]
+
+
+def _cell(value: Any) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return format(value, ".10g")
+    return str(value)
+
+
+def write_plain(rows: Iterable[dict], columns: list[Column], out: TextIO) -> int:
+    """Колонки фиксированной ширины: числа прижаты вправо, текст влево."""
+    out.write("  ".join(title.ljust(width) for _, title, width in columns).rstrip() + "\n")
+    count = 0
+    for row in rows:
+        cells = []
+        for key, _, width in columns:
+            value = row.get(key)
+            text = _cell(value)
+            cells.append(text.rjust(width) if isinstance(value, (int, float)) else text.ljust(width))
+        out.write("  ".join(cells).rstrip() + "\n")
+        count += 1
+    return count
+
+
+def write_csv(rows: Iterable[dict], columns: list[Column], out: TextIO) -> int:
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow([key for key, _, _ in columns])
+    count = 0
+    for row in rows:
+        writer.writerow(["" if row.get(key) is None else row.get(key) for key, _, _ in columns])
+        count += 1
+    return count
+
+
+def write_json(rows: Iterable[dict], columns: list[Column], out: TextIO,
+               meta: dict | None = None, key: str = "rows") -> int:
+    """
+    Массив объектов; если задан meta — объект {**meta, key: [...]}.
+    Строки сериализуются по одной, документ остается валидным JSON.
+    """
+    keys = [k for k, _, _ in columns]
+    if meta is not None:
+        head = json.dumps(meta, ensure_ascii=False)
+        out.write(head[:-1] + (", " if meta else "") + json.dumps(key) + ": [")
+    else:
+        out.write("[")
+    count = 0
+    for row in rows:
+        out.write(("," if count else "") + "\n  " + json.dumps({k: row.get(k) for k in keys}, ensure_ascii=False))
+        count += 1
+    out.write(("\n" if count else "") + "]" + ("}" if meta is not None else "") + "\n")
+    return count
+
+
+def render(rows: Iterable[dict], columns: list[Column], fmt: str,
+           out: TextIO | None = None, meta: dict | None = None, key: str = "rows") -> int:
+    """Пишет строки в формате fmt (plain/csv/json); возвращает их число."""
+    out = out or sys.stdout
+    if fmt == "plain":
+        return write_plain(rows, columns, out)
+    if fmt == "csv":
+        return write_csv(rows, columns, out)
+    if fmt == "json":
+        return write_json(rows, columns, out, meta, key)
+    raise ValueError(f"неизвестный формат вывода: {fmt}")
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import bisect
+import json
+from pathlib import Path
+from typing import Any, Iterable
+
+CONDITIONS = ("above", "below")
+
+
+class AlertIndex:
+    """
+    Индекс одноразовых ценовых алертов.
+
+    Для каждой пары пороги хранятся в двух отсортированных списках:
+    "above" (сработать, когда курс > порога) и "below" (курс < порога).
+    Сработавшие алерты — это префикс/суффикс списка, который находится
+    бинарным поиском, поэтому проверка снимка стоит O(log n + k).
+    """
+
+    def __init__(self, alerts: Iterable[dict[str, Any]] = ()) -> None:
+        self.alerts: dict[str, dict[str, Any]] = {}
+        self._keys: dict[tuple[str, str], list[float]] = {}
+        self._ids: dict[tuple[str, str], list[str]] = {}
+
+        grouped: dict[tuple[str, str], list[tuple[float, str]]] = {}
+        for alert in alerts:
+            self.alerts[alert["alert_id"]] = alert
+            key = (alert["pair"], alert["condition"])
+            grouped.setdefault(key, []).append((float(alert["threshold"]), alert["alert_id"]))
+        for key, items in grouped.items():
+            items.sort()
+            self._keys[key] = [t for t, _ in items]
+            self._ids[key] = [i for _, i in items]
+
+    def add(self, alert: dict[str, Any]) -> None:
+        """Добавляет алерт."""
+        key = (alert["pair"], alert["condition"])
+        keys = self._keys.setdefault(key, [])
+        ids = self._ids.setdefault(key, [])
+        threshold = float(alert["threshold"])
+        pos = bisect.bisect_right(keys, threshold)
+        keys.insert(pos, threshold)
+        ids.insert(pos, alert["alert_id"])
+        self.alerts[alert["alert_id"]] = alert
+
+    def remove(self, alert_id: str) -> dict[str, Any] | None:
+        """Удаляет алерт по id."""
+        alert = self.alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+        key = (alert["pair"], alert["condition"])
+        keys, ids = self._keys[key], self._ids[key]
+        threshold = float(alert["threshold"])
+        lo = bisect.bisect_left(keys, threshold)
+        hi = bisect.bisect_right(keys, threshold)
+        pos = ids.index(alert_id, lo, hi)
+        del keys[pos], ids[pos]
+        return alert
+
+    def evaluate(self, pair: str, rate: float) -> list[dict[str, Any]]:
+        """Снимает и возвращает алерты пары, сработавшие при курсе rate."""
+        rate = float(rate)
+        fired = []
+
+        key = (pair, "above")
+        if key in self._keys:
+            keys, ids = self._keys[key], self._ids[key]
+            n = bisect.bisect_left(keys, rate)  # пороги < rate
+            if n:
+                fired.extend(self.alerts.pop(i) for i in ids[:n])
+                del keys[:n], ids[:n]
+
+        key = (pair, "below")
+        if key in self._keys:
+            keys, ids = self._keys[key], self._ids[key]
+            n = bisect.bisect_right(keys, rate)  # пороги > rate начинаются с n
+            if n < len(keys):
+                fired.extend(self.alerts.pop(i) for i in ids[n:])
+                del keys[n:], ids[n:]
+
+        return fired
+
+    def for_user(self, user_id) -> list[dict[str, Any]]:
+        """Активные алерты пользователя."""
+        return [a for a in self.alerts.values() if a["user_id"] == user_id]
+
+    def to_list(self) -> list[dict[str, Any]]:
+        """Активные алерты для сохранения."""
+        return list(self.alerts.values())
+
+
+class FileAlertSink:
+    """Доставка сработавших алертов в JSON-lines файл."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def deliver(self, fired: list[dict[str, Any]]) -> None:
+        if not fired:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.writelines(json.dumps(a, ensure_ascii=False) + "\n" for a in fired)
+
+
+class QueueAlertSink:
+    """Доставка сработавших алертов в очередь (для долгоживущих процессов)."""
+
+    def __init__(self, q=None) -> None:
+        if q is None:
+            import queue
+            q = queue.Queue()
+        self.queue = q
+
+    def deliver(self, fired: list[dict[str, Any]]) -> None:
+        for alert in fired:
+            self.queue.put(alert)
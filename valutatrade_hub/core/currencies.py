@@ -1,7 +1,11 @@
+import os
+import json
+
+
 class Currency:
     """Базовый класс валюты."""
     
-    def __init__(self, name, code):
+    def __init__(self, name, code, precision=2, providers=None):
         if not name or not isinstance(name, str):
             raise ValueError("Название валюты не может быть пустым")
         if not code or not isinstance(code, str):
@@ -11,6 +15,8 @@ class Currency:
         
         self._name = name
         self._code = code.upper()
+        self.precision = precision
+        self.providers = dict(providers or {})
     
     @property
     def name(self):
@@ -31,8 +37,8 @@ class Currency:
 class FiatCurrency(Currency):
     """Фиатная валюта (обычные деньги)."""
     
-    def __init__(self, name, code, issuing_country):
-        super().__init__(name, code)
+    def __init__(self, name, code, issuing_country, **kwargs):
+        super().__init__(name, code, **kwargs)
         self._issuing_country = issuing_country
     
     @property
@@ -47,8 +53,8 @@ class FiatCurrency(Currency):
 class CryptoCurrency(Currency):
     """Криптовалюта."""
     
-    def __init__(self, name, code, algorithm, market_cap=0.0):
-        super().__init__(name, code)
+    def __init__(self, name, code, algorithm, market_cap=0.0, **kwargs):
+        super().__init__(name, code, **kwargs)
         self._algorithm = algorithm
         self._market_cap = float(market_cap)
     
@@ -66,33 +72,96 @@ class CryptoCurrency(Currency):
         return f"[CRYPTO] {base} (Алгоритм: {self.algorithm}, Кап: {cap_str})"
 
 
-# Реестр валют
+# Реестр валют: описания в currencies.json (или в файле из настройки
+# currencies_file), загружаются и проверяются один раз при первом обращении.
+# Для частых проверок заранее собраны множества кодов и карты id провайдеров.
+DEFAULT_REGISTRY_FILE = os.path.join(os.path.dirname(__file__), "currencies.json")
+
+CURRENCY_TYPES = {"fiat": FiatCurrency, "crypto": CryptoCurrency}
+
 _currency_registry = {}
+_codes = frozenset()
+_codes_by_type = {}
+_provider_ids = {}
+
+
+def _build_currency(item):
+    """Валюта из записи файла; ValueError при некорректной записи."""
+    if not isinstance(item, dict):
+        raise ValueError(f"ожидается объект, получено {item!r}")
+    code = item.get("code")
+    if not isinstance(code, str) or not code.isalpha() or code != code.upper():
+        raise ValueError(f"некорректный код {code!r}")
+    kind = item.get("type")
+    if kind not in CURRENCY_TYPES:
+        raise ValueError(f"{code}: неизвестный тип {kind!r}")
+    precision = item.get("precision", 2)
+    if not isinstance(precision, int) or isinstance(precision, bool) or not 0 <= precision <= 18:
+        raise ValueError(f"{code}: precision должен быть целым от 0 до 18")
+    providers = item.get("providers", {})
+    if not isinstance(providers, dict) or not all(isinstance(v, str) for v in providers.values()):
+        raise ValueError(f"{code}: providers должен быть объектом {{провайдер: id}}")
+
+    common = {"precision": precision, "providers": providers}
+    if kind == "fiat":
+        return FiatCurrency(item.get("name"), code, item.get("issuing_country", ""), **common)
+    return CryptoCurrency(item.get("name"), code, item.get("algorithm", ""),
+                          item.get("market_cap", 0.0), **common)
 
-def init_currency_registry():
-    """Инициализирует реестр валют."""
-    global _currency_registry
-    
-    # Фиатные валюты
-    _currency_registry['USD'] = FiatCurrency("US Dollar", "USD", "United States")
-    _currency_registry['EUR'] = FiatCurrency("Euro", "EUR", "Eurozone")
-    _currency_registry['RUB'] = FiatCurrency("Russian Ruble", "RUB", "Russia")
-    _currency_registry['GBP'] = FiatCurrency("British Pound", "GBP", "United Kingdom")
-    
-    # Криптовалюты
-    _currency_registry['BTC'] = CryptoCurrency("Bitcoin", "BTC", "SHA-256", 1_200_000_000_000)
-    _currency_registry['ETH'] = CryptoCurrency("Ethereum", "ETH", "Ethash", 400_000_000_000)
-    _currency_registry['SOL'] = CryptoCurrency("Solana", "SOL", "Proof of History", 60_000_000_000)
+
+def init_currency_registry(path=None):
+    """Загружает и проверяет реестр валют, пересобирает индексы."""
+    global _currency_registry, _codes, _codes_by_type, _provider_ids
+    from .exceptions import ConfigError
+
+    if path is None:
+        from ..infra.settings import settings
+        path = settings.snapshot().currencies_file or DEFAULT_REGISTRY_FILE
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"реестр валют {path}: {e}")
+
+    items = data.get("currencies") if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise ConfigError(f"реестр валют {path}: ожидается непустой список currencies")
+
+    registry = {}
+    for item in items:
+        try:
+            currency = _build_currency(item)
+        except ValueError as e:
+            raise ConfigError(f"реестр валют {path}: {e}")
+        if currency.code in registry:
+            raise ConfigError(f"реестр валют {path}: код {currency.code} повторяется")
+        registry[currency.code] = currency
+
+    by_type = {kind: [] for kind in CURRENCY_TYPES}
+    providers = {}
+    for code, currency in registry.items():
+        by_type["fiat" if isinstance(currency, FiatCurrency) else "crypto"].append(code)
+        for provider, provider_id in currency.providers.items():
+            providers.setdefault(provider, {})[code] = provider_id
+
+    _currency_registry = registry
+    _codes = frozenset(registry)
+    _codes_by_type = {kind: tuple(codes) for kind, codes in by_type.items()}
+    _provider_ids = providers
+
+
+def _ensure_loaded():
+    if not _currency_registry:
+        init_currency_registry()
 
 
 def get_currency(code):
     """Возвращает валюту по коду."""
     code = code.upper()
+    _ensure_loaded()
     
-    if not _currency_registry:
-        init_currency_registry()
-    
-    if code not in _currency_registry:
+    if code not in _codes:
         from .exceptions import BadCurrencyError
         raise BadCurrencyError(code)
     
@@ -101,15 +170,29 @@ def get_currency(code):
 
 def list_currencies():
     """Возвращает список всех валют."""
-    if not _currency_registry:
-        init_currency_registry()
-    
+    _ensure_loaded()
     return list(_currency_registry.values())
 
 
 def is_currency_supported(code):
     """Проверяет, поддерживается ли валюта."""
-    if not _currency_registry:
-        init_currency_registry()
-    
-    return code.upper() in _currency_registry
\ No newline at end of file
+    _ensure_loaded()
+    return code.upper() in _codes
+
+
+def currency_codes():
+    """Множество кодов всех валют (frozenset)."""
+    _ensure_loaded()
+    return _codes
+
+
+def codes_by_type(kind):
+    """Коды валют типа kind ('fiat' или 'crypto') в порядке файла."""
+    _ensure_loaded()
+    return _codes_by_type.get(kind, ())
+
+
+def provider_ids(provider):
+    """Карта {код: id у провайдера}, например для CoinGecko {"BTC": "bitcoin"}."""
+    _ensure_loaded()
+    return dict(_provider_ids.get(provider, {}))
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    """Базовое событие."""
+
+
+@dataclass(frozen=True)
+class RatesUpdated(Event):
+    """Записан новый снимок курсов (version — его seq в RatesStorage)."""
+    pairs: dict[str, dict] = field(default_factory=dict)
+    version: int = 0
+
+
+@dataclass(frozen=True)
+class TradeExecuted(Event):
+    """Исполнена сделка (запись журнала сделок)."""
+    trade: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class PortfolioChanged(Event):
+    """Сохранен измененный портфель."""
+    user_id: int = 0
+    portfolio: dict[str, Any] = field(default_factory=dict)
+
+
+Handler = Callable[[Event], Any]
+
+_STOP = object()
+
+
+class _AsyncSubscriber:
+    """Подписчик со своей ограниченной очередью и рабочим потоком."""
+
+    def __init__(self, handler: Handler, maxsize: int, put_timeout: float | None) -> None:
+        self.handler = handler
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.put_timeout = put_timeout
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name=f"event-{getattr(handler, '__name__', 'handler')}")
+        self.thread.start()
+
+    def put(self, event: Event) -> None:
+        # Backpressure: издатель ждет, пока в очереди освободится место.
+        # Если ждать дольше put_timeout — событие отбрасывается.
+        try:
+            self.queue.put(event, timeout=self.put_timeout)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Очередь %r переполнена, событие %s отброшено",
+                           self.handler, type(event).__name__)
+
+    def _run(self) -> None:
+        while True:
+            event = self.queue.get()
+            try:
+                if event is _STOP:
+                    return
+                self.handler(event)
+            except Exception:
+                logger.exception("Ошибка обработчика %r", self.handler)
+            finally:
+                self.queue.task_done()
+
+    def close(self, timeout: float | None) -> None:
+        self.queue.put(_STOP)
+        self.thread.join(timeout)
+
+
+class EventBus:
+    """
+    Внутрипроцессная шина publish/subscribe.
+
+    Синхронные подписчики вызываются прямо в publish, асинхронные
+    получают события через ограниченную очередь в отдельном потоке.
+    Подписка на базовый класс получает все его подклассы.
+    """
+
+    def __init__(self) -> None:
+        self._subs: dict[type, list] = {}
+        self._lock = threading.Lock()
+        self._async: list[_AsyncSubscriber] = []
+        self._atexit = False
+
+    def subscribe(self, event_type: type, handler: Handler, *, async_: bool = False,
+                  maxsize: int = 1000, put_timeout: float | None = 1.0):
+        """Подписывает handler на события event_type. Возвращает токен для отписки."""
+        sub: Any = handler
+        if async_:
+            sub = _AsyncSubscriber(handler, maxsize, put_timeout)
+            self._async.append(sub)
+            if not self._atexit:
+                atexit.register(self.close)
+                self._atexit = True
+
+        with self._lock:
+            self._subs.setdefault(event_type, []).append(sub)
+        return event_type, sub
+
+    def unsubscribe(self, token) -> None:
+        """Отписка по токену из subscribe."""
+        event_type, sub = token
+        with self._lock:
+            subs = self._subs.get(event_type, [])
+            if sub in subs:
+                subs.remove(sub)
+        if isinstance(sub, _AsyncSubscriber):
+            self._async.remove(sub)
+            sub.close(timeout=5.0)
+
+    def publish(self, event: Event) -> None:
+        """Рассылает событие подписчикам его типа и базовых типов."""
+        with self._lock:
+            targets = [s for cls in type(event).__mro__ for s in self._subs.get(cls, ())]
+
+        for sub in targets:
+            if isinstance(sub, _AsyncSubscriber):
+                sub.put(event)
+                continue
+            try:
+                sub(event)
+            except Exception:
+                logger.exception("Ошибка обработчика %r", sub)
+
+    def close(self, timeout: float | None = 5.0) -> None:
+        """Дожидается обработки очередей асинхронных подписчиков."""
+        while self._async:
+            self._async.pop().close(timeout)
+        with self._lock:
+            for subs in self._subs.values():
+                subs[:] = [s for s in subs if not isinstance(s, _AsyncSubscriber)]
+
+
+bus = EventBus()
@@ -52,3 +52,9 @@ class NotLoggedInError(MyError):
 class BadAmountError(MyError):
     def __init__(self, msg: str = "'amount' должен быть положительным числом"):
         super().__init__(msg)
+
+
+class ConfigError(MyError):
+    """Некорректный config.json."""
+    def __init__(self, reason: str):
+        super().__init__(f"Ошибка конфигурации: {reason}")
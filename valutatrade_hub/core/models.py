@@ -76,9 +76,11 @@ class User:
 class Wallet:
     """Кошелек для одной валюты."""
     
-    def __init__(self, currency, balance=0.0):
+    def __init__(self, currency, balance=0.0, basis=None):
         self.currency = currency.upper()
         self._balance = float(balance)
+        # None — себестоимость неизвестна (кошелек создан до учета P&L)
+        self.basis = basis
     
     @property
     def balance(self):
@@ -115,15 +117,22 @@ class Wallet:
     
     def to_dict(self):
         """Для сохранения в JSON."""
-        return {
+        data = {
             'currency_code': self.currency,
             'balance': self.balance
         }
+        if self.basis is not None:
+            data['cost_basis'] = self.basis.to_dict()
+        return data
     
     @classmethod
     def from_dict(cls, data):
         """Создает из словаря."""
-        return cls(data['currency_code'], data['balance'])
+        basis = None
+        if data.get('cost_basis') is not None:
+            from .pnl import CostBasis
+            basis = CostBasis.from_dict(data['cost_basis'])
+        return cls(data['currency_code'], data['balance'], basis)
 
 
 class Portfolio:
@@ -137,7 +146,8 @@ class Portfolio:
         """Добавляет новый кошелек."""
         currency = currency.upper()
         if currency not in self.wallets:
-            self.wallets[currency] = Wallet(currency)
+            from .pnl import CostBasis
+            self.wallets[currency] = Wallet(currency, basis=CostBasis())
         return self.wallets[currency]
     
     def get_wallet(self, currency):
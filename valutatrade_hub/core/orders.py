@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+from typing import Any, Iterable
+
+SIDES = ("buy", "sell")
+ORDER_TYPES = ("limit", "stop")
+
+
+def order_direction(side: str, order_type: str) -> str:
+    """
+    Направление срабатывания ордера:
+    "up"   — исполняется, когда курс поднялся до цены (limit sell, stop buy);
+    "down" — когда курс опустился до цены (limit buy, stop sell).
+    """
+    if (side, order_type) in (("sell", "limit"), ("buy", "stop")):
+        return "up"
+    return "down"
+
+
+class OrderBook:
+    """
+    Книга отложенных ордеров по валютным парам.
+
+    Для каждой пары две кучи: min-heap ордеров, срабатывающих при росте
+    курса, и max-heap — при падении. Проверка нового курса снимает с
+    вершин только сработавшие ордера: O(k log n) для k исполнений.
+    Отмена ленивая — запись остается в куче и пропускается при снятии.
+    """
+
+    def __init__(self, orders: Iterable[dict[str, Any]] = ()) -> None:
+        self.orders: dict[str, dict[str, Any]] = {}
+        self._heaps: dict[str, dict[str, list]] = {}
+        self._seq = itertools.count()
+
+        for order in orders:
+            self.orders[order["order_id"]] = order
+            self._heaps_for(order["pair"])[order_direction(order["side"], order["type"])].append(
+                self._entry(order)
+            )
+        for heaps in self._heaps.values():
+            heapq.heapify(heaps["up"])
+            heapq.heapify(heaps["down"])
+
+    def _heaps_for(self, pair: str) -> dict[str, list]:
+        if pair not in self._heaps:
+            self._heaps[pair] = {"up": [], "down": []}
+        return self._heaps[pair]
+
+    def _entry(self, order: dict[str, Any]) -> tuple:
+        price = float(order["price"])
+        key = price if order_direction(order["side"], order["type"]) == "up" else -price
+        return (key, next(self._seq), order["order_id"])
+
+    def add(self, order: dict[str, Any]) -> None:
+        """Добавляет ордер в книгу."""
+        self.orders[order["order_id"]] = order
+        heaps = self._heaps_for(order["pair"])
+        heapq.heappush(heaps[order_direction(order["side"], order["type"])], self._entry(order))
+
+    def cancel(self, order_id: str) -> dict[str, Any] | None:
+        """Снимает ордер. Запись в куче удалится при следующем проходе."""
+        return self.orders.pop(order_id, None)
+
+    def triggered(self, pair: str, rate: float) -> list[dict[str, Any]]:
+        """Снимает с книги и возвращает ордера пары, сработавшие при курсе rate."""
+        heaps = self._heaps.get(pair)
+        if not heaps:
+            return []
+
+        rate = float(rate)
+        fired = []
+        up, down = heaps["up"], heaps["down"]
+
+        while up and up[0][0] <= rate:
+            order = self.orders.pop(heapq.heappop(up)[2], None)
+            if order is not None:
+                fired.append(order)
+
+        while down and -down[0][0] >= rate:
+            order = self.orders.pop(heapq.heappop(down)[2], None)
+            if order is not None:
+                fired.append(order)
+
+        return fired
+
+    def for_user(self, user_id) -> list[dict[str, Any]]:
+        """Открытые ордера пользователя."""
+        return [o for o in self.orders.values() if o["user_id"] == user_id]
+
+    def to_list(self) -> list[dict[str, Any]]:
+        """Открытые ордера для сохранения."""
+        return list(self.orders.values())
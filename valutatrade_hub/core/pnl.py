@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from collections import deque
+
+METHODS = ("fifo", "avg")
+
+
+class CostBasis:
+    """
+    Себестоимость позиции одного кошелька (в USD).
+
+    Считается инкрементально на каждой сделке сразу двумя методами:
+    FIFO (очередь лотов) и средняя цена. Состояние хранится вместе с
+    кошельком, поэтому P&L не пересчитывается по всей истории сделок.
+    """
+
+    def __init__(self, lots=None, avg_price=0.0, realized_fifo=0.0, realized_avg=0.0):
+        self.lots = deque([float(a), float(p)] for a, p in (lots or []))
+        self.quantity = sum(a for a, _ in self.lots)
+        self.fifo_cost = sum(a * p for a, p in self.lots)
+        self.avg_price = float(avg_price)
+        self.realized_fifo = float(realized_fifo)
+        self.realized_avg = float(realized_avg)
+
+    def on_buy(self, amount, price):
+        """Учитывает покупку amount по цене price."""
+        amount, price = float(amount), float(price)
+        if amount <= 0:
+            return
+        total = self.quantity + amount
+        self.avg_price = (self.avg_price * self.quantity + price * amount) / total
+        self.quantity = total
+        self.lots.append([amount, price])
+        self.fifo_cost += amount * price
+
+    def on_sell(self, amount, price):
+        """Учитывает продажу, возвращает реализованный P&L обоими методами."""
+        amount = min(float(amount), self.quantity)
+        price = float(price)
+        if amount <= 0:
+            return {"fifo": 0.0, "avg": 0.0}
+
+        left = amount
+        consumed_cost = 0.0
+        while left > 1e-12 and self.lots:
+            lot = self.lots[0]
+            take = min(lot[0], left)
+            consumed_cost += take * lot[1]
+            lot[0] -= take
+            left -= take
+            if lot[0] <= 1e-12:
+                self.lots.popleft()
+
+        realized_fifo = amount * price - consumed_cost
+        realized_avg = amount * (price - self.avg_price)
+
+        self.fifo_cost = max(self.fifo_cost - consumed_cost, 0.0)
+        self.quantity -= amount
+        if self.quantity <= 1e-12:
+            self.quantity = 0.0
+            self.avg_price = 0.0
+            self.fifo_cost = 0.0
+            self.lots.clear()
+
+        self.realized_fifo += realized_fifo
+        self.realized_avg += realized_avg
+        return {"fifo": realized_fifo, "avg": realized_avg}
+
+    def cost(self, method="fifo"):
+        """Себестоимость текущей позиции."""
+        if method == "avg":
+            return self.quantity * self.avg_price
+        return self.fifo_cost
+
+    def realized(self, method="fifo"):
+        """Накопленный реализованный P&L."""
+        return self.realized_avg if method == "avg" else self.realized_fifo
+
+    def unrealized(self, price, method="fifo"):
+        """Нереализованный P&L по текущей цене."""
+        return self.quantity * float(price) - self.cost(method)
+
+    def to_dict(self):
+        """Для сохранения в JSON."""
+        return {
+            "lots": [list(lot) for lot in self.lots],
+            "avg_price": self.avg_price,
+            "realized_fifo": self.realized_fifo,
+            "realized_avg": self.realized_avg,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Создает из словаря."""
+        return cls(
+            data.get("lots"),
+            data.get("avg_price", 0.0),
+            data.get("realized_fifo", 0.0),
+            data.get("realized_avg", 0.0),
+        )
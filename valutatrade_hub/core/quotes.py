@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+
+@dataclass(frozen=True)
+class RatesSnapshot:
+    """
+    Неизменяемый срез курсов одной версии: pair -> (курс, updated_at
+    в секундах от эпохи или None). Чтение из него не трогает файлы,
+    поэтому серия расчетов видит одни и те же курсы, даже если рядом
+    идет update-rates.
+    """
+    version: int = 0
+    pairs: dict[str, tuple[float, float | None]] = field(default_factory=dict)
+
+    def get(self, pair: str) -> tuple[float, float | None] | None:
+        return self.pairs.get(pair)
+
+
+def quote_expires_at(created_at: str, ttl_seconds: int) -> str:
+    """Время окончания действия котировки (ISO, UTC)."""
+    created = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+    return (created + timedelta(seconds=ttl_seconds)).isoformat()
+
+
+def quote_expired(quote: dict[str, Any], now: datetime | None = None) -> bool:
+    """Истекла ли котировка к моменту now (по умолчанию — сейчас)."""
+    now = now or datetime.now(timezone.utc)
+    return datetime.fromisoformat(quote["expires_at"].replace("Z", "+00:00")) <= now
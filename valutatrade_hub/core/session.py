@@ -2,15 +2,29 @@ class Session:
     """Хранит текущего пользователя."""
     
     def __init__(self):
-        self.current_user = None
+        self._current_user = None
+        self._loader = None
+    
+    def set_loader(self, loader):
+        """Загрузчик сохраненной сессии: вызывается при первом обращении к пользователю."""
+        self._loader = loader
+    
+    @property
+    def current_user(self):
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            loader()
+        return self._current_user
     
     def login(self, user):
         """Вход пользователя."""
-        self.current_user = user
+        self._loader = None
+        self._current_user = user
     
     def logout(self):
         """Выход."""
-        self.current_user = None
+        self._loader = None
+        self._current_user = None
     
     def is_logged_in(self):
         """Проверяет, вошел ли пользователь."""
@@ -1,12 +1,31 @@
 import os
 import json
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from .models import User, Portfolio
-from .exceptions import *
-from .utils import hash_password, get_next_id, get_current_time
+from .exceptions import (
+    MyError, CurrencyNotFoundError, ApiRequestError, NotEnoughMoneyError,
+    UserNotFoundError, WrongPasswordError, NotLoggedInError, BadAmountError,
+)
+from .utils import hash_password, get_current_time
 from .session import session
+from .pnl import CostBasis, METHODS
+from .orders import OrderBook, SIDES, ORDER_TYPES
+from .alerts import AlertIndex, CONDITIONS
+from .quotes import RatesSnapshot, quote_expires_at, quote_expired
+from .currencies import currency_codes
 from ..infra.database import Database
-from datetime import datetime, timezone
-from .exceptions import MyError
+from ..infra.settings import settings
+from ..infra.ledger import TradeLedger
+from ..infra.rates_mmap import RatesMmapReader
+from ..infra.storage import iter_json_array
+from ..decorators import log_action
+from ..metrics import metrics
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
 
 
 
@@ -14,13 +33,25 @@ class AppLogic:
     """Основная логика приложения."""
     
     def __init__(self):
-        self.db = Database()
-        self._load_session()
+        self.config = settings.snapshot()
+        self.db = Database(config=self.config)
+        self.ledger = TradeLedger(self.db.data_folder)
+        self._rates_view = None
+        # Закрепленный срез курсов (pin_rates)
+        self._pinned = None
+        # LRU-кеш портфелей: user_id -> (версия файла, Portfolio)
+        self._portfolios = OrderedDict()
+        # Книга ордеров между обновлениями курсов: (версия файла, OrderBook)
+        self._order_book = None
+        # Индекс алертов между обновлениями курсов: (версия файла, AlertIndex)
+        self._alert_index = None
+        # Сессия читается с диска только когда понадобится пользователь
+        session.set_loader(self._load_session)
     
     def _save_session(self):
         """Сохраняет сессию в файл."""
         if session.is_logged_in():
-            session_file = "data/session.json"
+            session_file = self.config.session_file
             session_data = {
                 'user_id': session.current_user.user_id,
                 'username': session.current_user.username
@@ -31,7 +62,7 @@ class AppLogic:
     
     def _load_session(self):
         """Загружает сессию из файла."""
-        session_file = "data/session.json"
+        session_file = self.config.session_file
         if os.path.exists(session_file):
             try:
                 with open(session_file, 'r') as f:
@@ -46,11 +77,12 @@ class AppLogic:
     
     def _clear_session(self):
         """Очищает файл сессии."""
-        session_file = "data/session.json"
+        session_file = self.config.session_file
         if os.path.exists(session_file):
             os.remove(session_file)
     
     
+    @log_action('REGISTER')
     def register(self, username, password):
         """Регистрирует нового пользователя."""
         if not username:
@@ -62,8 +94,7 @@ class AppLogic:
             from .exceptions import MyError
             raise MyError(f"Имя '{username}' уже занято")
         
-        users = self.db.get_all_users()
-        new_id = get_next_id(users)
+        new_id = self.db.allocate_user_ids()
         
         hashed_pass, salt = hash_password(password)
         reg_date = get_current_time()
@@ -76,13 +107,10 @@ class AppLogic:
             'registration_date': reg_date
         }
         
-        self.db.add_user(user_data)
-        
-        portfolio_data = {
-            'user_id': new_id,
-            'wallets': {}
-        }
-        self.db.save_portfolio(portfolio_data)
+        if not self.db.add_user(user_data):
+            # Имя заняли между проверкой и записью
+            raise MyError(f"Имя '{username}' уже занято")
+        # Пустой портфель не пишется: get_portfolio создаст его в памяти
         
         user = User.from_dict(user_data)
         
@@ -91,6 +119,133 @@ class AppLogic:
         
         return user
     
+    @log_action('IMPORT_USERS')
+    def import_users(self, rows, workers=None):
+        """
+        Массовая регистрация: строки {username, password | hashed_password
+        + salt, balance_usd?}. Пароли хешируются параллельно в пуле
+        процессов, id выдаются одним проходом, users.json и портфели
+        записываются по одному разу. Некорректные строки и занятые имена
+        пропускаются. Возвращает {'imported', 'skipped', 'errors'}.
+        """
+        users = self.db.get_all_users()
+        if not isinstance(users, list):
+            users = []
+        taken = {user.get('username') for user in users}
+        
+        accepted = []
+        errors = []
+        for line, row in enumerate(rows, 1):
+            if not isinstance(row, dict):
+                errors.append(f"строка {line}: ожидался объект с полями пользователя")
+                continue
+            username = str(row.get('username') or '').strip()
+            password = row.get('password')
+            if not username:
+                errors.append(f"строка {line}: нет имени")
+            elif username in taken:
+                errors.append(f"строка {line}: имя '{username}' уже занято")
+            elif password is None and not (row.get('hashed_password') and row.get('salt')):
+                errors.append(f"строка {line}: нет пароля")
+            elif password is not None and len(str(password)) < 4:
+                errors.append(f"строка {line}: пароль короче 4 символов")
+            else:
+                try:
+                    balance = float(row.get('balance_usd') or 0)
+                except (TypeError, ValueError):
+                    errors.append(f"строка {line}: некорректный balance_usd")
+                    continue
+                taken.add(username)
+                accepted.append((username, password, row, balance))
+        
+        to_hash = [str(password) for _, password, _, _ in accepted if password is not None]
+        hashed = iter(_hash_passwords(to_hash, workers))
+        
+        next_id = self.db.allocate_user_ids(len(accepted)) if accepted else 0
+        reg_date = get_current_time()
+        new_users = []
+        new_portfolios = []
+        for offset, (username, password, row, balance) in enumerate(accepted):
+            if password is not None:
+                hashed_pass, salt = next(hashed)
+            else:
+                hashed_pass, salt = row['hashed_password'], row['salt']
+            user_id = next_id + offset
+            new_users.append({
+                'user_id': user_id,
+                'username': username,
+                'hashed_password': hashed_pass,
+                'salt': salt,
+                'registration_date': row.get('registration_date') or reg_date
+            })
+            if balance > 0:
+                portfolio = Portfolio(user_id)
+                portfolio.add_wallet('USD').add_money(balance)
+                new_portfolios.append(portfolio.to_dict())
+        
+        added = self.db.add_users(new_users) if new_users else []
+        added_ids = {user['user_id'] for user in added}
+        for user in new_users:
+            if user['user_id'] not in added_ids:
+                errors.append(f"имя '{user['username']}' занято параллельной регистрацией")
+        new_portfolios = [port for port in new_portfolios if port['user_id'] in added_ids]
+        if new_portfolios:
+            self.db.add_portfolios(new_portfolios)
+        
+        return {'imported': len(added), 'skipped': len(errors), 'errors': errors}
+    
+    def export_rows(self, dataset, base='USD'):
+        """
+        Строки для выгрузки (см. export.SCHEMAS) итератором: портфели
+        читаются по одному, история — потоковым разбором JSON-массива.
+        Стоимость кошельков считается по одному закрепленному срезу курсов.
+        """
+        if dataset == 'portfolios':
+            base = base.upper()
+            if base not in currency_codes():
+                raise CurrencyNotFoundError(base)
+            return self._portfolio_rows(base)
+        if dataset == 'rates':
+            rates = self.db.get_rates()
+            version = rates.get('seq', 0)
+            return (
+                (pair, *pair.split('_', 1), info.get('rate'), info.get('updated_at'),
+                 info.get('source'), version)
+                for pair, info in rates.get('pairs', {}).items()
+            )
+        if dataset == 'history':
+            return (
+                (e.get('id'), e.get('from_currency'), e.get('to_currency'), e.get('rate'),
+                 e.get('timestamp'), e.get('source'))
+                for e in iter_json_array(self.config.history_file) if isinstance(e, dict)
+            )
+        raise MyError(f"Неизвестный набор данных: {dataset}")
+    
+    def _portfolio_rows(self, base):
+        """
+        Строки портфелей для выгрузки. Если курса нет в срезе или он
+        устарел, value = None (в CSV пусто, в VTCF — NaN): запасная
+        таблица курсов в выгрузку не попадает.
+        """
+        with self.pin_rates():
+            rates = {}
+            for port in self.db.iter_portfolios():
+                for code, wallet in port.get('wallets', {}).items():
+                    if code not in rates:
+                        try:
+                            rates[code] = self.get_rate(code, base)
+                        except MyError:
+                            rates[code] = None
+                    balance = float(wallet.get('balance', 0.0))
+                    value = None if rates[code] is None else balance * rates[code]
+                    yield port['user_id'], code, balance, value, base
+    
+    def export_users(self):
+        """Все пользователи с хешами паролей (для export-users)."""
+        users = self.db.get_all_users()
+        return users if isinstance(users, list) else []
+    
+    @log_action('LOGIN')
     def login(self, username, password):
         """Вход в систему."""
         user_data = self.db.find_user(username)
@@ -119,59 +274,147 @@ class AppLogic:
     
     
     def get_portfolio(self, user_id=None):
-        """Получает портфель."""
+        """
+        Получает портфель.
+
+        Объекты Portfolio кешируются (LRU на portfolio_cache_size
+        пользователей). Запись в кеше действительна, пока не изменилась
+        версия файла портфеля (mtime и размер), так что правки другого
+        процесса подхватываются. Пустой портфель создается только
+        в памяти — на диск он попадет с первой операцией.
+        """
         if user_id is None:
             user_id = session.get_user_id()
         
+        version = self.db.portfolio_version(user_id)
+        cached = self._portfolios.get(user_id)
+        if cached is not None and cached[0] == version:
+            self._portfolios.move_to_end(user_id)
+            metrics.counter("portfolio_cache_hits_total").inc()
+            return cached[1]
+        metrics.counter("portfolio_cache_misses_total").inc()
+        
         portfolio_data = self.db.get_portfolio(user_id)
+        if portfolio_data and any(wallet.get('cost_basis') is None
+                                  for wallet in portfolio_data.get('wallets', {}).values()):
+            # Кошельки без учета себестоимости (старые данные): P&L стартует
+            # с текущего курса. Себестоимость записывается один раз под
+            # блокировкой файла, иначе каждый процесс начинал бы ее заново
+            portfolio_data, version = self.db.update_portfolio(user_id, self._seed_cost_basis)
         if not portfolio_data:
             portfolio_data = {'user_id': user_id, 'wallets': {}}
-            self.db.save_portfolio(portfolio_data)
         
-        return Portfolio.from_dict(portfolio_data)
+        portfolio = Portfolio.from_dict(portfolio_data)
+        self._cache_portfolio(user_id, version, portfolio)
+        return portfolio
+    
+    def _seed_cost_basis(self, portfolio_data):
+        """Заводит себестоимость кошелькам без нее; True, если что-то изменилось."""
+        changed = False
+        for currency, wallet in portfolio_data.get('wallets', {}).items():
+            if wallet.get('cost_basis') is not None:
+                continue
+            basis = CostBasis()
+            if currency != 'USD' and wallet.get('balance', 0) > 0:
+                price = self._value_rate(currency, 'USD')
+                if price is None:
+                    # Курса нет — себестоимость заведется при следующем чтении
+                    continue
+                basis.on_buy(wallet['balance'], price)
+            wallet['cost_basis'] = basis.to_dict()
+            changed = True
+        return changed
     
-    def show_my_portfolio(self, base='USD'):
-        """Показывает портфель текущего пользователя."""
+    def _cache_portfolio(self, user_id, version, portfolio):
+        """Кладет портфель в LRU-кеш, вытесняя самый давний."""
+        size = self.config.portfolio_cache_size
+        if size <= 0:
+            return
+        self._portfolios[user_id] = (version, portfolio)
+        self._portfolios.move_to_end(user_id)
+        while len(self._portfolios) > size:
+            self._portfolios.popitem(last=False)
+    
+    def show_my_portfolio(self, base='USD', method='fifo', currency=None):
+        """
+        Показывает портфель текущего пользователя с P&L. currency
+        оставляет один кошелек: остальные даже не оцениваются.
+        """
         if not session.is_logged_in():
             raise NotLoggedInError("Вы не вошли в систему")
+        if method not in METHODS:
+            raise MyError(f"Неизвестный метод учета: {method}")
         
+        base = base.upper()
         user = session.current_user
         portfolio = self.get_portfolio(user.user_id)
         
         result = {
             'user': user.username,
             'base': base,
+            'method': method,
             'wallets': [],
-            'total': 0.0
+            'total': 0.0,
+            'unrealized': 0.0,
+            'realized': 0.0,
+            # Кошельки без курса: в total не входят
+            'unvalued': []
         }
         
-        total = 0.0
-        
-        rates = {
-            'USD': 1.0,
-            'EUR': 1.08,
-            'BTC': 50000.0,
-            'ETH': 3000.0,
-            'RUB': 0.011
-        }
+        usd_to_base = self._value_rate('USD', base)
+        only = currency.upper() if currency else None
         
         for currency, wallet in portfolio.wallets.items():
+            if only and currency != only:
+                continue
             wallet_info = wallet.get_info()
+            rate = self._value_rate(currency, base)
+            # Без курса стоимость неизвестна (None), остальные кошельки оцениваются
+            wallet_info['value'] = None if rate is None else wallet.balance * rate
             
-            if currency == base:
-                value = wallet.balance
-            else:
-                rate = rates.get(currency, 1.0)
-                value = wallet.balance * rate
+            # Себестоимость ведется в USD, переводим в базовую валюту
+            basis = wallet.basis
+            if basis is not None and currency != 'USD' and usd_to_base is not None:
+                wallet_info['cost'] = basis.cost(method) * usd_to_base
+                wallet_info['realized'] = basis.realized(method) * usd_to_base
+                result['realized'] += wallet_info['realized']
+                price_usd = self._value_rate(currency, 'USD')
+                if price_usd is not None:
+                    wallet_info['unrealized'] = basis.unrealized(price_usd, method) * usd_to_base
+                    result['unrealized'] += wallet_info['unrealized']
             
-            wallet_info['value'] = value
             result['wallets'].append(wallet_info)
-            total += value
+            if wallet_info['value'] is None:
+                result['unvalued'].append(currency)
+            else:
+                result['total'] += wallet_info['value']
         
-        result['total'] = total
         return result
     
+    def _value_rate(self, from_curr, to_curr):
+        """
+        Курс для оценки: из кеша rates.json, иначе по запасной таблице.
+        None, если валюты нет и в таблице: такая позиция не оценивается.
+        """
+        try:
+            return self.get_rate(from_curr, to_curr)
+        except MyError:
+            pass
+        
+        to_usd = {
+            'USD': 1.0,
+            'EUR': 1.08,
+            'BTC': 50000.0,
+            'ETH': 3000.0,
+            'RUB': 0.011
+        }
+        from_curr, to_curr = from_curr.upper(), to_curr.upper()
+        if from_curr not in to_usd or to_curr not in to_usd:
+            return None
+        return to_usd[from_curr] / to_usd[to_curr]
+    
     
+    @log_action('BUY')
     def buy(self, currency, amount):
         """Покупает валюту."""
         # Проверяем вход
@@ -182,149 +425,560 @@ class AppLogic:
             raise BadAmountError(f"Сумма должна быть > 0: {amount}")
         
         currency = currency.upper()
-        user_id = session.get_user_id()
-        portfolio = self.get_portfolio(user_id)
+        if currency not in currency_codes():
+            raise CurrencyNotFoundError(currency)
+        
+        rate, version = self._trade_rate(currency)
+        return self._execute_buy(session.get_user_id(), currency, amount, rate,
+                                 rates_version=version)
+    
+    @log_action('SELL')
+    def sell(self, currency, amount):
+        """Продает валюту."""
+        # Проверяем вход
+        if not session.is_logged_in():
+            raise NotLoggedInError("Вы не вошли в систему")
         
-        # Получаем или создаем кошелек
-        wallet = portfolio.get_wallet(currency)
-        if not wallet:
-            wallet = portfolio.add_wallet(currency)
+        if amount <= 0:
+            raise BadAmountError(f"Сумма должна быть > 0: {amount}")
         
-        # Нужен USD кошелек для оплаты
-        usd_wallet = portfolio.get_wallet('USD')
-        if not usd_wallet:
-            raise NotEnoughMoneyError(0, 1, 'USD')
+        currency = currency.upper()
+        if currency not in currency_codes():
+            raise CurrencyNotFoundError(currency)
         
-        # Простой курс для расчета
-        rates = {
-            'BTC': 50000.0,
-            'ETH': 3000.0,
-            'EUR': 1.08,
-            'RUB': 0.011
+        rate, version = self._trade_rate(currency)
+        return self._execute_sell(session.get_user_id(), currency, amount, rate,
+                                  rates_version=version)
+    
+    def _trade_rate(self, currency):
+        """
+        (курс currency к USD, версия снимка) из закрепленного или свежего
+        среза. Если пары в срезе нет, сделка отклоняется: справочный курс
+        get_rate не принадлежит ни одной версии снимка.
+        """
+        with self.pin_rates() as snapshot:
+            if (currency != 'USD' and snapshot.get(f"{currency}_USD") is None
+                    and snapshot.get(f"USD_{currency}") is None):
+                raise MyError(f"Курса {currency}→USD нет в снимке #{snapshot.version}. "
+                              f"Выполните update-rates")
+            return self.get_rate(currency, 'USD'), snapshot.version
+    
+    @log_action('QUOTE')
+    def quote(self, side, currency, amount):
+        """
+        Котировка сделки: курс текущего снимка, который держится
+        quote_ttl_seconds секунд. confirm_quote исполняет сделку ровно
+        по нему, даже если курсы успели обновиться.
+        """
+        if not session.is_logged_in():
+            raise NotLoggedInError("Вы не вошли в систему")
+        if side not in SIDES:
+            raise MyError(f"Неизвестная сторона сделки: {side}")
+        if amount <= 0:
+            raise BadAmountError(f"Сумма должна быть > 0: {amount}")
+        
+        currency = currency.upper()
+        if currency not in currency_codes():
+            raise CurrencyNotFoundError(currency)
+        
+        rate, version = self._trade_rate(currency)
+        created_at = get_current_time()
+        quote = {
+            'quote_id': os.urandom(6).hex(),
+            'user_id': session.get_user_id(),
+            'side': side,
+            'currency': currency,
+            'amount': amount,
+            'rate': rate,
+            'total': amount * rate,
+            'rates_version': version,
+            'created_at': created_at,
+            'expires_at': quote_expires_at(created_at, self.config.quote_ttl_seconds)
         }
-        rate = rates.get(currency, 1.0)
-        cost = amount * rate
+        # Истекшие котировки заодно вычищаются
+        with self.db.lock("quotes"):
+            quotes = [q for q in self.db.get_quotes() if not quote_expired(q)]
+            quotes.append(quote)
+            self.db.save_quotes(quotes)
+        return quote
+    
+    @log_action('CONFIRM_QUOTE')
+    def confirm_quote(self, quote_id):
+        """Исполняет свою котировку по зафиксированному курсу, если она не истекла."""
+        if not session.is_logged_in():
+            raise NotLoggedInError("Вы не вошли в систему")
+        
+        user_id = session.get_user_id()
+        # Котировка одноразовая: удаляется и при исполнении, и если истекла.
+        # Поиск и удаление — под блокировкой, чтобы два параллельных
+        # confirm не исполнили одну котировку дважды
+        with self.db.lock("quotes"):
+            quotes = self.db.get_quotes()
+            for i, quote in enumerate(quotes):
+                if quote['quote_id'] == quote_id and quote['user_id'] == user_id:
+                    break
+            else:
+                raise MyError(f"Котировка '{quote_id}' не найдена")
+            del quotes[i]
+            self.db.save_quotes(quotes)
+        
+        if quote_expired(quote):
+            raise MyError(f"Котировка '{quote_id}' истекла в {quote['expires_at']}")
         
-        # Проверяем хватает ли USD
-        if usd_wallet.balance < cost:
-            raise NotEnoughMoneyError(usd_wallet.balance, cost, 'USD')
+        execute = self._execute_buy if quote['side'] == 'buy' else self._execute_sell
+        return execute(user_id, quote['currency'], quote['amount'], quote['rate'],
+                       rates_version=quote['rates_version'], quote_id=quote_id)
+    
+    def _execute_buy(self, user_id, currency, amount, rate, **extra):
+        """Покупка по заданному курсу для пользователя user_id."""
+        cost = amount * rate
         
-        # Выполняем
-        usd_wallet.take_money(cost)
-        wallet.add_money(amount)
+        def buy(portfolio):
+            # Нужен USD кошелек для оплаты
+            usd_wallet = portfolio.get_wallet('USD')
+            if not usd_wallet:
+                raise NotEnoughMoneyError(0, 1, 'USD')
+            
+            # Проверяем хватает ли USD
+            if usd_wallet.balance < cost:
+                raise NotEnoughMoneyError(usd_wallet.balance, cost, 'USD')
+            
+            # Получаем или создаем кошелек
+            wallet = portfolio.get_wallet(currency)
+            if not wallet:
+                wallet = portfolio.add_wallet(currency)
+            
+            # Выполняем
+            usd_wallet.take_money(cost)
+            wallet.add_money(amount)
+            if wallet.basis is not None:
+                wallet.basis.on_buy(amount, rate)
         
-        # Сохраняем
-        self.db.save_portfolio(portfolio.to_dict())
+        portfolio, _ = self._update_portfolio(user_id, buy)
+        self._record_trade(user_id, 'buy', currency, amount, rate, cost, **extra)
         
         return {
             'success': True,
             'currency': currency,
             'amount': amount,
             'cost': cost,
-            'new_balance': wallet.balance,
-            'usd_left': usd_wallet.balance
+            'rate': rate,
+            'rates_version': extra.get('rates_version'),
+            'new_balance': portfolio.get_wallet(currency).balance,
+            'usd_left': portfolio.get_wallet('USD').balance
         }
     
-    def sell(self, currency, amount):
-        """Продает валюту."""
-        # Проверяем вход
+    def _execute_sell(self, user_id, currency, amount, rate, **extra):
+        """Продажа по заданному курсу для пользователя user_id."""
+        revenue = amount * rate
+        
+        def sell(portfolio):
+            # Проверяем кошелек
+            wallet = portfolio.get_wallet(currency)
+            if not wallet:
+                raise NotEnoughMoneyError(0, amount, currency)
+            
+            # Проверяем хватает ли валюты
+            if wallet.balance < amount:
+                raise NotEnoughMoneyError(wallet.balance, amount, currency)
+            
+            # USD кошелек для получения денег
+            usd_wallet = portfolio.get_wallet('USD')
+            if not usd_wallet:
+                usd_wallet = portfolio.add_wallet('USD')
+            
+            # Выполняем
+            wallet.take_money(amount)
+            usd_wallet.add_money(revenue)
+            if wallet.basis is not None:
+                return wallet.basis.on_sell(amount, rate)
+            return None
+        
+        portfolio, realized = self._update_portfolio(user_id, sell)
+        self._record_trade(user_id, 'sell', currency, amount, rate, revenue,
+                           realized=realized, **extra)
+        
+        return {
+            'success': True,
+            'currency': currency,
+            'amount': amount,
+            'revenue': revenue,
+            'rate': rate,
+            'rates_version': extra.get('rates_version'),
+            'new_balance': portfolio.get_wallet(currency).balance,
+            'usd_now': portfolio.get_wallet('USD').balance,
+            'realized': realized
+        }
+    
+    
+    def place_order(self, side, order_type, currency, amount, price):
+        """Выставляет отложенный limit/stop ордер (цена в USD)."""
         if not session.is_logged_in():
             raise NotLoggedInError("Вы не вошли в систему")
-        
+        if side not in SIDES:
+            raise MyError(f"Неизвестная сторона ордера: {side}")
+        if order_type not in ORDER_TYPES:
+            raise MyError(f"Неизвестный тип ордера: {order_type}")
         if amount <= 0:
             raise BadAmountError(f"Сумма должна быть > 0: {amount}")
+        if price <= 0:
+            raise BadAmountError(f"Цена должна быть > 0: {price}")
         
         currency = currency.upper()
+        if currency not in currency_codes():
+            raise CurrencyNotFoundError(currency)
+        order = {
+            'order_id': os.urandom(6).hex(),
+            'user_id': session.get_user_id(),
+            'side': side,
+            'type': order_type,
+            'currency': currency,
+            'pair': f"{currency}_USD",
+            'amount': amount,
+            'price': price,
+            'created_at': get_current_time()
+        }
+        
+        with self.db.lock("orders"):
+            orders = self.db.get_orders()
+            orders.append(order)
+            self.db.save_orders(orders)
+        return order
+    
+    def list_orders(self):
+        """Открытые ордера текущего пользователя."""
         user_id = session.get_user_id()
-        portfolio = self.get_portfolio(user_id)
+        return [o for o in self.db.get_orders() if o['user_id'] == user_id]
+    
+    def cancel_order(self, order_id):
+        """Отменяет свой открытый ордер."""
+        user_id = session.get_user_id()
+        with self.db.lock("orders"):
+            orders = self.db.get_orders()
+            for i, order in enumerate(orders):
+                if order['order_id'] == order_id and order['user_id'] == user_id:
+                    del orders[i]
+                    self.db.save_orders(orders)
+                    return order
+        raise MyError(f"Ордер '{order_id}' не найден")
+    
+    def _open_order_book(self):
+        """
+        Книга открытых ордеров. Она живет между обновлениями курсов и
+        перечитывается только после изменения файла ордеров (mtime и
+        размер), так что обновление стоит O(k log n), а не разбор и
+        heapify всех ордеров. Вызывается под db.lock("orders").
+        """
+        version = self.db.file_version("orders")
+        if self._order_book is None or self._order_book[0] != version:
+            self._order_book = (version, OrderBook(self.db.get_orders()))
+        return self._order_book[1]
+    
+    def match_orders(self, pairs, version=None):
+        """
+        Исполняет ордера, сработавшие на новом снимке курсов.
+        pairs — словарь пар из RatesUpdater.run_update, version — его версия.
+        """
+        with self.db.lock("orders"):
+            book = self._open_order_book()
+            if not book.orders:
+                return []
+            
+            results = []
+            try:
+                for pair, meta in pairs.items():
+                    rate = float(meta['rate'])
+                    for order in book.triggered(pair, rate):
+                        execute = self._execute_buy if order['side'] == 'buy' else self._execute_sell
+                        try:
+                            execute(order['user_id'], order['currency'], order['amount'], rate,
+                                    order_id=order['order_id'], rates_version=version)
+                            order['status'] = 'filled'
+                        except MyError as e:
+                            order['status'] = 'rejected'
+                            order['error'] = str(e)
+                        order['fill_rate'] = rate
+                        results.append(order)
+                
+                if results:
+                    self.db.save_orders(book.to_list())
+                    self._order_book = (self.db.file_version("orders"), book)
+            except BaseException:
+                # Книга уже не совпадает с файлом — перечитаем в следующий раз
+                self._order_book = None
+                raise
+        return results
+    
+    def add_alert(self, pair, condition, threshold):
+        """Добавляет одноразовый алерт: курс pair выше/ниже threshold."""
+        if not session.is_logged_in():
+            raise NotLoggedInError("Вы не вошли в систему")
+        if condition not in CONDITIONS:
+            raise MyError(f"Неизвестное условие: {condition}")
+        if threshold <= 0:
+            raise BadAmountError(f"Порог должен быть > 0: {threshold}")
         
-        # Проверяем кошелек
-        wallet = portfolio.get_wallet(currency)
-        if not wallet:
-            raise NotEnoughMoneyError(0, amount, currency)
+        pair = pair.upper()
+        if pair.count('_') != 1:
+            raise MyError(f"Пара должна быть в формате FROM_TO: {pair}")
         
-        # Проверяем хватает ли валюты
-        if wallet.balance < amount:
-            raise NotEnoughMoneyError(wallet.balance, amount, currency)
+        alert = {
+            'alert_id': os.urandom(6).hex(),
+            'user_id': session.get_user_id(),
+            'pair': pair,
+            'condition': condition,
+            'threshold': threshold,
+            'created_at': get_current_time()
+        }
+        with self.db.lock("alerts"):
+            alerts = self.db.get_alerts()
+            alerts.append(alert)
+            self.db.save_alerts(alerts)
+        return alert
+    
+    def list_alerts(self):
+        """Активные алерты текущего пользователя."""
+        user_id = session.get_user_id()
+        return [a for a in self.db.get_alerts() if a['user_id'] == user_id]
+    
+    def remove_alert(self, alert_id):
+        """Удаляет свой алерт."""
+        user_id = session.get_user_id()
+        with self.db.lock("alerts"):
+            alerts = self.db.get_alerts()
+            for i, alert in enumerate(alerts):
+                if alert['alert_id'] == alert_id and alert['user_id'] == user_id:
+                    del alerts[i]
+                    self.db.save_alerts(alerts)
+                    return alert
+        raise MyError(f"Алерт '{alert_id}' не найден")
+    
+    def _open_alert_index(self):
+        """
+        Индекс активных алертов. Как и книга ордеров, живет между
+        обновлениями курсов и перестраивается только после изменения
+        файла алертов. Вызывается под db.lock("alerts").
+        """
+        version = self.db.file_version("alerts")
+        if self._alert_index is None or self._alert_index[0] != version:
+            self._alert_index = (version, AlertIndex(self.db.get_alerts()))
+        return self._alert_index[1]
+    
+    def check_alerts(self, pairs, sink):
+        """Проверяет алерты по новому снимку курсов и доставляет сработавшие в sink."""
+        with self.db.lock("alerts"):
+            index = self._open_alert_index()
+            if not index.alerts:
+                return []
+            
+            fired = []
+            now = get_current_time()
+            try:
+                for pair, meta in pairs.items():
+                    rate = float(meta['rate'])
+                    for alert in index.evaluate(pair, rate):
+                        alert['rate'] = rate
+                        alert['fired_at'] = now
+                        fired.append(alert)
+                
+                if fired:
+                    sink.deliver(fired)
+                    self.db.save_alerts(index.to_list())
+                    self._alert_index = (self.db.file_version("alerts"), index)
+            except BaseException:
+                self._alert_index = None
+                raise
+        return fired
+    
+    def _record_trade(self, user_id, side, currency, amount, rate, cost, realized=None,
+                      order_id=None, rates_version=None, quote_id=None):
+        """Записывает сделку в журнал."""
+        trade = {
+            'trade_id': os.urandom(6).hex(),
+            'user_id': user_id,
+            'side': side,
+            'currency': currency,
+            'amount': amount,
+            'rate': rate,
+            'cost': cost,
+            'base': 'USD',
+            'timestamp': get_current_time()
+        }
+        if realized is not None:
+            trade['realized_pnl'] = realized
+        if order_id is not None:
+            trade['order_id'] = order_id
+        if rates_version is not None:
+            trade['rates_version'] = rates_version
+        if quote_id is not None:
+            trade['quote_id'] = quote_id
+        self.ledger.append(trade)
+        from .events import bus, TradeExecuted
+        bus.publish(TradeExecuted(trade))
+        return trade
+    
+    def _update_portfolio(self, user_id, mutate):
+        """
+        Весь цикл изменения портфеля — чтение, проверки и изменение
+        mutate(portfolio), запись — под блокировкой файла портфеля
+        (db.update_portfolio), так что параллельные сделки не затирают
+        друг друга. Объект из кеша берется, только если версия файла под
+        блокировкой совпадает с закешированной, иначе портфель читается
+        с диска. Исключение из mutate отменяет запись, а при любом сбое
+        портфель вытесняется из кеша. Возвращает (портфель, результат mutate).
+        """
+        outcome = []
         
-        # USD кошелек для получения денег
-        usd_wallet = portfolio.get_wallet('USD')
-        if not usd_wallet:
-            usd_wallet = portfolio.add_wallet('USD')
+        def update(data):
+            cached = self._portfolios.get(user_id)
+            if cached is not None and cached[0] == self.db.portfolio_version(user_id):
+                portfolio = cached[1]
+            else:
+                self._seed_cost_basis(data)
+                portfolio = Portfolio.from_dict(data)
+            outcome.append((portfolio, mutate(portfolio)))
+            data.clear()
+            data.update(portfolio.to_dict())
+            return True
         
-        # Простой курс для расчета
-        rates = {
-            'BTC': 50000.0,
-            'ETH': 3000.0,
-            'EUR': 1.08,
-            'RUB': 0.011
-        }
-        rate = rates.get(currency, 1.0)
-        revenue = amount * rate
+        try:
+            data, version = self.db.update_portfolio(user_id, update, create=True)
+        except BaseException:
+            # Объект из кеша мог измениться без записи на диск
+            self._portfolios.pop(user_id, None)
+            raise
+        portfolio, result = outcome[0]
+        self._cache_portfolio(user_id, version, portfolio)
+        from .events import bus, PortfolioChanged
+        bus.publish(PortfolioChanged(user_id, data))
+        return portfolio, result
+    
+    def get_trades(self, limit=50, page=1, since=None, until=None):
+        """История сделок текущего пользователя (новые сверху)."""
+        if not session.is_logged_in():
+            raise NotLoggedInError("Вы не вошли в систему")
+        if limit <= 0 or page <= 0:
+            raise MyError("limit и page должны быть положительными")
         
-        # Выполняем
-        wallet.take_money(amount)
-        usd_wallet.add_money(revenue)
+        user_id = session.get_user_id()
+        offset = (page - 1) * limit
         
-        # Сохраняем
-        self.db.save_portfolio(portfolio.to_dict())
+        if since is None and until is None:
+            # +1 запись, чтобы понять, есть ли следующая страница
+            trades = self.ledger.last(user_id, limit + 1, offset)
+        else:
+            trades = self.ledger.between(user_id, since, until)
+            trades.reverse()
+            trades = trades[offset:offset + limit + 1]
         
         return {
-            'success': True,
-            'currency': currency,
-            'amount': amount,
-            'revenue': revenue,
-            'new_balance': wallet.balance,
-            'usd_now': usd_wallet.balance
+            'user': session.current_user.username,
+            'page': page,
+            'trades': trades[:limit],
+            'has_more': len(trades) > limit
         }
     
+    def rates_snapshot(self):
+        """
+        Текущий срез курсов с версией (RatesSnapshot): одним согласованным
+        чтением rates.bin, если он есть, иначе из rates.json с дельтами.
+        """
+        if self._rates_view is None:
+            self._rates_view = RatesMmapReader(self.config.rates_binary_file)
+        if self._rates_view.seq:
+            version, pairs = self._rates_view.versioned_snapshot()
+            return RatesSnapshot(version, pairs)
+        
+        rates_data = self.db.get_rates()
+        if not isinstance(rates_data, dict):
+            return RatesSnapshot()
+        pairs = {}
+        for name, meta in (rates_data.get("pairs") or {}).items():
+            updated_at = meta.get("updated_at")
+            if updated_at:
+                updated_at = datetime.fromisoformat(updated_at.replace("Z", "+00:00")).timestamp()
+            pairs[name] = (float(meta["rate"]), updated_at or None)
+        return RatesSnapshot(int(rates_data.get("seq", 0)), pairs)
+    
+    @contextmanager
+    def pin_rates(self, snapshot=None):
+        """
+        Закрепляет срез курсов на время блока: get_rate, buy и sell внутри
+        берут курсы из него, не перечитывая файлы. Без аргумента берется
+        текущий срез (или уже закрепленный снаружи).
+        """
+        previous = self._pinned
+        if snapshot is None:
+            snapshot = previous or self.rates_snapshot()
+        self._pinned = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._pinned = previous
+    
+    def _rate_lookup(self):
+        """
+        Функция pair -> (курс, updated_at в секундах) | None.
+        Закрепленный срез, иначе бинарный снимок через mmap (без разбора
+        JSON), если его нет — rates.json с дельтами.
+        """
+        if self._pinned is not None:
+            return self._pinned.get
+        if self._rates_view is None:
+            self._rates_view = RatesMmapReader(self.config.rates_binary_file)
+        if self._rates_view.seq:
+            return self._rates_view.get
+
+        rates_data = self.db.get_rates()
+        pairs = {}
+        if isinstance(rates_data, dict):
+            pairs = rates_data.get("pairs") or {}
+
+        def lookup(name):
+            meta = pairs.get(name)
+            if meta is None:
+                return None
+            updated_at = meta.get("updated_at")
+            if updated_at:
+                updated_at = datetime.fromisoformat(updated_at.replace("Z", "+00:00")).timestamp()
+            return float(meta["rate"]), updated_at or None
+
+        return lookup
+
     def get_rate(self, from_curr, to_curr):
         """Получает курс (с учётом кэша rates.json и TTL)."""
         from_curr = str(from_curr).upper()
         to_curr = str(to_curr).upper()
 
-        # простая валидация кода (2–5, верхний регистр)
+        codes = currency_codes()
         for code in (from_curr, to_curr):
-            if not code.isalpha() or not (2 <= len(code) <= 5) or code != code.upper():
+            if code not in codes:
                 raise CurrencyNotFoundError(code)
 
         if from_curr == to_curr:
             return 1.0
 
         ttl = self.db.settings.get_rates_ttl()
-
-        def _parse_iso(s: str) -> datetime:
-            s = s.replace("Z", "+00:00")
-            return datetime.fromisoformat(s)
-
-        rates_data = self.db.get_rates()
-        pairs = {}
-        if isinstance(rates_data, dict):
-            pairs = rates_data.get("pairs") or {}
+        lookup = self._rate_lookup()
 
         pair = f"{from_curr}_{to_curr}"
-        if pair in pairs:
-            meta = pairs[pair]
-            rate = float(meta["rate"])
-            updated_at = meta.get("updated_at")
-            if updated_at:
-                age = (datetime.now(timezone.utc) - _parse_iso(updated_at).astimezone(timezone.utc)).total_seconds()
-                if age > ttl:
-                    raise ApiRequestError(f"кэш для {pair} устарел (старше {ttl} сек). Выполните update-rates")
-            return rate
-
         inv_pair = f"{to_curr}_{from_curr}"
-        if inv_pair in pairs:
-            meta = pairs[inv_pair]
-            inv_rate = float(meta["rate"])
-            updated_at = meta.get("updated_at")
-            if updated_at:
-                age = (datetime.now(timezone.utc) - _parse_iso(updated_at).astimezone(timezone.utc)).total_seconds()
-                if age > ttl:
-                    raise ApiRequestError(f"кэш для {inv_pair} устарел (старше {ttl} сек). Выполните update-rates")
-            if inv_rate == 0:
-                raise ApiRequestError(f"некорректный курс в кеше для {inv_pair}")
-            return 1.0 / inv_rate
+        for name, inverse in ((pair, False), (inv_pair, True)):
+            found = lookup(name)
+            if found is None:
+                continue
+            rate, updated_at = found
+            if updated_at is not None and time.time() - updated_at > ttl:
+                metrics.counter("rates_cache_stale_total").inc()
+                raise ApiRequestError(f"кэш для {name} устарел (старше {ttl} сек). Выполните update-rates")
+            if inverse:
+                if rate == 0:
+                    raise ApiRequestError(f"некорректный курс в кеше для {name}")
+                rate = 1.0 / rate
+            metrics.counter("rates_cache_hits_total").inc()
+            return rate
+        
+        metrics.counter("rates_cache_misses_total").inc()
 
         fixed = {
             "EUR_USD": 1.08,
@@ -348,21 +1002,48 @@ class AppLogic:
             raise BadAmountError("Сумма должна быть положительной")
         
         currency = currency.upper()
+        if currency not in currency_codes():
+            raise CurrencyNotFoundError(currency)
         user_id = session.get_user_id()
-        portfolio = self.get_portfolio(user_id)
-        
-        wallet = portfolio.get_wallet(currency)
-        if not wallet:
-            wallet = portfolio.add_wallet(currency)
         
-        old = wallet.balance
-        wallet.add_money(amount)
+        def deposit(portfolio):
+            wallet = portfolio.get_wallet(currency)
+            if not wallet:
+                wallet = portfolio.add_wallet(currency)
+            
+            old = wallet.balance
+            wallet.add_money(amount)
+            if wallet.basis is not None and currency != 'USD':
+                # Пополнение учитываем как покупку по текущему курсу. Без
+                # курса лот не заводится, но зачисление не отменяется
+                price = self._value_rate(currency, 'USD')
+                if price is None:
+                    logger.warning("Пополнение %s %s без учета себестоимости: нет курса к USD",
+                                   amount, currency)
+                else:
+                    wallet.basis.on_buy(amount, price)
+            return old
         
-        self.db.save_portfolio(portfolio.to_dict())
+        portfolio, old = self._update_portfolio(user_id, deposit)
         
         return {
             'currency': currency,
             'added': amount,
             'was': old,
-            'now': wallet.balance
-        }
\ No newline at end of file
+            'now': portfolio.get_wallet(currency).balance
+        }
+
+
+# Меньше этого числа паролей пул процессов не окупает свой запуск
+_POOL_THRESHOLD = 2000
+
+
+def _hash_passwords(passwords, workers=None):
+    """[(hashed_password, salt)] для списка паролей, крупные пачки — в пуле процессов."""
+    if workers == 1 or len(passwords) < _POOL_THRESHOLD:
+        return [hash_password(password) for password in passwords]
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=chunksize))
@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-import hashlib
 import json
-import secrets
+import os
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+from ..metrics import metrics
+
 
 def get_current_time() -> str:
     """Текущее время в ISO формате (UTC)."""
@@ -21,6 +22,9 @@ def hash_password(password: str, salt: str | None = None) -> tuple[str, str]:
     if not isinstance(password, str) or len(password) < 4:
         raise ValueError("Пароль должен быть не короче 4 символов")
 
+    import hashlib
+    import secrets
+
     if salt is None:
         salt = secrets.token_hex(4)
 
@@ -37,10 +41,17 @@ def get_next_id(items: list[dict[str, Any]], key: str = "user_id") -> int:
 
 
 def load_json(path: str) -> Any:
+    with metrics.timer("json_load_seconds"):
+        return _load_json(path)
+
+
+def _load_json(path: str) -> Any:
     file_path = Path(path)
     if not file_path.exists():
         return {}
 
+    metrics.counter("json_read_bytes_total").inc(file_path.stat().st_size)
+
     for encoding in ("utf-8", "utf-8-sig", "utf-16"):
         try:
             with file_path.open("r", encoding=encoding) as f:
@@ -60,11 +71,44 @@ def load_json(path: str) -> Any:
     return {}
 
 
-def save_json(path: str, data: Any) -> None:
+def load_json_lines(path: str) -> list[Any]:
+    """Читает JSON-lines файл, пропуская пустые и битые строки."""
     file_path = Path(path)
-    file_path.parent.mkdir(parents=True, exist_ok=True)
-    with file_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    if not file_path.exists():
+        return []
+
+    items = []
+    with file_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return items
+
+
+def save_json(path: str, data: Any) -> None:
+    """
+    Записывает JSON атомарно: текст пишется во временный файл рядом и
+    подменяет path через os.replace, так что читатель без блокировки
+    видит либо старую, либо новую версию, но не обрезанный файл.
+    """
+    with metrics.timer("json_save_seconds"):
+        file_path = Path(path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        text = json.dumps(data, ensure_ascii=False, indent=2)
+        tmp = file_path.with_name(file_path.name + f".{os.getpid()}.tmp")
+        try:
+            with tmp.open("w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp, file_path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        metrics.counter("json_written_bytes_total").inc(len(text.encode("utf-8")))
 
 def verify_password(password: str, hashed_password: str, salt: str) -> bool:
 
@@ -1,7 +1,17 @@
 import functools
+import json
 import time
-from datetime import datetime
-from .infra.settings import settings
+from datetime import datetime, timezone
+from .metrics import metrics
+
+
+def _current_user():
+    """(user_id, username) из текущей сессии или (None, None)."""
+    from .core.session import session
+    user = session.current_user
+    if user is None:
+        return None, None
+    return user.user_id, user.username
 
 
 def log_action(action_name=None, verbose=False):
@@ -12,33 +22,23 @@ def log_action(action_name=None, verbose=False):
             action = action_name or func.__name__.upper()
             
             log_info = {
+                'ts': datetime.now(timezone.utc).isoformat(),
                 'action': action,
-                'timestamp': datetime.now().isoformat(),
-                'function': func.__name__
+                'function': func.__name__,
+                'user_id': None,
+                'username': None,
+                'status': None,
+                'duration_ms': 0.0,
+                'error': None,
+                'error_class': None
             }
             
-            try:
-                # Ищем username в аргументах
-                if args and len(args) > 1:
-                    if 'username' in str(args[1:]):
-                        for arg in args[1:]:
-                            if isinstance(arg, str):
-                                log_info['username'] = arg
-                                break
-                
-                if 'username' in kwargs:
-                    log_info['username'] = kwargs['username']
-            except Exception:
-                pass
-            
             # Добавляем аргументы если verbose
             if verbose:
                 log_info['args'] = str(args)
                 log_info['kwargs'] = str(kwargs)
             
-            start_time = time.time()
-            result = None
-            error = None
+            start_time = time.perf_counter_ns()
             
             try:
                 # Выполняем функцию
@@ -54,10 +54,16 @@ def log_action(action_name=None, verbose=False):
             except Exception as e:
                 log_info['status'] = 'ERROR'
                 log_info['error'] = str(e)
+                log_info['error_class'] = type(e).__name__
                 raise
                 
             finally:
-                log_info['duration_ms'] = int((time.time() - start_time) * 1000)
+                elapsed_ns = time.perf_counter_ns() - start_time
+                log_info['duration_ms'] = round(elapsed_ns / 1e6, 3)
+                metrics.histogram('action_duration_seconds', action=action).observe_ns(elapsed_ns)
+                # Пользователь берется из сессии после вызова,
+                # чтобы login/register записались на вошедшего пользователя
+                log_info['user_id'], log_info['username'] = _current_user()
                 
                 _write_log(log_info)
         
@@ -66,31 +72,11 @@ def log_action(action_name=None, verbose=False):
 
 
 def _write_log(log_info):
-    """Записывает лог в файл."""
+    """Отправляет JSON-строку в логгер действий (запись в файл — в фоне)."""
     try:
-        log_file = settings.get('log_file', 'logs/app.log')
-
-        import os
-
-        log_dir = os.path.dirname(log_file)
-        
-        os.makedirs(log_dir, exist_ok=True)
-        
-        # Форматируем запись
-        timestamp = log_info.get('timestamp', datetime.now().isoformat())
-        action = log_info.get('action', 'UNKNOWN')
-        status = log_info.get('status', 'UNKNOWN')
-        username = log_info.get('username', 'unknown')
-        duration = log_info.get('duration_ms', 0)
-        
-        log_line = f"{timestamp} | {action} | user={username} | status={status} | time={duration}ms"
-        
-        if 'error' in log_info:
-            log_line += f" | error={log_info['error']}"
-        
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(log_line + '\n')
-            
+        # logging настраивается при первой записи, а не при импорте
+        from .logging_config import get_action_logger
+        get_action_logger().info(json.dumps(log_info, ensure_ascii=False))
     except Exception:
         pass
 
@@ -0,0 +1,215 @@
+"""
+Выгрузка портфелей, курсов и истории в CSV или компактный колоночный
+формат (VTCF). Строки приходят итератором и пишутся группами по
+chunk_size, поэтому память не зависит от объема данных.
+
+Формат VTCF (все числа little-endian):
+    b"VTCF", uint16 версия, uint32 длина схемы, схема (JSON:
+    {"dataset", "columns": [[имя, тип], ...]}), затем группы строк:
+    uint32 число строк, и для каждой колонки — uint8 кодировка,
+    uint32 длина, данные. Группа с 0 строк завершает файл.
+    Кодировки: int — int64, float — float64 (None -> NaN), str — словарь
+    (uint16 индексы) при повторяющихся значениях, иначе смещения + UTF-8.
+"""
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import math
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import islice
+from typing import Any, BinaryIO, Iterable, Iterator
+
+SCHEMAS: dict[str, tuple[tuple[str, str], ...]] = {
+    "portfolios": (
+        ("user_id", "int"), ("currency", "str"), ("balance", "float"),
+        ("value", "float"), ("base", "str"),
+    ),
+    "rates": (
+        ("pair", "str"), ("from_currency", "str"), ("to_currency", "str"),
+        ("rate", "float"), ("updated_at", "str"), ("source", "str"), ("version", "int"),
+    ),
+    "history": (
+        ("id", "str"), ("from_currency", "str"), ("to_currency", "str"),
+        ("rate", "float"), ("timestamp", "str"), ("source", "str"),
+    ),
+}
+
+FORMATS = ("csv", "columnar")
+
+MAGIC = b"VTCF"
+VERSION = 1
+
+ENC_INT64 = 0
+ENC_FLOAT64 = 1
+ENC_STR_PLAIN = 2
+ENC_STR_DICT = 3
+
+_U32 = struct.Struct("<I")
+_COLUMN = struct.Struct("<BI")
+
+# Скорость важнее степени сжатия: уровень 1 сжимает CSV в разы
+# при пропускной способности в десятки МБ/с
+GZIP_LEVEL = 1
+
+
+def _array(typecode: str, values: Iterable) -> array:
+    data = array(typecode, values)
+    if sys.byteorder != "little":
+        data.byteswap()
+    return data
+
+
+def _encode_strings(values: list[str]) -> bytes:
+    blobs = [v.encode("utf-8") for v in values]
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return _array("I", offsets).tobytes() + b"".join(blobs)
+
+
+def _decode_strings(data: bytes, count: int) -> list[str]:
+    offsets = array("I")
+    offsets.frombytes(data[:4 * (count + 1)])
+    if sys.byteorder != "little":
+        offsets.byteswap()
+    blob = data[4 * (count + 1):]
+    return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(count)]
+
+
+def _encode_column(kind: str, values: list) -> tuple[int, bytes]:
+    if kind == "int":
+        return ENC_INT64, _array("q", (int(v or 0) for v in values)).tobytes()
+    if kind == "float":
+        return ENC_FLOAT64, _array("d", (math.nan if v is None else float(v) for v in values)).tobytes()
+
+    values = ["" if v is None else str(v) for v in values]
+    index: dict[str, int] = {}
+    for v in values:
+        if v not in index:
+            index[v] = len(index)
+            if len(index) > 65535:
+                break
+    if len(index) <= min(65535, len(values) // 2):
+        return ENC_STR_DICT, (_U32.pack(len(index)) + _encode_strings(list(index))
+                              + _array("H", (index[v] for v in values)).tobytes())
+    return ENC_STR_PLAIN, _encode_strings(values)
+
+
+def _decode_column(encoding: int, data: bytes, count: int) -> list:
+    if encoding in (ENC_INT64, ENC_FLOAT64):
+        values = array("q" if encoding == ENC_INT64 else "d")
+        values.frombytes(data)
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values.tolist()
+    if encoding == ENC_STR_PLAIN:
+        return _decode_strings(data, count)
+    if encoding == ENC_STR_DICT:
+        (size,) = _U32.unpack_from(data, 0)
+        dict_len = _U32.unpack_from(data, 4 + 4 * size)[0]
+        dictionary = _decode_strings(data[4:4 + 4 * (size + 1) + dict_len], size)
+        indices = array("H")
+        indices.frombytes(data[4 + 4 * (size + 1) + dict_len:])
+        if sys.byteorder != "little":
+            indices.byteswap()
+        return [dictionary[i] for i in indices]
+    raise ValueError(f"неизвестная кодировка колонки: {encoding}")
+
+
+class CsvExporter:
+    """CSV с заголовком; строки пишутся группами."""
+
+    def __init__(self, stream: BinaryIO, dataset: str) -> None:
+        self.text = io.TextIOWrapper(stream, encoding="utf-8", newline="", write_through=False)
+        self.writer = csv.writer(self.text)
+        self.writer.writerow([name for name, _ in SCHEMAS[dataset]])
+
+    def write_chunk(self, rows: list[tuple]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.text.flush()
+        self.text.detach()
+
+
+class ColumnarExporter:
+    """Колоночный VTCF: каждая группа строк раскладывается по колонкам."""
+
+    def __init__(self, stream: BinaryIO, dataset: str) -> None:
+        self.stream = stream
+        self.columns = SCHEMAS[dataset]
+        schema = json.dumps({"dataset": dataset, "columns": self.columns}).encode("utf-8")
+        stream.write(MAGIC + struct.pack("<H", VERSION) + _U32.pack(len(schema)) + schema)
+
+    def write_chunk(self, rows: list[tuple]) -> None:
+        if not rows:
+            return
+        parts = [_U32.pack(len(rows))]
+        for (_, kind), values in zip(self.columns, zip(*rows)):
+            encoding, data = _encode_column(kind, list(values))
+            parts.append(_COLUMN.pack(encoding, len(data)))
+            parts.append(data)
+        self.stream.write(b"".join(parts))
+
+    def close(self) -> None:
+        self.stream.write(_U32.pack(0))
+
+
+def read_columnar(path: str) -> Iterator[dict[str, list]]:
+    """Группы строк VTCF-файла (gzip распознается сам): {колонка: значения}."""
+    with open(path, "rb") as raw:
+        gzipped = raw.read(2) == b"\x1f\x8b"
+    with (gzip.open(path, "rb") if gzipped else open(path, "rb")) as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path}: не VTCF-файл")
+        (version,) = struct.unpack("<H", f.read(2))
+        if version != VERSION:
+            raise ValueError(f"{path}: неподдерживаемая версия VTCF {version}")
+        (schema_len,) = _U32.unpack(f.read(4))
+        columns = json.loads(f.read(schema_len))["columns"]
+        while True:
+            (count,) = _U32.unpack(f.read(4))
+            if count == 0:
+                return
+            group = {}
+            for name, _ in columns:
+                encoding, size = _COLUMN.unpack(f.read(_COLUMN.size))
+                group[name] = _decode_column(encoding, f.read(size), count)
+            yield group
+
+
+def export_rows(rows: Iterable[tuple], dataset: str, path: str, fmt: str = "csv",
+                compress: bool = False, chunk_size: int = 10000) -> dict[str, Any]:
+    """
+    Пишет строки набора dataset в path; возвращает
+    {"rows", "bytes" (размер файла), "seconds"}.
+    """
+    if dataset not in SCHEMAS:
+        raise ValueError(f"неизвестный набор данных: {dataset}")
+    if fmt not in FORMATS:
+        raise ValueError(f"неизвестный формат: {fmt}")
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    total = 0
+    with open(path, "wb") as raw:
+        stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=GZIP_LEVEL) if compress else raw
+        exporter = (CsvExporter if fmt == "csv" else ColumnarExporter)(stream, dataset)
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, max(chunk_size, 1)))
+            if not chunk:
+                break
+            exporter.write_chunk(chunk)
+            total += len(chunk)
+        exporter.close()
+        if compress:
+            stream.close()
+    return {"rows": total, "bytes": os.path.getsize(path), "seconds": time.perf_counter() - start}
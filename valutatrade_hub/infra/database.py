@@ -1,23 +1,89 @@
+import contextlib
+import os
+import shutil
+import zlib
 from .settings import SettingsLoader
+from .storage import FileLock, iter_json_array
+from .ids import IdAllocator
+from ..metrics import metrics
 
 
 
 class Database:
-    def __init__(self, data_folder: str = "data"):
-        self.data_folder = data_folder
+    def __init__(self, data_folder: str | None = None, config=None):
+        """
+        config — снимок настроек (Settings); пути к файлам берутся
+        из него один раз здесь, а не на каждом обращении.
+        """
         self.settings = SettingsLoader()
+        config = config or self.settings.snapshot()
+        self.data_folder = data_folder or config.data_dir
+        self.paths = {
+            name: os.path.join(self.data_folder, f"{name}.json")
+            for name in ("users", "portfolios", "rates", "orders", "alerts")
+        }
+        self.rates_binary_file = os.path.join(self.data_folder, "rates.bin")
+        ids_file = os.path.join(self.data_folder, "ids.json")
+        if data_folder is None:
+            self.paths.update(users=config.users_file,
+                              portfolios=config.portfolios_file,
+                              rates=config.rates_file)
+            self.rates_binary_file = config.rates_binary_file
+            ids_file = config.ids_file
+        self.ids = IdAllocator(ids_file, config.id_block_size)
+        self._shards = None
+        self._held = set()
 
+    def _path(self, name):
+        path = self.paths.get(name)
+        if path is None:
+            path = self.paths[name] = os.path.join(self.data_folder, f"{name}.json")
+        return path
+
+    @contextlib.contextmanager
+    def lock(self, name):
+        """
+        Блокировка data/<name>.json на время чтения-изменения-записи.
+        Повторный захват тем же объектом не ждет сам себя, поэтому
+        save_* внутри уже взятой блокировки работают как обычно.
+        """
+        if name in self._held:
+            yield
+            return
+        with FileLock(self._path(name)):
+            self._held.add(name)
+            try:
+                yield
+            finally:
+                self._held.discard(name)
+
+    def file_version(self, name):
+        """Версия data/<name>.json — (mtime_ns, размер); None, если файла нет."""
+        try:
+            st = os.stat(self._path(name))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self, name):
+        """Читает data/<name>.json с замером времени."""
+        from ..core.utils import load_json
+        with metrics.timer("db_read_seconds", file=name):
+            return load_json(self._path(name))
     
+    def _save(self, name, data):
+        """Записывает data/<name>.json с замером времени."""
+        from ..core.utils import save_json
+        with metrics.timer("db_write_seconds", file=name):
+            return save_json(self._path(name), data)
     
     def get_all_users(self):
         """Получает всех пользователей."""
-        from ..core.utils import load_json
-        return load_json(f"{self.data_folder}/users.json")
+        return self._load("users")
     
     def save_users(self, users):
         """Сохраняет пользователей."""
-        from ..core.utils import save_json
-        return save_json(f"{self.data_folder}/users.json", users)
+        return self._save("users", users)
     
     def find_user(self, username):
         """Ищет пользователя по имени."""
@@ -28,57 +94,301 @@ class Database:
         return None
     
     def add_user(self, user_data):
-        """Добавляет нового пользователя."""
-        users = self.get_all_users()
-        users.append(user_data)
-        return self.save_users(users)
+        """Добавляет нового пользователя; False, если имя уже занято."""
+        return bool(self.add_users([user_data]))
     
-    # === Портфели ===
+    def add_users(self, new_users):
+        """
+        Дописывает пользователей одной записью под блокировкой users.json.
+        Занятые имена (в том числе параллельной регистрацией после
+        проверки вызывающим) пропускаются; возвращает добавленных.
+        """
+        with FileLock(self._path("users")):
+            users = self.get_all_users()
+            if not isinstance(users, list):
+                users = []
+            taken = {user.get('username') for user in users}
+            added = []
+            for user in new_users:
+                if user.get('username') not in taken:
+                    taken.add(user.get('username'))
+                    added.append(user)
+            if added:
+                users.extend(added)
+                self.save_users(users)
+            return added
     
-    def get_all_portfolios(self):
-        """Получает все портфели."""
-        from ..core.utils import load_json
-        return load_json(f"{self.data_folder}/portfolios.json")
+    def allocate_user_ids(self, count=1):
+        """
+        Первый из count новых user_id. Счетчик ведется в ids.json; при
+        первом обращении он заводится от максимального id в users.json.
+        """
+        from ..core.utils import get_next_id
+
+        def seed():
+            users = self.get_all_users()
+            return get_next_id(users if isinstance(users, list) else [])
+
+        return self.ids.allocate("user_id", count, seed)
     
-    def save_portfolios(self, portfolios):
-        """Сохраняет портфели."""
+    # === Портфели ===
+    #
+    # Два формата: один файл portfolios.json или N шардов
+    # portfolios/shard_<k>.json (k = user_id % N) со своей блокировкой у
+    # каждого. Число шардов записано в portfolios/meta.json; перейти между
+    # форматами можно командой reshard.
+
+    def _shard_dir(self):
+        return os.path.splitext(self._path("portfolios"))[0]
+
+    def portfolio_shards(self):
+        """Число шардов портфелей (0 — один файл portfolios.json)."""
+        if self._shards is None:
+            from ..core.utils import load_json
+            meta = load_json(os.path.join(self._shard_dir(), "meta.json"))
+            shards = meta.get("shards", 0) if isinstance(meta, dict) else 0
+            self._shards = shards if isinstance(shards, int) and shards > 1 else 0
+        return self._shards
+
+    def _shard_of(self, user_id, shards):
+        if isinstance(user_id, int):
+            return user_id % shards
+        return zlib.crc32(str(user_id).encode("utf-8")) % shards
+
+    def _shard_path(self, k):
+        return os.path.join(self._shard_dir(), f"shard_{k}.json")
+
+    def _portfolio_file(self, user_id):
+        """Файл, в котором лежит портфель user_id."""
+        shards = self.portfolio_shards()
+        if not shards:
+            return self._path("portfolios")
+        return self._shard_path(self._shard_of(user_id, shards))
+
+    def _load_portfolio_file(self, path, label):
+        from ..core.utils import load_json
+        with metrics.timer("db_read_seconds", file=label):
+            data = load_json(path)
+        return data if isinstance(data, list) else []
+
+    def _save_portfolio_file(self, path, label, portfolios):
         from ..core.utils import save_json
-        return save_json(f"{self.data_folder}/portfolios.json", portfolios)
+        with metrics.timer("db_write_seconds", file=label):
+            return save_json(path, portfolios)
+
+    def get_all_portfolios(self):
+        """Получает все портфели (из всех шардов)."""
+        shards = self.portfolio_shards()
+        if not shards:
+            return self._load("portfolios")
+        portfolios = []
+        for k in range(shards):
+            portfolios.extend(self._load_portfolio_file(self._shard_path(k), "portfolios_shard"))
+        return portfolios
+
+    def iter_portfolios(self):
+        """
+        Портфели по одному, без загрузки всех сразу: шарды читаются по
+        очереди, единый файл — потоковым разбором JSON-массива.
+        """
+        shards = self.portfolio_shards()
+        if not shards:
+            yield from iter_json_array(self._path("portfolios"))
+            return
+        for k in range(shards):
+            yield from self._load_portfolio_file(self._shard_path(k), "portfolios_shard")
     
+    def add_portfolios(self, new_portfolios):
+        """
+        Добавляет портфели (с тем же user_id — заменяет). Каждый
+        затронутый файл читается и записывается под своей блокировкой,
+        так что параллельные сделки в нем не затираются.
+        """
+        label = "portfolios_shard" if self.portfolio_shards() else "portfolios"
+        buckets = {}
+        for port in new_portfolios:
+            buckets.setdefault(self._portfolio_file(port.get('user_id')), []).append(port)
+        for path, bucket in buckets.items():
+            ids = {port.get('user_id') for port in bucket}
+            with FileLock(path):
+                portfolios = [port for port in self._load_portfolio_file(path, label)
+                              if port.get('user_id') not in ids]
+                portfolios.extend(bucket)
+                self._save_portfolio_file(path, label, portfolios)
+
     def get_portfolio(self, user_id):
-        """Получает портфель пользователя."""
-        portfolios = self.get_all_portfolios()
-        for port in portfolios:
+        """Получает портфель пользователя (читается только его шард)."""
+        label = "portfolios_shard" if self.portfolio_shards() else "portfolios"
+        for port in self._load_portfolio_file(self._portfolio_file(user_id), label):
             if port.get('user_id') == user_id:
                 return port
         return None
-    
+
+    def portfolio_version(self, user_id):
+        """
+        Версия файла с портфелем user_id — (mtime_ns, размер) — для
+        проверки кешей без чтения файла; None, если файла нет.
+        """
+        try:
+            st = os.stat(self._portfolio_file(user_id))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
     def save_portfolio(self, portfolio_data):
-        """Сохраняет или обновляет портфель."""
-        portfolios = self.get_all_portfolios()
+        """
+        Сохраняет или обновляет портфель (перезаписывается только его шард).
+        Возвращает версию файла сразу после записи (см. portfolio_version).
+        """
         user_id = portfolio_data['user_id']
-        
-        # Ищем старый портфель
-        found = False
-        for i, port in enumerate(portfolios):
-            if port.get('user_id') == user_id:
-                portfolios[i] = portfolio_data
-                found = True
-                break
-        
-        if not found:
-            portfolios.append(portfolio_data)
-        
-        return self.save_portfolios(portfolios)
-    
+        path = self._portfolio_file(user_id)
+        label = "portfolios_shard" if self.portfolio_shards() else "portfolios"
+
+        with FileLock(path):
+            portfolios = self._load_portfolio_file(path, label)
+
+            # Ищем старый портфель
+            found = False
+            for i, port in enumerate(portfolios):
+                if port.get('user_id') == user_id:
+                    portfolios[i] = portfolio_data
+                    found = True
+                    break
+
+            if not found:
+                portfolios.append(portfolio_data)
+
+            self._save_portfolio_file(path, label, portfolios)
+            return self.portfolio_version(user_id)
+
+    def update_portfolio(self, user_id, update, create=False):
+        """
+        Читает, меняет и записывает портфель user_id под блокировкой его
+        файла, чтобы не затереть сделку другого процесса. update(data)
+        меняет словарь на месте и возвращает True, если есть что сохранять;
+        исключение из update отменяет запись. create — если портфеля нет,
+        update получает пустой, и он дописывается в файл при изменении.
+        Возвращает (портфель или None, версия файла).
+        """
+        path = self._portfolio_file(user_id)
+        label = "portfolios_shard" if self.portfolio_shards() else "portfolios"
+
+        with FileLock(path):
+            portfolios = self._load_portfolio_file(path, label)
+            port = next((p for p in portfolios if p.get('user_id') == user_id), None)
+            new = port is None
+            if new:
+                if not create:
+                    return None, self.portfolio_version(user_id)
+                port = {'user_id': user_id, 'wallets': {}}
+            if update(port):
+                if new:
+                    portfolios.append(port)
+                self._save_portfolio_file(path, label, portfolios)
+            return port, self.portfolio_version(user_id)
+
+    def reshard(self, shards):
+        """
+        Перекладывает портфели в shards шардов (0 или 1 — обратно в один
+        файл). На время переноса захватываются блокировки всех старых
+        файлов, так что параллельные сделки подождут; запускать, когда
+        других долгоживущих процессов приложения нет (число шардов они
+        запоминают при старте). Возвращает число перенесенных портфелей.
+        """
+        from ..core.utils import save_json
+        shards = shards if shards > 1 else 0
+        old = self.portfolio_shards()
+        old_paths = [self._shard_path(k) for k in range(old)] if old else [self._path("portfolios")]
+        shard_dir = self._shard_dir()
+
+        with contextlib.ExitStack() as stack:
+            for path in old_paths:
+                stack.enter_context(FileLock(path))
+            portfolios = self.get_all_portfolios()
+
+            if shards:
+                # Новый набор шардов собирается рядом и подменяет старый
+                tmp_dir = shard_dir + ".new"
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                buckets = [[] for _ in range(shards)]
+                for port in portfolios:
+                    buckets[self._shard_of(port.get('user_id'), shards)].append(port)
+                for k, bucket in enumerate(buckets):
+                    save_json(os.path.join(tmp_dir, f"shard_{k}.json"), bucket)
+                save_json(os.path.join(tmp_dir, "meta.json"), {"shards": shards, "scheme": "user_id % shards"})
+                if old:
+                    # lock-файлы старых шардов лежат внутри каталога
+                    for name in os.listdir(tmp_dir):
+                        os.replace(os.path.join(tmp_dir, name), os.path.join(shard_dir, name))
+                    os.rmdir(tmp_dir)
+                    for k in range(shards, old):
+                        os.remove(self._shard_path(k))
+                else:
+                    shutil.rmtree(shard_dir, ignore_errors=True)
+                    os.replace(tmp_dir, shard_dir)
+                    if os.path.exists(self._path("portfolios")):
+                        os.remove(self._path("portfolios"))
+            else:
+                save_json(self._path("portfolios"), portfolios)
+                if old:
+                    os.remove(os.path.join(shard_dir, "meta.json"))
+                    for path in old_paths:
+                        os.remove(path)
+
+        if not shards and old:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+        self._shards = shards
+        return len(portfolios)
+
     # === Курсы ===
     
     def get_rates(self):
-        """Получает курсы валют."""
-        from ..core.utils import load_json
-        return load_json(f"{self.data_folder}/rates.json")
+        """Получает курсы валют (снимок с примененными дельтами)."""
+        from ..parser_service.storage import load_rates_snapshot
+        with metrics.timer("db_read_seconds", file="rates"):
+            return load_rates_snapshot(self._path("rates"))
     
     def save_rates(self, rates):
-        """Сохраняет курсы."""
-        from ..core.utils import save_json
-        return save_json(f"{self.data_folder}/rates.json", rates)
\ No newline at end of file
+        """Сохраняет курсы (полный снимок: накопленные дельты и бинарная копия больше не нужны)."""
+        from ..parser_service.storage import delta_path
+        result = self._save("rates", rates)
+        delta_path(self._path("rates")).unlink(missing_ok=True)
+        if os.path.exists(self.rates_binary_file):
+            os.remove(self.rates_binary_file)
+        return result
+    
+    # === Ордера ===
+    
+    def get_orders(self):
+        """Получает открытые ордера."""
+        orders = self._load("orders")
+        return orders if isinstance(orders, list) else []
+    
+    def save_orders(self, orders):
+        """Сохраняет открытые ордера (под блокировкой файла)."""
+        with self.lock("orders"):
+            return self._save("orders", orders)
+    
+    # === Котировки ===
+    
+    def get_quotes(self):
+        """Выданные и еще не подтвержденные котировки."""
+        quotes = self._load("quotes")
+        return quotes if isinstance(quotes, list) else []
+    
+    def save_quotes(self, quotes):
+        """Сохраняет котировки (под блокировкой файла)."""
+        with self.lock("quotes"):
+            return self._save("quotes", quotes)
+    
+    # === Алерты ===
+    
+    def get_alerts(self):
+        """Получает активные алерты."""
+        alerts = self._load("alerts")
+        return alerts if isinstance(alerts, list) else []
+    
+    def save_alerts(self, alerts):
+        """Сохраняет активные алерты (под блокировкой файла)."""
+        with self.lock("alerts"):
+            return self._save("alerts", alerts)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+from typing import Callable
+
+from .storage import FileLock
+
+
+class IdAllocator:
+    """
+    Монотонная последовательность id в маленьком файле-счетчике
+    (data/ids.json: {"user_id": следующий свободный id}).
+
+    Процесс резервирует под блокировкой блок из block_size id и раздает
+    их из памяти, так что выдача id — O(1), а параллельные процессы
+    никогда не получают одинаковые id. Неиспользованный остаток блока
+    при выходе возвращается, если за это время никто не брал новый блок
+    (иначе остается дыра в нумерации — это нормально). Если счетчика
+    еще нет, он заводится один раз из seed() — например, max(id) + 1.
+    """
+
+    def __init__(self, path: str, block_size: int = 10) -> None:
+        self.path = path
+        self.block_size = max(int(block_size), 1)
+        self._ranges: dict[str, list[int]] = {}  # имя -> [следующий, конец блока)
+        self._mutex = threading.Lock()
+        self._atexit = False
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def _write(self, data: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+    def _reserve(self, name: str, count: int, seed: Callable[[], int] | None) -> tuple[int, int]:
+        """Берет из файла блок не меньше count id: (начало, конец)."""
+        with FileLock(self.path):
+            data = self._read()
+            start = data.get(name)
+            if not isinstance(start, int):
+                start = seed() if seed else 1
+            end = start + max(count, self.block_size)
+            data[name] = end
+            self._write(data)
+        if not self._atexit:
+            atexit.register(self.release)
+            self._atexit = True
+        return start, end
+
+    def allocate(self, name: str = "user_id", count: int = 1,
+                 seed: Callable[[], int] | None = None) -> int:
+        """Первый из count подряд идущих новых id."""
+        with self._mutex:
+            current = self._ranges.get(name)
+            if current is None or current[1] - current[0] < count:
+                # Остаток старого блока не склеить с новым — он пропадает
+                current = list(self._reserve(name, count, seed))
+                self._ranges[name] = current
+            first = current[0]
+            current[0] += count
+            return first
+
+    def release(self) -> None:
+        """Возвращает неиспользованные остатки блоков, если счетчик не ушел дальше."""
+        with self._mutex:
+            ranges = {name: r for name, r in self._ranges.items() if r[0] < r[1]}
+            self._ranges.clear()
+        if not ranges:
+            return
+        try:
+            with FileLock(self.path, timeout=1.0):
+                data = self._read()
+                changed = False
+                for name, (start, end) in ranges.items():
+                    if data.get(name) == end:
+                        data[name] = start
+                        changed = True
+                if changed:
+                    self._write(data)
+        except (OSError, TimeoutError):
+            pass
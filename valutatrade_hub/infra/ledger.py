@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+
+class TradeLedger:
+    """
+    Журнал сделок (append-only).
+
+    Каждый пользователь пишет в свой файл ``trades/user_<id>.jsonl``
+    (индекс по пользователю), строки в файле идут в порядке времени
+    (индекс по времени). Добавление — одна дозапись в конец файла,
+    «последние N» читаются с хвоста, диапазон дат ищется бинарным
+    поиском по смещениям в файле.
+    """
+
+    _TAIL_BLOCK = 64 * 1024
+
+    def __init__(self, data_folder: str = "data") -> None:
+        self.folder = Path(data_folder) / "trades"
+
+    def _user_file(self, user_id) -> Path:
+        return self.folder / f"user_{int(user_id)}.jsonl"
+
+    def append(self, trade: dict[str, Any]) -> None:
+        """Добавляет сделку в журнал пользователя."""
+        self.folder.mkdir(parents=True, exist_ok=True)
+        line = json.dumps(trade, ensure_ascii=False) + "\n"
+        with self._user_file(trade["user_id"]).open("a", encoding="utf-8") as f:
+            f.write(line)
+
+    def last(self, user_id, limit: int = 50, offset: int = 0) -> list[dict[str, Any]]:
+        """Последние сделки (от новых к старым), начиная с offset."""
+        path = self._user_file(user_id)
+        if limit <= 0 or not path.exists():
+            return []
+
+        need = offset + limit
+        lines: list[bytes] = []
+        with path.open("rb") as f:
+            pos = f.seek(0, os.SEEK_END)
+            rest = b""
+            while pos > 0 and len(lines) < need:
+                step = min(self._TAIL_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                chunk = f.read(step) + rest
+                parts = chunk.split(b"\n")
+                # первая часть может быть обрезанной строкой — оставляем на потом
+                rest = parts[0] if pos > 0 else b""
+                tail = parts[1:] if pos > 0 else parts
+                lines.extend(p for p in reversed(tail) if p.strip())
+
+        return [json.loads(x) for x in lines[offset:need]]
+
+    def between(self, user_id, start: datetime | None = None,
+                end: datetime | None = None) -> list[dict[str, Any]]:
+        """Сделки в полуинтервале [start, end) в хронологическом порядке."""
+        path = self._user_file(user_id)
+        if not path.exists():
+            return []
+
+        result = []
+        with path.open("rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            pos = self._lower_bound(f, size, start) if start else 0
+            f.seek(pos)
+            for raw in f:
+                if not raw.strip():
+                    continue
+                trade = json.loads(raw)
+                if end and _parse_ts(trade["timestamp"]) >= end:
+                    break
+                result.append(trade)
+        return result
+
+    @staticmethod
+    def _line_start(f, pos: int) -> int:
+        """Начало первой строки, которая начинается в позиции pos или позже."""
+        if pos == 0:
+            return 0
+        f.seek(pos - 1)
+        f.readline()
+        return f.tell()
+
+    def _lower_bound(self, f, size: int, start: datetime) -> int:
+        """Смещение первой строки с timestamp >= start."""
+        lo, hi = 0, size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            p = self._line_start(f, mid)
+            f.seek(p)
+            raw = f.readline()
+            if not raw or _parse_ts(json.loads(raw)["timestamp"]) >= start:
+                hi = mid
+            else:
+                lo = mid + 1
+        return self._line_start(f, lo)
+
+
+def _parse_ts(value: str) -> datetime:
+    dt = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
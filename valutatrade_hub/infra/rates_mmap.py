@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Заголовок: magic, версия формата, размер записи, емкость, число записей,
+# версия снимка курсов (seq RatesStorage), счетчик seqlock (нечетный —
+# идет запись)
+HEADER = struct.Struct("<4sHHIIQQ")
+MAGIC = b"VTRS"
+VERSION = 2
+
+# Запись: пара (ASCII, дополнена нулями), курс, updated_at в мкс от эпохи
+RECORD = struct.Struct("<16sdq")
+PAIR_SIZE = 16
+SEQ_OFFSET = HEADER.size - 8
+
+MIN_CAPACITY = 256
+
+
+def _to_us(updated_at: str | None) -> int:
+    if not updated_at:
+        return 0
+    try:
+        return int(datetime.fromisoformat(updated_at.replace("Z", "+00:00")).timestamp() * 1_000_000)
+    except ValueError:
+        return 0
+
+
+class RatesMmapWriter:
+    """
+    Публикует снимок курсов в бинарный файл фиксированной разметки.
+
+    Записи отсортированы по имени пары, чтобы читатель искал бинарным
+    поиском прямо в отображенной памяти. Запись идет под seqlock:
+    счетчик становится нечетным, данные обновляются на месте, счетчик
+    снова четный. Рассчитан на одного писателя (процесс update-rates).
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+
+    def _create(self, capacity: int, records: list, version: int, seq: int) -> None:
+        """
+        Собирает файл нужной емкости целиком — заголовок и все записи — во
+        временном файле и только затем подменяет им старый: читатель видит
+        либо прежний снимок, либо новый, но не пустой файл.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, capacity, len(records), version, seq))
+            for record in records:
+                f.write(RECORD.pack(*record))
+            f.write(b"\0" * (RECORD.size * (capacity - len(records))))
+        os.replace(tmp, self.path)
+
+    def publish(self, pairs: dict[str, dict], version: int = 0) -> int:
+        """
+        Записывает пары снимка версии version; возвращает новый (четный)
+        номер последовательности seqlock.
+        """
+        records = sorted(
+            (pair.encode("ascii")[:PAIR_SIZE], float(info["rate"]), _to_us(info.get("updated_at")))
+            for pair, info in pairs.items()
+        )
+
+        seq = 0
+        capacity = 0
+        if self.path.exists():
+            with self.path.open("rb") as f:
+                head = f.read(HEADER.size)
+            if len(head) == HEADER.size:
+                magic, fmt, rec_size, capacity, _, _, seq = HEADER.unpack(head)
+                if magic != MAGIC or fmt != VERSION or rec_size != RECORD.size:
+                    capacity, seq = 0, 0
+        seq += seq & 1  # прошлый писатель мог упасть посреди записи
+        if capacity < len(records):
+            capacity = max(MIN_CAPACITY, 1 << (len(records) - 1).bit_length())
+            self._create(capacity, records, version, seq + 2)
+            return seq + 2
+
+        with self.path.open("r+b") as f, mmap.mmap(f.fileno(), 0) as mm:
+            struct.pack_into("<Q", mm, SEQ_OFFSET, seq + 1)
+            offset = HEADER.size
+            for record in records:
+                RECORD.pack_into(mm, offset, *record)
+                offset += RECORD.size
+            HEADER.pack_into(mm, 0, MAGIC, VERSION, RECORD.size, capacity, len(records), version, seq + 1)
+            struct.pack_into("<Q", mm, SEQ_OFFSET, seq + 2)
+        return seq + 2
+
+
+class RatesMmapReader:
+    """
+    Чтение снимка без разбора JSON: поиск пары бинарным поиском по
+    отображенному файлу, согласованность — по seqlock (повтор, если
+    счетчик нечетный или изменился во время чтения). Если файл заменен
+    (писатель увеличил емкость), он переоткрывается.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._mm = None
+        self._ino = None
+
+    @classmethod
+    def open(cls, path: str | Path) -> "RatesMmapReader | None":
+        """Читатель или None, если файла нет или формат чужой."""
+        reader = cls(path)
+        return reader if reader._remap() else None
+
+    def _remap(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False
+        if self._mm is not None and st.st_ino == self._ino:
+            return True
+        self.close()
+        if st.st_size < HEADER.size:
+            return False
+        with self.path.open("rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rec_size = HEADER.unpack_from(mm, 0)[:3]
+        if magic != MAGIC or version != VERSION or rec_size != RECORD.size:
+            mm.close()
+            return False
+        self._mm, self._ino = mm, st.st_ino
+        return True
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def _read(self, fn, retries: int = 1000):
+        """Выполняет fn(mm, count) под seqlock."""
+        if not self._remap():
+            return None
+        mm = self._mm
+        for attempt in range(retries):
+            seq = struct.unpack_from("<Q", mm, SEQ_OFFSET)[0]
+            if not seq & 1:
+                count = HEADER.unpack_from(mm, 0)[4]
+                result = fn(mm, count)
+                if struct.unpack_from("<Q", mm, SEQ_OFFSET)[0] == seq:
+                    return result
+            # Писатель в процессе: уступаем ему процессор
+            time.sleep(0 if attempt < 10 else 0.0005)
+        raise BlockingIOError("снимок курсов постоянно перезаписывается")
+
+    @property
+    def seq(self) -> int:
+        return self._read(lambda mm, count: struct.unpack_from("<Q", mm, SEQ_OFFSET)[0]) or 0
+
+    def get(self, pair: str) -> tuple[float, float | None] | None:
+        """(курс, updated_at в секундах от эпохи или None) или None, если пары нет."""
+        key = pair.encode("ascii")[:PAIR_SIZE].ljust(PAIR_SIZE, b"\0")
+
+        def find(mm, count):
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                offset = HEADER.size + mid * RECORD.size
+                name = mm[offset:offset + PAIR_SIZE]
+                if name < key:
+                    lo = mid + 1
+                elif name > key:
+                    hi = mid
+                else:
+                    _, rate, ts_us = RECORD.unpack_from(mm, offset)
+                    return rate, (ts_us / 1_000_000 if ts_us else None)
+            return None
+
+        return self._read(find)
+
+    @property
+    def version(self) -> int:
+        """Версия опубликованного снимка курсов (0 — неизвестна)."""
+        return self._read(lambda mm, count: HEADER.unpack_from(mm, 0)[5]) or 0
+
+    def snapshot(self) -> dict[str, tuple[float, float | None]]:
+        """Все пары согласованным срезом."""
+        return self.versioned_snapshot()[1]
+
+    def versioned_snapshot(self) -> tuple[int, dict[str, tuple[float, float | None]]]:
+        """(версия снимка, все пары) — одним согласованным чтением."""
+        def read_all(mm, count):
+            out = {}
+            for i in range(count):
+                name, rate, ts_us = RECORD.unpack_from(mm, HEADER.size + i * RECORD.size)
+                out[name.rstrip(b"\0").decode("ascii")] = (rate, ts_us / 1_000_000 if ts_us else None)
+            return HEADER.unpack_from(mm, 0)[5], out
+
+        return self._read(read_all) or (0, {})
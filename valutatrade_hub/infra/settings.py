@@ -1,71 +1,326 @@
+from __future__ import annotations
+
 import os
 import json
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass, field, fields, replace
+from types import MappingProxyType
+
+from ..core.exceptions import ConfigError
+
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+# Файлы данных, которые по умолчанию лежат в data_dir
+DATA_FILES = {
+    'users_file': 'users.json',
+    'portfolios_file': 'portfolios.json',
+    'rates_file': 'rates.json',
+    'rates_binary_file': 'rates.bin',
+    'history_file': 'exchange_rates.json',
+    'session_file': 'session.json',
+    'alerts_fired_file': 'alerts_fired.jsonl',
+    'rates_fixture_file': 'rates_fixture.jsonl',
+    'ids_file': 'ids.json',
+}
+
+
+@dataclass(frozen=True)
+class Settings:
+    """
+    Неизменяемый снимок настроек.
+
+    Собирается из значений по умолчанию, config.json и переменных
+    окружения и проверяется один раз. Пути к файлам данных, не заданные
+    явно, выводятся из data_dir.
+    """
+    data_dir: str = 'data'
+    rates_ttl_seconds: int = 300
+    default_base_currency: str = 'USD'
+    # Свой реестр валют (None — встроенный core/currencies.json)
+    currencies_file: str | None = None
+
+    log_file: str = 'logs/app.log'
+    action_log_file: str = 'logs/actions.jsonl'
+    log_level: str = 'INFO'
+    log_buffer_size: int = 100
+    log_flush_interval: float = 1.0
+
+    metrics_file: str | None = 'logs/metrics.json'
+    metrics_prometheus_file: str | None = None
+
+    exchangerate_api_key: str | None = None
+    coingecko_api_key: str | None = None
+    request_timeout: int = 10
+    rates_quorum: int = 2
+    rates_max_deviation: float = 0.2
+    # Через сколько согласных обновлений подряд принимается сдвиг курса,
+    # отвергнутый как выброс
+    rates_outlier_confirmations: int = 3
+    # Валюты котировки пар update-rates (базовая добавляется всегда)
+    rates_quote_currencies: tuple[str, ...] = ('USD', 'EUR', 'RUB')
+    # Порядок источников по парам: {"BTC_USD": ["coingecko", ...]}
+    rates_pair_priority: Mapping[str, tuple[str, ...]] = field(
+        default_factory=lambda: MappingProxyType({}))
+    # Полный rates.json раз в N обновлений, между ними — дельты
+    rates_full_snapshot_every: int = 20
+
+    # Адреса провайдеров (например, локальной заглушки stub_server)
+    coingecko_url: str | None = None
+    exchangerate_api_url: str | None = None
+    open_er_api_url: str | None = None
+
+    # Сколько секунд действует котировка команды quote
+    quote_ttl_seconds: int = 15
+
+    # Офлайн-источники update-rates --source replay/random
+    rates_tick_rate: float = 0.0
+    rates_seed: int | None = None
+
+    # Сколько объектов Portfolio держит в памяти AppLogic (0 — без кеша)
+    portfolio_cache_size: int = 128
+    # Сколько id процесс резервирует за одно обращение к ids_file
+    id_block_size: int = 10
+
+    users_file: str = ''
+    portfolios_file: str = ''
+    rates_file: str = ''
+    rates_binary_file: str = ''
+    history_file: str = ''
+    session_file: str = ''
+    alerts_fired_file: str = ''
+    rates_fixture_file: str = ''
+    ids_file: str = ''
+
+    # Ключи config.json, не описанные полями (доступны через get)
+    extra: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def from_dict(cls, raw):
+        """Строит и проверяет снимок; все ошибки собираются в один ConfigError."""
+        known = {f.name: f for f in fields(cls) if f.name != 'extra'}
+        values = {}
+        extra = {}
+        errors = []
+
+        for key, value in raw.items():
+            f = known.get(key)
+            if f is None:
+                extra[key] = value
+                continue
+            try:
+                values[key] = _coerce(f.type, value)
+            except (TypeError, ValueError):
+                errors.append(f"{key}: ожидается {f.type}, получено {value!r}")
+
+        result = cls(**values, extra=MappingProxyType(extra))
+
+        if result.rates_ttl_seconds < 0:
+            errors.append("rates_ttl_seconds не может быть отрицательным")
+        if result.request_timeout <= 0:
+            errors.append("request_timeout должен быть положительным")
+        if result.rates_quorum < 1:
+            errors.append("rates_quorum должен быть не меньше 1")
+        if result.rates_max_deviation <= 0:
+            errors.append("rates_max_deviation должен быть положительным")
+        if result.rates_outlier_confirmations < 1:
+            errors.append("rates_outlier_confirmations должен быть не меньше 1")
+        if result.rates_full_snapshot_every < 1:
+            errors.append("rates_full_snapshot_every должен быть не меньше 1")
+        if result.quote_ttl_seconds <= 0:
+            errors.append("quote_ttl_seconds должен быть положительным")
+        if result.rates_tick_rate < 0:
+            errors.append("rates_tick_rate не может быть отрицательным")
+        if result.portfolio_cache_size < 0:
+            errors.append("portfolio_cache_size не может быть отрицательным")
+        if result.id_block_size < 1:
+            errors.append("id_block_size должен быть не меньше 1")
+        if result.log_buffer_size <= 0:
+            errors.append("log_buffer_size должен быть положительным")
+        if result.log_flush_interval <= 0:
+            errors.append("log_flush_interval должен быть положительным")
+        if result.log_level.upper() not in LOG_LEVELS:
+            errors.append(f"log_level: неизвестный уровень {result.log_level!r}")
+        base = result.default_base_currency
+        if not _is_code(base):
+            errors.append(f"default_base_currency: некорректный код {base!r}")
+        if not result.rates_quote_currencies:
+            errors.append("rates_quote_currencies не может быть пустым")
+        for code in result.rates_quote_currencies:
+            if not _is_code(code):
+                errors.append(f"rates_quote_currencies: некорректный код {code!r}")
+        for pair in result.rates_pair_priority:
+            if pair.count('_') != 1 or not all(_is_code(c) for c in pair.split('_')):
+                errors.append(f"rates_pair_priority: некорректная пара {pair!r}")
+        if not result.data_dir:
+            errors.append("data_dir не может быть пустым")
+
+        if errors:
+            raise ConfigError("; ".join(errors))
+
+        paths = {
+            key: os.path.join(result.data_dir, name)
+            for key, name in DATA_FILES.items()
+            if not getattr(result, key)
+        }
+        return replace(result, log_level=result.log_level.upper(), **paths)
+
+    def get(self, key, default=None):
+        """Доступ к настройке по имени (поля и дополнительные ключи)."""
+        if key != 'extra' and key in self.__dataclass_fields__:
+            value = getattr(self, key)
+            return default if value is None else value
+        return self.extra.get(key, default)
+
+
+def _is_code(code):
+    """Код валюты: 2-5 заглавных букв."""
+    return code.isalpha() and code.isupper() and 2 <= len(code) <= 5
+
+
+def _coerce(type_name, value):
+    """Приводит значение из JSON к типу поля (аннотации здесь — строки)."""
+    optional = type_name.endswith('| None')
+    if value is None:
+        if optional:
+            return None
+        raise TypeError(value)
+    base = type_name.split('|')[0].strip()
+    if base == 'str':
+        if not isinstance(value, str):
+            raise TypeError(value)
+        return value
+    if base == 'tuple[str, ...]':
+        # Строка тоже итерируема, но посимвольный список валют — ошибка
+        if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+            raise TypeError(value)
+        return tuple(value)
+    if base == 'Mapping[str, tuple[str, ...]]':
+        if not isinstance(value, dict):
+            raise TypeError(value)
+        return MappingProxyType({k: _coerce('tuple[str, ...]', v) for k, v in value.items()})
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(value)
+    if base == 'int':
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(value)
+        return int(value)
+    if base == 'float':
+        return float(value)
+    raise TypeError(value)
+
+
+def _from_env():
+    """Настройки из переменных окружения (имеют приоритет над config.json)."""
+    env = {}
+    key = os.getenv('EXCHANGERATE_API_KEY') or os.getenv('EXCHANGE_RATE_API_KEY')
+    if key:
+        env['exchangerate_api_key'] = key
+    if os.getenv('COINGECKO_API_KEY'):
+        env['coingecko_api_key'] = os.getenv('COINGECKO_API_KEY')
+    return env
 
 
 class SettingsLoader:
-    
+    """
+    Загрузчик настроек (синглтон).
+
+    Хранит текущий снимок Settings. Файл конфигурации читается при
+    первом обращении; затем не чаще раза в check_interval секунд
+    сверяется его mtime, и при изменении снимок пересобирается —
+    долгоживущие процессы подхватывают правки без перезапуска.
+    Если новый файл некорректен, остается прежний снимок.
+    """
+
     _instance = None
-    
+
+    config_file = 'config.json'
+    check_interval = 1.0
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
             cls._instance._initialized = False
         return cls._instance
-    
+
     def __init__(self):
         if not self._initialized:
-            self._config = {}
-            self._load_config()
+            self._snapshot = None
+            self._mtime = None
+            self._checked_at = 0.0
+            self.reload_error = None
             self._initialized = True
-    
+
+    def _stat(self):
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+
     def _load_config(self):
-        """Загружает конфигурацию."""
-        self._config = {
-            'data_dir': 'data',
-            'rates_ttl_seconds': 300,  
-            'default_base_currency': 'USD',
-            'log_file': 'logs/app.log',
-            'log_level': 'INFO',
-            
-            
-            'exchange_rate_api_key': os.getenv('EXCHANGE_RATE_API_KEY', 'demo_key'),
-            'coingecko_api_key': os.getenv('COINGECKO_API_KEY', ''),
-            
-            
-            'users_file': 'data/users.json',
-            'portfolios_file': 'data/portfolios.json',
-            'rates_file': 'data/rates.json',
-            'session_file': 'data/session.json'
-        }
-        
-        config_file = 'config.json'
-        if os.path.exists(config_file):
+        """Читает config.json и собирает новый снимок."""
+        mtime = self._stat()
+        raw = {}
+        if mtime is not None:
             try:
-                with open(config_file, 'r') as f:
-                    file_config = json.load(f)
-                self._config.update(file_config)
-            except Exception:
-                pass
-    
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    raw = json.load(f)
+            except (OSError, ValueError) as e:
+                raise ConfigError(f"{self.config_file}: {e}")
+            if not isinstance(raw, dict):
+                raise ConfigError(f"{self.config_file}: ожидается JSON-объект")
+        raw.update(_from_env())
+        snapshot = Settings.from_dict(raw)
+        self._snapshot = snapshot
+        self._mtime = mtime
+        self._checked_at = time.monotonic()
+        return snapshot
+
+    def snapshot(self):
+        """Текущий снимок настроек (с проверкой, не изменился ли файл)."""
+        if self._snapshot is None:
+            return self._load_config()
+        self.maybe_reload()
+        return self._snapshot
+
+    def maybe_reload(self):
+        """Перечитывает config.json, если изменился его mtime. Возвращает True при перезагрузке."""
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return False
+        self._checked_at = now
+        if self._stat() == self._mtime:
+            return False
+        try:
+            self._load_config()
+        except ConfigError as e:
+            # Битая правка не должна ронять работающий процесс
+            self.reload_error = e
+            self._mtime = self._stat()
+            return False
+        self.reload_error = None
+        return True
+
     def get(self, key, default=None):
         """Получает значение настройки."""
-        return self._config.get(key, default)
-    
+        return self.snapshot().get(key, default)
+
     def reload(self):
         """Перезагружает конфигурацию."""
-        self._load_config()
-    
+        return self._load_config()
+
     def get_rates_ttl(self):
         """Возвращает TTL для курсов в секундах."""
-        return self.get('rates_ttl_seconds', 300)
-    
+        return self.snapshot().rates_ttl_seconds
+
     def get_data_dir(self):
         """Возвращает директорию с данными."""
-        return self.get('data_dir', 'data')
-    
+        return self.snapshot().data_dir
+
     def get_default_base_currency(self):
         """Возвращает базовую валюту по умолчанию."""
-        return self.get('default_base_currency', 'USD')
+        return self.snapshot().default_base_currency
 
 
-settings = SettingsLoader()
\ No newline at end of file
+settings = SettingsLoader()
@@ -1,5 +1,7 @@
 import json
 import os
+import re
+import time
 from tempfile import NamedTemporaryFile
 import shutil
 
@@ -22,3 +24,186 @@ def write_json_atomic(path: str, data):
         temp_name = tmp.name
 
     shutil.move(temp_name, path)
+
+
+class FileLock:
+    """
+    Межпроцессная блокировка через lock-файл (O_CREAT | O_EXCL работает
+    одинаково на Linux, macOS и Windows). Файл старше stale секунд
+    считается оставшимся после упавшего процесса и удаляется.
+    """
+
+    def __init__(self, path: str, timeout: float = 10.0, stale: float = 30.0):
+        self.path = path + ".lock"
+        self.timeout = timeout
+        self.stale = stale
+        self._fd = None
+
+    def acquire(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+        delay = 0.001
+        while True:
+            try:
+                self._fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.write(self._fd, str(os.getpid()).encode())
+                return self
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(self.path) > self.stale:
+                        os.remove(self.path)
+                        continue
+                except OSError:
+                    continue
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"не удалось захватить {self.path}")
+                time.sleep(delay)
+                delay = min(delay * 2, 0.05)
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+class _JsonStream:
+    """
+    Разбор JSON-файла по кускам: в буфере — только непрочитанный хвост,
+    значения по одному достает json.JSONDecoder.raw_decode.
+    """
+
+    def __init__(self, f, chunk_size: int) -> None:
+        self.f = f
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.fill()
+        if self.buf.startswith("\ufeff"):
+            self.pos = 1
+
+    def fill(self) -> None:
+        more = self.f.read(self.chunk_size)
+        if not more:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + more
+        self.pos = 0
+
+    def peek(self) -> str:
+        """Следующий значимый символ ('' — конец файла)."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or self.eof:
+                return self.buf[self.pos] if self.pos < len(self.buf) else ""
+            self.fill()
+
+    def value(self, stops: str):
+        """Очередное значение; за ним должен быть один из символов stops."""
+        while True:
+            try:
+                item, end = self.decoder.raw_decode(self.buf, self.pos)
+                # Число на границе куска может быть обрезано ("12" из "12.5"):
+                # значение принимается, только если за ним виден разделитель
+                if not self.eof and (end == len(self.buf) or self.buf[end] not in stops):
+                    raise json.JSONDecodeError("incomplete", self.buf, end)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+                continue
+            self.pos = end
+            return item
+
+    def separator(self, close: str) -> bool:
+        """Съедает ',' (True — дальше есть элементы) или close (False)."""
+        sep = self.peek()
+        if sep == ",":
+            self.pos += 1
+            return True
+        if sep == close or sep == "":
+            self.pos += 1
+            return False
+        raise json.JSONDecodeError(f"ожидалась ',' или '{close}'", self.buf, self.pos)
+
+    def members(self):
+        """
+        Ключи объекта, чья '{' уже съедена. После каждого ключа поток
+        стоит на его значении — вызывающий обязан прочитать его до
+        следующего шага.
+        """
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            self.peek()
+            key = self.value(' \t\r\n:')
+            if not isinstance(key, str) or self.peek() != ":":
+                raise json.JSONDecodeError("ожидался ключ объекта", self.buf, self.pos)
+            self.pos += 1
+            self.peek()
+            yield key
+            if not self.separator("}"):
+                return
+
+
+def iter_json_array(path: str, chunk_size: int = 1 << 16):
+    """
+    Элементы JSON-массива верхнего уровня по одному: файл читается
+    кусками по chunk_size, в памяти — только текущий элемент и хвост
+    буфера. Если файла нет или в нем не массив — ничего не выдает.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, chunk_size)
+        if stream.peek() != "[":
+            return
+        stream.pos += 1
+        if stream.peek() == "]":
+            return
+        while True:
+            yield stream.value(" \t\r\n,]")
+            if not stream.separator("]"):
+                return
+            stream.peek()
+
+
+def iter_json_object(path: str, nested: tuple[str, ...] = (), keep=None, chunk_size: int = 1 << 16):
+    """
+    Члены JSON-объекта верхнего уровня парами (ключ, значение), файл
+    читается кусками. Объект под ключом из nested целиком не собирается:
+    его члены выдаются как ((ключ, вложенный ключ), значение), причем
+    только те, для которых keep(вложенный ключ) истинно, — остальные
+    разбираются по одному и сразу отбрасываются. Если файла нет или в
+    нем не объект — ничего не выдает.
+    """
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        stream = _JsonStream(f, chunk_size)
+        if stream.peek() != "{":
+            return
+        stream.pos += 1
+        for key in stream.members():
+            if key in nested and stream.peek() == "{":
+                stream.pos += 1
+                for name in stream.members():
+                    item = stream.value(" \t\r\n,}")
+                    if keep is None or keep(name):
+                        yield (key, name), item
+            else:
+                yield key, stream.value(" \t\r\n,}")
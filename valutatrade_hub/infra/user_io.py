@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import csv
+import json
+import os
+from typing import Any, Iterator
+
+# Колонки выгрузки: хеш и соль позволяют загрузить пользователей обратно
+EXPORT_FIELDS = ("user_id", "username", "hashed_password", "salt", "registration_date")
+
+FORMATS = ("csv", "jsonl")
+
+
+def guess_format(path: str, fmt: str | None = None) -> str:
+    """Формат по явному значению или расширению файла (.csv / .jsonl)."""
+    if fmt:
+        return fmt
+    ext = os.path.splitext(path)[1].lower().lstrip(".")
+    if ext in ("jsonl", "ndjson"):
+        return "jsonl"
+    if ext == "csv":
+        return "csv"
+    raise ValueError(f"не удалось определить формат {path}, укажите --format")
+
+
+def read_user_rows(path: str, fmt: str | None = None) -> Iterator[dict[str, Any]]:
+    """
+    Строки пользователей из CSV (с заголовком) или JSON-lines.
+
+    Ожидаемые поля: username и password либо hashed_password + salt
+    (как в export-users); необязательное balance_usd — стартовый баланс.
+    """
+    fmt = guess_format(path, fmt)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if key and value not in (None, "")}
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def write_users(path: str, users: list[dict[str, Any]], fmt: str | None = None) -> int:
+    """Выгружает пользователей; возвращает число записанных строк."""
+    fmt = guess_format(path, fmt)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(users)
+        else:
+            for user in users:
+                row = {key: user.get(key) for key in EXPORT_FIELDS}
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+    return len(users)
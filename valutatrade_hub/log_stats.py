@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import gzip
+import json
+import math
+from pathlib import Path
+from typing import Iterator
+
+
+class QuantileSketch:
+    """
+    Сливаемый скетч квантилей с относительной точностью (в духе DDSketch).
+
+    Значение x попадает в корзину ceil(log_gamma(x)); на корзину
+    хранится только счетчик, поэтому память зависит от диапазона
+    значений, а не от их количества. Два скетча сливаются сложением
+    счетчиков.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6) -> None:
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        value = float(value)
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Скетчи с разной точностью нельзя слить")
+        for key, cnt in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + cnt
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return self.max
+
+
+def rotated_files(path: str) -> list[Path]:
+    """Файл лога и его ротации (от старых к новым), включая .gz."""
+    base = Path(path)
+    files = []
+    for candidate in base.parent.glob(base.name + ".*"):
+        suffix = candidate.name[len(base.name) + 1:].removesuffix(".gz")
+        if suffix.isdigit():
+            files.append((int(suffix), candidate))
+    result = [p for _, p in sorted(files, reverse=True)]
+    if base.exists():
+        result.append(base)
+    return result
+
+
+def iter_records(paths: list[Path]) -> Iterator[dict]:
+    """Потоково читает JSON-строки из файлов, пропуская битые строки."""
+    for path in paths:
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(record, dict) and "action" in record:
+                    yield record
+
+
+def collect_stats(path: str, action: str | None = None) -> dict[str, dict]:
+    """Счетчики и скетчи латентности по действиям."""
+    stats: dict[str, dict] = {}
+    for record in iter_records(rotated_files(path)):
+        name = record["action"]
+        if action and name != action:
+            continue
+        item = stats.get(name)
+        if item is None:
+            item = stats[name] = {"count": 0, "errors": 0, "sketch": QuantileSketch()}
+        item["count"] += 1
+        if record.get("status") == "ERROR":
+            item["errors"] += 1
+        item["sketch"].add(record.get("duration_ms") or 0.0)
+    return stats
@@ -1,43 +1,140 @@
 import os
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import time
+from logging.handlers import RotatingFileHandler, MemoryHandler, QueueHandler, QueueListener
 from .infra.settings import settings
 
 
+# Логгер для записей декоратора log_action
+ACTION_LOGGER = 'valutatrade_hub.actions'
+
+_listener = None
+
+
+class BufferedHandler(MemoryHandler):
+    """Буфер перед файлом: сброс по размеру, по времени и на ошибках."""
+
+    def __init__(self, target, capacity=100, flush_interval=1.0):
+        super().__init__(capacity, flushLevel=logging.ERROR, target=target, flushOnClose=True)
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def shouldFlush(self, record):
+        return (super().shouldFlush(record)
+                or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def flush(self):
+        super().flush()
+        self._last_flush = time.monotonic()
+
+
+class _FlushingQueueListener(QueueListener):
+    """QueueListener, сбрасывающий буферы, когда очередь простаивает."""
+
+    def __init__(self, q, *handlers, flush_interval=1.0):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block):
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                for handler in self.handlers:
+                    handler.flush()
+
+
+def _not_action(record):
+    return not record.name.startswith(ACTION_LOGGER)
+
+
+def _only_action(record):
+    return record.name.startswith(ACTION_LOGGER)
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
 def setup_logging():
-    """Настраивает систему логирования."""
-    log_file = settings.get('log_file', 'logs/app.log')
-    log_level = settings.get('log_level', 'INFO').upper()
-    
-    log_dir = os.path.dirname(log_file)
-    if log_dir:
-        os.makedirs(log_dir, exist_ok=True)
-    
+    """
+    Настраивает систему логирования.
+
+    Все записи (в том числе из log_action) попадают в очередь через
+    QueueHandler, а в файл их пишет фоновый QueueListener через буфер
+    с общим RotatingFileHandler — вызывающий код не ждет диска.
+    """
+    config = settings.snapshot()
+    log_file = config.log_file
+    action_log_file = config.action_log_file
+    log_level = config.log_level
+    buffer_size = config.log_buffer_size
+    flush_interval = config.log_flush_interval
+
+    for path in (log_file, action_log_file):
+        log_dir = os.path.dirname(path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+
+    _stop_listener()
+
     logger = logging.getLogger()
     logger.setLevel(getattr(logging, log_level, logging.INFO))
-    
+
     logger.handlers.clear()
-    
+
     file_handler = RotatingFileHandler(
         log_file,
         maxBytes=10*1024*1024,  # 10 MB
         backupCount=5,
         encoding='utf-8'
     )
-    
+
+    file_handler.addFilter(_not_action)
+
+    # Записи log_action — отдельный файл, одна JSON-строка на действие
+    action_handler = RotatingFileHandler(
+        action_log_file,
+        maxBytes=10*1024*1024,  # 10 MB
+        backupCount=5,
+        encoding='utf-8'
+    )
+    action_handler.addFilter(_only_action)
+    action_handler.setFormatter(logging.Formatter('%(message)s'))
+
     console_handler = logging.StreamHandler()
-    
+    console_handler.addFilter(_not_action)
+
     formatter = logging.Formatter(
         '%(asctime)s | %(levelname)-8s | %(name)s:%(lineno)d | %(message)s',
         datefmt='%Y-%m-%d %H:%M:%S'
     )
-    
+
     file_handler.setFormatter(formatter)
     console_handler.setFormatter(formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
+
+    global _listener
+    log_queue = queue.SimpleQueue()
+    _listener = _FlushingQueueListener(
+        log_queue,
+        BufferedHandler(file_handler, buffer_size, flush_interval),
+        BufferedHandler(action_handler, buffer_size, flush_interval),
+        console_handler,
+        flush_interval=flush_interval
+    )
+    _listener.start()
+    atexit.unregister(_stop_listener)
+    atexit.register(_stop_listener)
+
+    logger.addHandler(QueueHandler(log_queue))
+
     logger.info("=" * 50)
     logger.info("Система логирования инициализирована")
     logger.info(f"Лог файл: {log_file}")
@@ -45,12 +142,27 @@ def setup_logging():
     logger.info("=" * 50)
 
 
+def ensure_logging():
+    """
+    Настраивает логирование при первом обращении (отложенная настройка).
+    В долгоживущем процессе подхватывает новый log_level после правки config.json.
+    """
+    if _listener is None:
+        try:
+            setup_logging()
+        except Exception:
+            pass
+    elif settings.maybe_reload():
+        level = settings.snapshot().log_level
+        logging.getLogger().setLevel(getattr(logging, level, logging.INFO))
+
+
 def get_logger(name):
     """Возвращает логгер с указанным именем."""
+    ensure_logging()
     return logging.getLogger(name)
 
 
-try:
-    setup_logging()
-except Exception:
-    pass
\ No newline at end of file
+def get_action_logger():
+    """Логгер для записей log_action."""
+    return get_logger(ACTION_LOGGER)
@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# Границы корзин гистограмм в наносекундах: 1 мкс * 2^i (до ~17 с)
+BUCKETS_NS = tuple(1000 * 2 ** i for i in range(25))
+
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    inner = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+    return f"{name}{{{inner}}}"
+
+
+class Counter:
+    """Монотонно растущий счетчик."""
+
+    kind = "counter"
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount=1) -> None:
+        self.value += amount
+
+    def to_dict(self) -> dict:
+        return {"type": self.kind, "value": self.value}
+
+
+class Gauge(Counter):
+    """Текущее значение (может уменьшаться)."""
+
+    kind = "gauge"
+
+    def set(self, value) -> None:
+        self.value = value
+
+    def dec(self, amount=1) -> None:
+        self.value -= amount
+
+
+class Histogram:
+    """Гистограмма длительностей в наносекундах (perf_counter_ns)."""
+
+    kind = "histogram"
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS_NS) + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+    def observe_ns(self, value_ns: int) -> None:
+        self.count += 1
+        self.sum_ns += value_ns
+        self.counts[bisect.bisect_left(BUCKETS_NS, value_ns)] += 1
+
+    def to_dict(self) -> dict:
+        return {"type": self.kind, "count": self.count, "sum_ns": self.sum_ns,
+                "buckets": list(self.counts)}
+
+
+class Registry:
+    """
+    Реестр метрик процесса.
+
+    Если сброс включен (enable_flush, его вызывает CLI), при завершении
+    процесса метрики сливаются в общий файл (настройка metrics_file),
+    чтобы команда metrics видела сумму по всем запускам CLI. Тесты и
+    бенчмарки ничего на диск не пишут.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram] = {}
+        self._lock = threading.Lock()
+        self._atexit = False
+
+    def enable_flush(self) -> None:
+        """Сливать метрики в metrics_file при завершении процесса."""
+        if not self._atexit:
+            atexit.register(self.flush)
+            self._atexit = True
+
+    def _get(self, cls, name: str, labels: dict):
+        key = _key(name, labels)
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, cls())
+        return metric
+
+    def counter(self, name: str, **labels) -> Counter:
+        return self._get(Counter, name, labels)
+
+    def gauge(self, name: str, **labels) -> Gauge:
+        return self._get(Gauge, name, labels)
+
+    def histogram(self, name: str, **labels) -> Histogram:
+        return self._get(Histogram, name, labels)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Замеряет длительность блока в гистограмму name."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.histogram(name, **labels).observe_ns(time.perf_counter_ns() - start)
+
+    def reset(self) -> None:
+        """Сбрасывает метрики процесса без записи в файл."""
+        with self._lock:
+            self._metrics.clear()
+
+    def snapshot(self) -> dict[str, dict]:
+        return {key: m.to_dict() for key, m in self._metrics.items()}
+
+    def flush(self) -> None:
+        """Сливает метрики процесса в metrics_file (и в Prometheus-файл, если задан)."""
+        if not self._metrics:
+            return
+        try:
+            from .infra.settings import settings
+            from .infra.storage import FileLock
+            config = settings.snapshot()
+            path = config.metrics_file
+            prom_path = config.metrics_prometheus_file
+            if not path:
+                return
+            # Чтение-слияние-запись под блокировкой: иначе параллельно
+            # завершившиеся команды затирают счетчики друг друга
+            with FileLock(path, timeout=5.0):
+                merged = merge_snapshots(load_snapshot(path), self.snapshot())
+                _write_atomic(path, json.dumps(merged, ensure_ascii=False, indent=1))
+                if prom_path:
+                    _write_atomic(prom_path, to_prometheus(merged))
+            self._metrics.clear()
+        except Exception:
+            pass
+
+
+def load_snapshot(path: str) -> dict[str, dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def merge_snapshots(old: dict[str, dict], new: dict[str, dict]) -> dict[str, dict]:
+    """Счетчики и гистограммы складываются, gauge берется из нового."""
+    result = dict(old)
+    for key, item in new.items():
+        prev = result.get(key)
+        if prev is None or prev.get("type") != item["type"] or item["type"] == "gauge":
+            result[key] = item
+        elif item["type"] == "counter":
+            result[key] = {"type": "counter", "value": prev["value"] + item["value"]}
+        else:
+            result[key] = {
+                "type": "histogram",
+                "count": prev["count"] + item["count"],
+                "sum_ns": prev["sum_ns"] + item["sum_ns"],
+                "buckets": [a + b for a, b in zip(prev["buckets"], item["buckets"])],
+            }
+    return result
+
+
+def histogram_quantile(item: dict, q: float) -> float:
+    """Оценка квантиля (в секундах) по верхней границе корзины."""
+    if not item["count"]:
+        return 0.0
+    rank = q * item["count"]
+    seen = 0
+    for i, cnt in enumerate(item["buckets"]):
+        seen += cnt
+        if seen >= rank:
+            bound = BUCKETS_NS[i] if i < len(BUCKETS_NS) else BUCKETS_NS[-1]
+            return bound / 1e9
+    return BUCKETS_NS[-1] / 1e9
+
+
+def to_prometheus(data: dict[str, dict]) -> str:
+    """Текстовый формат экспозиции Prometheus."""
+    lines = []
+    typed = set()
+    for key in sorted(data):
+        item = data[key]
+        name, _, labels = key.partition("{")
+        labels = labels.rstrip("}")
+        if name not in typed:
+            lines.append(f"# TYPE {name} {item['type']}")
+            typed.add(name)
+        if item["type"] != "histogram":
+            lines.append(f"{key} {item['value']}")
+            continue
+        sep = "," if labels else ""
+        cumulative = 0
+        for bound, cnt in zip(BUCKETS_NS + (None,), item["buckets"]):
+            cumulative += cnt
+            le = "+Inf" if bound is None else f"{bound / 1e9:g}"
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {item['sum_ns'] / 1e9:.9f}")
+        lines.append(f"{name}_count{suffix} {item['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def _write_atomic(path: str, text: str) -> None:
+    file_path = Path(path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = file_path.with_name(file_path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, file_path)
+
+
+metrics = Registry()
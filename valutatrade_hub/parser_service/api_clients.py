@@ -23,6 +23,29 @@ class BaseApiClient(ABC):
         raise NotImplementedError
 
 
+def _fiat_pairs(cfg: ParserConfig, rates: dict, source: str) -> dict[str, dict]:
+    """
+    Пары фиатных валют ко всем котируемым валютам из одного ответа
+    вида {CODE: сколько CODE за 1 BASE} (кросс-курсы считаются здесь,
+    чтобы get_rate находил пару напрямую).
+    """
+    rates = {**rates, cfg.BASE_CURRENCY: 1.0}
+    now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+    out: dict[str, dict] = {}
+    for code in dict.fromkeys((*cfg.FIAT_CURRENCIES, *cfg.QUOTE_CURRENCIES)):
+        raw = rates.get(code)
+        if not isinstance(raw, (int, float)) or raw == 0:
+            continue
+        for quote in cfg.QUOTE_CURRENCIES:
+            quote_raw = rates.get(quote)
+            if quote == code or not isinstance(quote_raw, (int, float)):
+                continue
+            # 1 CODE = quote_raw / raw QUOTE
+            out[f"{code}_{quote}"] = {"rate": float(quote_raw) / raw, "updated_at": now, "source": source}
+    return out
+
+
 def _http_get_json(url: str, timeout: int) -> dict:
     try:
         with urllib.request.urlopen(url, timeout=timeout) as resp:
@@ -45,7 +68,9 @@ class CoinGeckoClient(BaseApiClient):
         if not ids:
             return {}
 
-        qs = urllib.parse.urlencode({"ids": ",".join(ids), "vs_currencies": self.cfg.BASE_CURRENCY.lower()})
+        # Все котируемые валюты одним запросом: vs_currencies=usd,eur,rub
+        quotes = self.cfg.QUOTE_CURRENCIES
+        qs = urllib.parse.urlencode({"ids": ",".join(ids), "vs_currencies": ",".join(q.lower() for q in quotes)})
         url = f"{self.cfg.COINGECKO_URL}?{qs}"
 
         payload = _http_get_json(url, self.cfg.REQUEST_TIMEOUT)
@@ -53,9 +78,13 @@ class CoinGeckoClient(BaseApiClient):
         now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
         out: dict[str, dict] = {}
         for code, cg_id in self.cfg.CRYPTO_ID_MAP.items():
-            if cg_id in payload and self.cfg.BASE_CURRENCY.lower() in payload[cg_id]:
-                rate = float(payload[cg_id][self.cfg.BASE_CURRENCY.lower()])
-                out[f"{code}_{self.cfg.BASE_CURRENCY}"] = {"rate": rate, "updated_at": now, "source": "CoinGecko"}
+            prices = payload.get(cg_id)
+            if not isinstance(prices, dict):
+                continue
+            for quote in quotes:
+                if quote.lower() in prices:
+                    rate = float(prices[quote.lower()])
+                    out[f"{code}_{quote}"] = {"rate": rate, "updated_at": now, "source": "CoinGecko"}
         return out
 
 
@@ -73,16 +102,22 @@ class ExchangeRateApiClient(BaseApiClient):
         if payload.get("result") != "success":
             raise ApiRequestError(payload.get("error-type", "unknown error"))
 
+        # Тут rate = сколько CODE за 1 BASE; один запрос дает все кросс-курсы
         rates = payload.get("conversion_rates") or payload.get("rates") or {}
-        now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        return _fiat_pairs(self.cfg, rates, "ExchangeRate-API")
 
-        out: dict[str, dict] = {}
-        for code in self.cfg.FIAT_CURRENCIES:
-            if code in rates:
-                # Тут rate = сколько CODE за 1 USD (если base USD).
-                # Нам нужен CODE_USD (1 CODE = ? USD), то есть обратное значение.
-                raw = float(rates[code])
-                if raw == 0:
-                    continue
-                out[f"{code}_{self.cfg.BASE_CURRENCY}"] = {"rate": 1.0 / raw, "updated_at": now, "source": "ExchangeRate-API"}
-        return out
+
+class OpenErApiClient(BaseApiClient):
+    """Публичный API open.er-api.com (без ключа), фиатные валюты."""
+
+    def __init__(self, cfg: ParserConfig) -> None:
+        self.cfg = cfg
+
+    def fetch_rates(self) -> dict[str, dict]:
+        url = f"{self.cfg.OPEN_ER_API_URL}/{self.cfg.BASE_CURRENCY}"
+        payload = _http_get_json(url, self.cfg.REQUEST_TIMEOUT)
+
+        if payload.get("result") != "success" or not isinstance(payload.get("rates"), dict):
+            raise ApiRequestError(payload.get("error-type", "invalid response"))
+
+        return _fiat_pairs(self.cfg, payload["rates"], "open.er-api")
@@ -1,31 +1,84 @@
-import os
-from dataclasses import dataclass
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from ..core.currencies import codes_by_type, provider_ids
 
 
 @dataclass(frozen=True)
 class ParserConfig:
-    EXCHANGERATE_API_KEY: str | None = os.getenv("EXCHANGERATE_API_KEY")
+    EXCHANGERATE_API_KEY: str | None = None
 
     COINGECKO_URL: str = "https://api.coingecko.com/api/v3/simple/price"
     EXCHANGERATE_API_URL: str = "https://v6.exchangerate-api.com/v6"
+    OPEN_ER_API_URL: str = "https://open.er-api.com/v6/latest"
 
     BASE_CURRENCY: str = "USD"
+    # Валюты котировки: пары CODE_<QUOTE> запрашиваются для каждой из них
+    QUOTE_CURRENCIES: tuple[str, ...] = ("USD", "EUR", "RUB")
 
-    FIAT_CURRENCIES: tuple[str, ...] = ("EUR", "GBP", "RUB")
-    CRYPTO_CURRENCIES: tuple[str, ...] = ("BTC", "ETH", "SOL")
+    # Списки валют и id CoinGecko берутся из реестра валют (core/currencies.json)
+    FIAT_CURRENCIES: tuple[str, ...] = field(default_factory=lambda: codes_by_type("fiat"))
+    CRYPTO_CURRENCIES: tuple[str, ...] = field(default_factory=lambda: codes_by_type("crypto"))
 
-    CRYPTO_ID_MAP: dict[str, str] = None 
+    CRYPTO_ID_MAP: dict[str, str] = field(default_factory=lambda: provider_ids("coingecko"))
 
     RATES_FILE_PATH: str = "data/rates.json"
     HISTORY_FILE_PATH: str = "data/exchange_rates.json"
+    FULL_SNAPSHOT_EVERY: int = 1
+    # Бинарная копия снимка для чтения через mmap (None — не писать)
+    RATES_BINARY_PATH: str | None = None
 
     REQUEST_TIMEOUT: int = 10
 
+    # Офлайн-источники: записанная фикстура и случайное блуждание
+    FIXTURE_PATH: str = "data/rates_fixture.jsonl"
+    TICK_RATE: float = 0.0
+    RANDOM_SEED: int | None = None
+
+    # Слияние источников: медиана, если пару дали не меньше QUORUM источников,
+    # иначе курс источника с наивысшим приоритетом
+    QUORUM: int = 2
+    # Допустимое отклонение от прошлого снимка и от медианы (доля)
+    MAX_DEVIATION: float = 0.2
+    # Сколько обновлений подряд должен держаться новый уровень, отвергнутый
+    # как выброс, чтобы его приняли без кворума
+    OUTLIER_CONFIRMATIONS: int = 3
+    # Порядок источников по парам: {"BTC_USD": ("coingecko", ...)}
+    PAIR_PRIORITY: dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+    @classmethod
+    def from_settings(cls, snapshot) -> "ParserConfig":
+        """Конфиг парсера из снимка настроек приложения (пути, адреса, ключ, таймаут)."""
+        urls = {
+            name: value for name, value in (
+                ("COINGECKO_URL", snapshot.coingecko_url),
+                ("EXCHANGERATE_API_URL", snapshot.exchangerate_api_url),
+                ("OPEN_ER_API_URL", snapshot.open_er_api_url),
+            ) if value
+        }
+        base = snapshot.default_base_currency
+        return cls(
+            **urls,
+            EXCHANGERATE_API_KEY=snapshot.exchangerate_api_key,
+            BASE_CURRENCY=base,
+            QUOTE_CURRENCIES=tuple(dict.fromkeys([base, *snapshot.rates_quote_currencies])),
+            RATES_FILE_PATH=snapshot.rates_file,
+            HISTORY_FILE_PATH=snapshot.history_file,
+            FULL_SNAPSHOT_EVERY=snapshot.rates_full_snapshot_every,
+            RATES_BINARY_PATH=snapshot.rates_binary_file,
+            REQUEST_TIMEOUT=snapshot.request_timeout,
+            FIXTURE_PATH=snapshot.rates_fixture_file,
+            TICK_RATE=snapshot.rates_tick_rate,
+            RANDOM_SEED=snapshot.rates_seed,
+            QUORUM=snapshot.rates_quorum,
+            MAX_DEVIATION=snapshot.rates_max_deviation,
+            OUTLIER_CONFIRMATIONS=snapshot.rates_outlier_confirmations,
+            PAIR_PRIORITY=dict(snapshot.rates_pair_priority),
+        )
+
 
-DEFAULT_CONFIG = ParserConfig(
-    CRYPTO_ID_MAP={
-        "BTC": "bitcoin",
-        "ETH": "ethereum",
-        "SOL": "solana",
-    }
-)
+def load_config() -> ParserConfig:
+    """Конфиг парсера, согласованный с текущими настройками приложения."""
+    from ..infra.settings import settings
+    return ParserConfig.from_settings(settings.snapshot())
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import json
+import math
+import random
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ..core.currencies import list_currencies
+from ..core.exceptions import ApiRequestError
+from ..core.utils import load_json_lines
+from .api_clients import BaseApiClient
+
+# Стартовые курсы к USD для валют, у которых еще нет сохраненного курса
+DEFAULT_PRICES: dict[str, float] = {
+    "BTC": 50000.0,
+    "ETH": 3000.0,
+    "SOL": 130.0,
+    "EUR": 1.08,
+    "GBP": 1.27,
+    "RUB": 0.011,
+}
+
+
+def seed_prices(pairs: dict[str, dict] | None = None) -> dict[str, float]:
+    """
+    Стартовые курсы к USD для случайного блуждания. Валюты берутся из
+    реестра валют, курс — из последнего снимка pairs (CODE_USD), чтобы
+    блуждание продолжалось с сохраненного курса, а не прыгало к
+    DEFAULT_PRICES и не отбрасывалось как выброс. Валюты без известного
+    курса пропускаются.
+    """
+    pairs = pairs or {}
+    prices = {}
+    for currency in list_currencies():
+        code = currency.code
+        if code == "USD":
+            continue
+        try:
+            rate = float(pairs[f"{code}_USD"]["rate"])
+        except (KeyError, TypeError, ValueError):
+            rate = 0.0
+        if rate <= 0:
+            rate = DEFAULT_PRICES.get(code, 0.0)
+        if rate > 0:
+            prices[code] = rate
+    return prices
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class RecordingClient(BaseApiClient):
+    """Обертка над клиентом: каждый ответ дописывается в JSON-lines фикстуру."""
+
+    def __init__(self, client: BaseApiClient, path: str, source: str) -> None:
+        self.client = client
+        self.path = Path(path)
+        self.source = source
+
+    def fetch_rates(self) -> dict[str, dict]:
+        pairs = self.client.fetch_rates()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        frame = {"source": self.source, "recorded_at": _now(), "pairs": pairs}
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(frame, ensure_ascii=False) + "\n")
+        return pairs
+
+
+def fixture_sources(path: str) -> list[str]:
+    """Имена источников, записанных в фикстуре (в порядке появления)."""
+    names = []
+    for frame in load_json_lines(path):
+        if isinstance(frame, dict) and frame.get("source") not in names:
+            names.append(frame.get("source"))
+    return names
+
+
+class ReplayClient(BaseApiClient):
+    """
+    Проигрывает ответы, записанные RecordingClient.
+
+    Каждый вызов отдает следующий кадр источника source (по кругу, если
+    loop). updated_at заменяется на текущее время, чтобы снимок проходил
+    проверку TTL; keep_timestamps=True оставляет записанное время.
+    """
+
+    def __init__(self, path: str, source: str | None = None,
+                 loop: bool = True, keep_timestamps: bool = False) -> None:
+        self.frames = [
+            frame["pairs"] for frame in load_json_lines(path)
+            if isinstance(frame, dict) and isinstance(frame.get("pairs"), dict)
+            and (source is None or frame.get("source") == source)
+        ]
+        self.loop = loop
+        self.keep_timestamps = keep_timestamps
+        self.pos = 0
+
+    def fetch_rates(self) -> dict[str, dict]:
+        if self.pos >= len(self.frames):
+            if not self.loop or not self.frames:
+                raise ApiRequestError("фикстура курсов закончилась")
+            self.pos = 0
+        pairs = self.frames[self.pos]
+        self.pos += 1
+        if self.keep_timestamps:
+            return {pair: dict(info) for pair, info in pairs.items()}
+        now = _now()
+        return {pair: {**info, "updated_at": now} for pair, info in pairs.items()}
+
+
+class RandomWalk:
+    """
+    Геометрическое случайное блуждание курсов: за тик цена умножается
+    на exp(N(0, volatility)). Общий для клиента и заглушки HTTP-сервера.
+    """
+
+    def __init__(self, prices: dict[str, float] | None = None,
+                 volatility: float = 0.002, seed: int | None = None) -> None:
+        self.prices = dict(prices or seed_prices())
+        self.volatility = volatility
+        self.rng = random.Random(seed)
+
+    def step(self) -> dict[str, float]:
+        for code, price in self.prices.items():
+            self.prices[code] = price * math.exp(self.rng.gauss(0.0, self.volatility))
+        return self.prices
+
+
+class RandomWalkClient(BaseApiClient):
+    """
+    Синтетический источник: пары CODE_<quote> по случайному блужданию
+    для каждой валюты котировки (по умолчанию только base).
+
+    tick_rate — тиков в секунду: вызов ждет следующего тика, так что цикл
+    обновлений идет с заданной частотой; 0 — без ожидания.
+    """
+
+    def __init__(self, walk: RandomWalk | None = None, base: str = "USD",
+                 tick_rate: float = 0.0, source: str = "RandomWalk",
+                 quotes: tuple[str, ...] | None = None) -> None:
+        self.walk = walk or RandomWalk()
+        self.base = base
+        self.quotes = quotes or (base,)
+        self.tick_rate = tick_rate
+        self.source = source
+        self._next_tick = None
+
+    def _wait_tick(self) -> None:
+        if self.tick_rate <= 0:
+            return
+        now = time.monotonic()
+        if self._next_tick is not None and now < self._next_tick:
+            time.sleep(self._next_tick - now)
+            now = self._next_tick
+        self._next_tick = now + 1.0 / self.tick_rate
+
+    def fetch_rates(self) -> dict[str, dict]:
+        self._wait_tick()
+        prices = {"USD": 1.0, **self.walk.step()}
+        now = _now()
+        return {
+            f"{code}_{quote}": {"rate": price / prices[quote], "updated_at": now, "source": self.source}
+            for quote in self.quotes if quote in prices
+            for code, price in prices.items() if code != quote
+        }
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import logging
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable
+
+from ..core.exceptions import ApiRequestError
+from ..metrics import metrics
+from .api_clients import BaseApiClient, CoinGeckoClient, ExchangeRateApiClient, OpenErApiClient
+from .config import ParserConfig
+from .offline import RandomWalk, RandomWalkClient, RecordingClient, ReplayClient, fixture_sources, seed_prices
+
+
+@dataclass
+class Source:
+    name: str
+    client: BaseApiClient
+    priority: int = 0
+
+
+class SourceRegistry:
+    """
+    Реестр источников курсов.
+
+    Источники опрашиваются параллельно, поэтому лишний провайдер почти
+    не увеличивает время обновления. Котировки одной пары сливаются так:
+      1. отбрасываются выбросы — отклонение от прошлого снимка больше
+         max_deviation (если же от него ушли все источники, курс признается
+         при кворуме или после confirm_after обновлений подряд, согласных
+         между собой: рынок действительно сдвинулся);
+      2. при 3+ котировках отбрасываются отклоняющиеся от медианы;
+      3. если осталось не меньше quorum котировок — берется медиана,
+         иначе котировка источника с наивысшим приоритетом для пары;
+      4. если не осталось ни одной — переносится прошлый курс с
+         пометкой "stale": True, а отвергнутый уровень и число обновлений
+         подряд, которые его подтвердили, хранятся в "pending".
+    """
+
+    def __init__(self, quorum: int = 2, max_deviation: float = 0.2,
+                 pair_priority: dict[str, tuple[str, ...]] | None = None,
+                 confirm_after: int = 3) -> None:
+        self.quorum = quorum
+        self.max_deviation = max_deviation
+        self.confirm_after = max(int(confirm_after), 1)
+        self.pair_priority = pair_priority or {}
+        self.sources: dict[str, Source] = {}
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, name: str, client: BaseApiClient, priority: int = 0) -> None:
+        """Добавляет источник; больший priority важнее."""
+        self.sources[name] = Source(name, client, priority)
+
+    def record(self, path: str) -> None:
+        """Пишет ответы всех источников в фикстуру path (для replay)."""
+        for source in self.sources.values():
+            source.client = RecordingClient(source.client, path, source.name)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def fetch_all(self) -> dict[str, dict[str, dict]]:
+        """Опрашивает все источники параллельно: {имя источника: пары}."""
+        if not self.sources:
+            return {}
+
+        def fetch(source: Source) -> dict[str, dict]:
+            with metrics.timer("rates_fetch_seconds", client=source.name):
+                return source.client.fetch_rates()
+
+        results: dict[str, dict[str, dict]] = {}
+        with ThreadPoolExecutor(max_workers=len(self.sources)) as pool:
+            futures = {name: pool.submit(fetch, src) for name, src in self.sources.items()}
+            for name, future in futures.items():
+                try:
+                    got = future.result()
+                    self.logger.info("OK %s: %d rates", name, len(got))
+                    results[name] = got
+                except ApiRequestError as e:
+                    metrics.counter("rates_fetch_errors_total", client=name).inc()
+                    self.logger.error("Failed %s: %s", name, e)
+        return results
+
+    def _rank(self, pair: str, name: str) -> tuple[int, int]:
+        order = self.pair_priority.get(pair, ())
+        pos = order.index(name) if name in order else len(order)
+        return pos, -self.sources[name].priority if name in self.sources else 0
+
+    def _deviates(self, rate: float, ref: float) -> bool:
+        return ref > 0 and abs(rate / ref - 1) > self.max_deviation
+
+    def merge(self, results: dict[str, dict[str, dict]],
+              previous: dict[str, dict] | None = None) -> dict[str, dict]:
+        """Сливает котировки источников в один снимок (каноническая схема пар)."""
+        previous = previous or {}
+        quotes: dict[str, list[tuple[str, dict]]] = {}
+        for name, pairs in results.items():
+            for pair, info in pairs.items():
+                quotes.setdefault(pair, []).append((name, info))
+
+        merged: dict[str, dict] = {}
+        for pair, items in quotes.items():
+            items.sort(key=lambda item: self._rank(pair, item[0]))
+
+            pending = None
+            prev = previous.get(pair, {}).get("rate")
+            if prev:
+                kept = [it for it in items if not self._deviates(float(it[1]["rate"]), float(prev))]
+                if not kept and len(items) >= self.quorum:
+                    kept = items
+                if not kept:
+                    pending = self._pending_move(items, previous[pair].get("pending"))
+                    if pending[1] >= self.confirm_after:
+                        self.logger.warning("Accepted %s move to %s after %d consistent updates",
+                                            pair, pending[0], pending[1])
+                        kept, pending = items, None
+                self._count_rejected(pair, items, kept)
+                items = kept
+
+            if len(items) >= 3:
+                median = statistics.median(float(info["rate"]) for _, info in items)
+                kept = [it for it in items if not self._deviates(float(it[1]["rate"]), median)]
+                self._count_rejected(pair, items, kept)
+                items = kept
+
+            if not items:
+                # Все котировки отброшены: остается прошлый курс с пометкой
+                # stale. Если пару удалить, следующее обновление не с чем
+                # будет сравнить и выброс пройдет как новый курс
+                if pair in previous:
+                    carried = dict(previous[pair], stale=True)
+                    carried.pop("pending", None)
+                    if pending:
+                        carried["pending"] = pending
+                    merged[pair] = carried
+                continue
+
+            if len(items) >= self.quorum and len(items) > 1:
+                rate = statistics.median(float(info["rate"]) for _, info in items)
+                merged[pair] = {
+                    "rate": rate,
+                    "updated_at": max(info["updated_at"] for _, info in items),
+                    "source": "median(" + ",".join(info["source"] for _, info in items) + ")",
+                }
+            else:
+                info = items[0][1]
+                merged[pair] = {
+                    "rate": float(info["rate"]),
+                    "updated_at": info["updated_at"],
+                    "source": info["source"],
+                }
+        return merged
+
+    def _pending_move(self, items: list, pending: list | None) -> list:
+        """
+        [уровень, число обновлений подряд] для котировок, ушедших от
+        прошлого курса: счет продолжается, если новый уровень согласуется
+        с прошлым отвергнутым, иначе начинается заново.
+        """
+        rate = statistics.median(float(info["rate"]) for _, info in items)
+        if pending and not self._deviates(rate, float(pending[0])):
+            return [rate, int(pending[1]) + 1]
+        return [rate, 1]
+
+    def _count_rejected(self, pair: str, before: list, after: list) -> None:
+        for name, info in before:
+            if (name, info) not in after:
+                metrics.counter("rates_outliers_total", client=name).inc()
+                self.logger.warning("Outlier %s from %s: %s", pair, name, info["rate"])
+
+
+# Фабрики известных провайдеров: имя -> (конструктор, приоритет по умолчанию)
+PROVIDERS: dict[str, tuple[Callable[[ParserConfig], BaseApiClient], int]] = {
+    "coingecko": (CoinGeckoClient, 20),
+    "exchangerate": (ExchangeRateApiClient, 20),
+    "openerapi": (OpenErApiClient, 10),
+}
+
+
+# Офлайн-источники подключаются только явно (--source replay/random)
+OFFLINE_SOURCES = ("replay", "random")
+
+
+def build_registry(cfg: ParserConfig, only: str | None = None,
+                   pairs: dict[str, dict] | None = None) -> SourceRegistry:
+    """
+    Реестр со всеми сетевыми провайдерами (или только с одним источником).
+    pairs — последний снимок курсов: с него стартует случайное блуждание.
+    """
+    registry = SourceRegistry(cfg.QUORUM, cfg.MAX_DEVIATION, cfg.PAIR_PRIORITY,
+                              cfg.OUTLIER_CONFIRMATIONS)
+
+    if only == "replay":
+        # Каждый записанный источник проигрывается отдельно, чтобы слияние
+        # (кворум, приоритеты) работало так же, как при записи
+        names = fixture_sources(cfg.FIXTURE_PATH)
+        if not names:
+            raise ApiRequestError(f"фикстура {cfg.FIXTURE_PATH} пуста или не найдена")
+        for name in names:
+            priority = PROVIDERS[name][1] if name in PROVIDERS else 0
+            registry.register(name, ReplayClient(cfg.FIXTURE_PATH, name), priority)
+        return registry
+
+    if only == "random":
+        walk = RandomWalk(seed_prices(pairs), seed=cfg.RANDOM_SEED)
+        registry.register("random", RandomWalkClient(walk, cfg.BASE_CURRENCY, cfg.TICK_RATE,
+                                                      quotes=cfg.QUOTE_CURRENCIES))
+        return registry
+
+    for name, (factory, priority) in PROVIDERS.items():
+        if only in (None, name):
+            registry.register(name, factory(cfg), priority)
+    return registry
@@ -1,27 +1,228 @@
 from __future__ import annotations
 
+import json
 from datetime import datetime, timezone
 from pathlib import Path
 
-from ..core.utils import load_json, save_json
+from ..core.utils import load_json, load_json_lines, save_json
+from ..infra.rates_mmap import RatesMmapWriter
+from ..infra.storage import FileLock, iter_json_object
+from ..metrics import metrics
+
+
+def delta_path(rates_path: str | Path) -> Path:
+    """Файл дельт рядом со снимком: rates.json -> rates.delta.jsonl."""
+    path = Path(rates_path)
+    return path.with_name(path.stem + ".delta.jsonl")
+
+
+def apply_delta(pairs: dict[str, dict], delta: dict) -> None:
+    """
+    Применяет строку дельты к парам снимка (на месте):
+    changed — новые значения, removed — пары, которых не было в обновлении,
+    остальные пары подтверждены без изменений к моменту confirmed_at.
+    """
+    for pair in delta.get("removed", ()):
+        pairs.pop(pair, None)
+    confirmed_at = delta.get("confirmed_at")
+    if confirmed_at:
+        for info in pairs.values():
+            if not info.get("stale") and (info.get("updated_at") or "") < confirmed_at:
+                info["updated_at"] = confirmed_at
+    pairs.update(delta.get("changed", {}))
+
+
+def _filter_pairs(pairs: dict[str, dict], prefix: str) -> dict[str, dict]:
+    return {pair: info for pair, info in pairs.items() if pair.startswith(prefix)}
+
+
+def _read_full_snapshot(rates_path: str | Path, prefix: str | None) -> dict:
+    """
+    rates.json как {"pairs", "last_refresh", "seq"}. С prefix файл
+    разбирается потоком (iter_json_object): в память попадают только
+    отобранные пары, прочие отбрасываются по ходу разбора.
+    """
+    if not prefix:
+        data = load_json(str(rates_path))
+        return data if isinstance(data, dict) else {}
+    data = {}
+    pairs = {}
+    try:
+        for key, value in iter_json_object(str(rates_path), nested=("pairs",),
+                                           keep=lambda pair: pair.startswith(prefix)):
+            if isinstance(key, tuple):
+                pairs[key[1]] = value
+            elif key != "pairs":
+                data[key] = value
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return {}
+    data["pairs"] = pairs
+    return data
+
+
+def load_rates_snapshot(rates_path: str | Path, prefix: str | None = None) -> dict:
+    """
+    Полный снимок + дельты после него: {"pairs", "last_refresh", "seq"}.
+    prefix оставляет только пары, начинающиеся с него (например "BTC_"):
+    фильтр работает во время разбора снимка, и дельты накладываются уже
+    на отобранные пары.
+    """
+    data = _read_full_snapshot(rates_path, prefix)
+    pairs = data.get("pairs") if isinstance(data.get("pairs"), dict) else {}
+    seq = int(data.get("seq", 0))
+    last_refresh = data.get("last_refresh")
+
+    for delta in load_json_lines(str(delta_path(rates_path))):
+        # Дельты, вошедшие в полный снимок (сбой до очистки файла), пропускаются
+        if not isinstance(delta, dict) or int(delta.get("seq", 0)) <= seq:
+            continue
+        if prefix:
+            delta = {**delta, "changed": _filter_pairs(delta.get("changed", {}), prefix)}
+        apply_delta(pairs, delta)
+        seq = int(delta["seq"])
+        last_refresh = delta.get("at", last_refresh)
+
+    return {"pairs": pairs, "last_refresh": last_refresh, "seq": seq}
 
 
 class RatesStorage:
-    def __init__(self, rates_path: str, history_path: str) -> None:
+    """
+    Снимок курсов и история.
+
+    Прошлый снимок держится в памяти; при обновлении сравниваются курсы.
+    Неизменившиеся пары не попадают в историю, а в rates.json вместо
+    полной перезаписи дописывается короткая дельта (rates.delta.jsonl).
+    Раз в full_every обновлений снимок пишется целиком, а дельты
+    очищаются. Читать снимок нужно через load_rates_snapshot.
+
+    Если задан binary_path, после каждого обновления снимок публикуется
+    еще и в бинарный файл для чтения через mmap (infra/rates_mmap.py).
+
+    Номер seq каждого снимка растет монотонно и служит его версией: она
+    записывается в rates.json, в дельты и в заголовок rates.bin, а
+    сделки запоминают версию, по курсу которой исполнены.
+
+    Запись идет под блокировкой rates.json: если файлы снимка изменил
+    другой процесс, seq и пары перечитываются с диска до записи.
+    """
+
+    def __init__(self, rates_path: str, history_path: str, full_every: int = 1,
+                 binary_path: str | None = None) -> None:
         self.rates_path = Path(rates_path)
         self.history_path = Path(history_path)
+        self.delta_path = delta_path(self.rates_path)
+        self.full_every = max(int(full_every), 1)
+        self._pairs: dict[str, dict] | None = None
+        self._seq = 0
+        self._deltas = 0
+        self._changed: dict[str, dict] | None = None
+        self._disk: tuple | None = None
+        self.binary = RatesMmapWriter(binary_path) if binary_path else None
+
+    def _disk_version(self) -> tuple:
+        """(inode, mtime_ns, размер) файла снимка и файла дельт."""
+        version = []
+        for path in (self.rates_path, self.delta_path):
+            try:
+                st = path.stat()
+                version.append((st.st_ino, st.st_mtime_ns, st.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
+
+    def _load_state(self) -> None:
+        if self._pairs is None:
+            self._disk = self._disk_version()
+            snapshot = load_rates_snapshot(self.rates_path)
+            self._pairs = snapshot["pairs"]
+            self._seq = snapshot["seq"]
+            self._deltas = len(load_json_lines(str(self.delta_path)))
+
+    @property
+    def version(self) -> int:
+        """Версия последнего записанного снимка."""
+        self._load_state()
+        return self._seq
+
+    def read_pairs(self) -> dict[str, dict]:
+        """Пары последнего снимка (пусто, если снимка нет или схема чужая)."""
+        self._load_state()
+        return {pair: dict(info) for pair, info in self._pairs.items()}
+
+    def diff(self, pairs: dict[str, dict]) -> tuple[dict[str, dict], list[str]]:
+        """Изменившиеся (новые) пары и пары, пропавшие из обновления."""
+        self._load_state()
+        changed = {}
+        for pair, info in pairs.items():
+            old = self._pairs.get(pair)
+            if (old is None or old.get("rate") != info.get("rate") or old.get("source") != info.get("source")
+                    or old.get("stale") != info.get("stale") or old.get("pending") != info.get("pending")):
+                changed[pair] = dict(info)
+        removed = [pair for pair in self._pairs if pair not in pairs]
+        return changed, removed
 
-    def write_rates_snapshot(self, pairs: dict[str, dict]) -> None:
+    def write_rates_snapshot(self, pairs: dict[str, dict]) -> dict[str, dict]:
+        """Сохраняет снимок; возвращает изменившиеся пары."""
+        with FileLock(str(self.rates_path)):
+            if self._disk != self._disk_version():
+                self._pairs = None
+            changed = self._write_locked(pairs)
+            self._disk = self._disk_version()
+        return changed
+
+    def _write_locked(self, pairs: dict[str, dict]) -> dict[str, dict]:
         now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
-        data = {"pairs": pairs, "last_refresh": now}
-        save_json(str(self.rates_path), data)
+        changed, removed = self.diff(pairs)
+        # Перенесенные (stale) курсы не подтверждены источниками
+        unchanged = [info.get("updated_at") or now for pair, info in pairs.items()
+                     if pair not in changed and not info.get("stale")]
+
+        metrics.counter("rates_pairs_changed_total").inc(len(changed))
+        metrics.counter("rates_pairs_unchanged_total").inc(len(unchanged))
+
+        delta = {"seq": self._seq + 1, "at": now, "changed": changed}
+        if removed:
+            delta["removed"] = removed
+        if unchanged:
+            delta["confirmed_at"] = min(unchanged)
+        apply_delta(self._pairs, delta)
+        self._seq += 1
+        self._changed = changed
+
+        if self._deltas + 1 >= self.full_every:
+            save_json(str(self.rates_path), {"pairs": self._pairs, "last_refresh": now, "seq": self._seq})
+            if self._deltas:
+                self.delta_path.unlink(missing_ok=True)
+            self._deltas = 0
+        else:
+            self.delta_path.parent.mkdir(parents=True, exist_ok=True)
+            line = json.dumps(delta, ensure_ascii=False) + "\n"
+            with self.delta_path.open("a", encoding="utf-8") as f:
+                f.write(line)
+            metrics.counter("json_written_bytes_total").inc(len(line.encode("utf-8")))
+            self._deltas += 1
+
+        if self.binary is not None:
+            self.binary.publish(self._pairs, self._seq)
+        return changed
 
     def append_history(self, pairs: dict[str, dict]) -> None:
-        # Минимальная история: массив записей
-        history = load_json(str(self.history_path))
-        if not isinstance(history, list):
-            history = []
+        # В историю попадают только пары, изменившиеся в последнем снимке
+        if self._changed is not None:
+            pairs = {pair: obj for pair, obj in pairs.items() if pair in self._changed}
+        if not pairs:
+            return
+
+        with FileLock(str(self.history_path)):
+            # Минимальная история: массив записей
+            history = load_json(str(self.history_path))
+            if not isinstance(history, list):
+                history = []
+            self._extend_history(history, pairs)
+            save_json(str(self.history_path), history)
 
+    @staticmethod
+    def _extend_history(history: list, pairs: dict[str, dict]) -> None:
         for pair, obj in pairs.items():
             entry = {
                 "id": f"{pair}_{obj.get('updated_at')}",
@@ -33,5 +234,3 @@ class RatesStorage:
                 "meta": {},
             }
             history.append(entry)
-
-        save_json(str(self.history_path), history)
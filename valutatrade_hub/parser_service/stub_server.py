@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import ParserConfig
+from .offline import RandomWalk
+
+
+class StubRatesServer:
+    """
+    Локальная заглушка провайдеров курсов с теми же формами ответов:
+
+      GET /api/v3/simple/price?ids=bitcoin&vs_currencies=usd   (CoinGecko)
+      GET /v6/<key>/latest/<BASE>                              (ExchangeRate-API)
+      GET /v6/latest/<BASE>                                    (open.er-api.com)
+
+    Курсы идут по случайному блужданию, шаг — на каждый запрос.
+    Чтобы приложение ходило сюда, задайте в config.json coingecko_url,
+    exchangerate_api_url и open_er_api_url (см. urls()).
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 walk: RandomWalk | None = None, cfg: ParserConfig | None = None) -> None:
+        self.walk = walk or RandomWalk()
+        cfg = cfg or ParserConfig()
+        self.id_map = {cg_id: code for code, cg_id in cfg.CRYPTO_ID_MAP.items()}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self) -> dict[str, str]:
+        """Настройки config.json, направляющие клиентов на заглушку."""
+        return {
+            "coingecko_url": f"{self.base_url}/api/v3/simple/price",
+            "exchangerate_api_url": f"{self.base_url}/v6",
+            "open_er_api_url": f"{self.base_url}/v6/latest",
+        }
+
+    def _prices(self) -> dict[str, float]:
+        with self._lock:
+            self.requests += 1
+            return {"USD": 1.0, **self.walk.step()}
+
+    def coingecko(self, query: dict[str, list[str]]) -> tuple[int, dict]:
+        ids = ",".join(query.get("ids", [])).split(",")
+        vs = [v.upper() for v in ",".join(query.get("vs_currencies", [])).split(",") if v]
+        prices = self._prices()
+        out = {}
+        for cg_id in ids:
+            code = self.id_map.get(cg_id)
+            if code not in prices:
+                continue
+            out[cg_id] = {v.lower(): prices[code] / prices[v] for v in vs if v in prices}
+        return 200, out
+
+    def latest(self, base: str, key: str) -> tuple[int, dict]:
+        prices = self._prices()
+        base = base.upper()
+        if base not in prices:
+            return 404, {"result": "error", "error-type": "unsupported-code"}
+        # Сколько CODE за 1 BASE
+        rates = {code: prices[base] / price for code, price in prices.items()}
+        return 200, {"result": "success", "base_code": base, key: rates}
+
+    def route(self, path: str) -> tuple[int, dict]:
+        url = urllib.parse.urlsplit(path)
+        parts = [p for p in url.path.split("/") if p]
+        if url.path == "/api/v3/simple/price":
+            return self.coingecko(urllib.parse.parse_qs(url.query))
+        if len(parts) == 3 and parts[:2] == ["v6", "latest"]:
+            return self.latest(parts[2], "rates")
+        if len(parts) == 4 and parts[0] == "v6" and parts[2] == "latest":
+            return self.latest(parts[3], "conversion_rates")
+        return 404, {"error": "not found"}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, payload = server.route(self.path)
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubRatesServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubRatesServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Заглушка API курсов (CoinGecko / ExchangeRate-API)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--volatility", type=float, default=0.002)
+    args = parser.parse_args(argv)
+
+    server = StubRatesServer(args.host, args.port, RandomWalk(volatility=args.volatility, seed=args.seed))
+    print(f"Заглушка курсов: {server.base_url}")
+    print("Настройки для config.json:")
+    print(json.dumps(server.urls(), indent=2))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,33 +2,40 @@ from __future__ import annotations
 
 import logging
 
+from ..core.events import EventBus, RatesUpdated, bus
 from ..core.exceptions import ApiRequestError
 from .api_clients import BaseApiClient
+from .registry import SourceRegistry
 from .storage import RatesStorage
 
 
 class RatesUpdater:
-    def __init__(self, clients: list[BaseApiClient], storage: RatesStorage) -> None:
-        self.clients = clients
+    def __init__(self, clients: SourceRegistry | list[BaseApiClient], storage: RatesStorage,
+                 event_bus: EventBus | None = None) -> None:
+        if not isinstance(clients, SourceRegistry):
+            # Список клиентов: приоритет по порядку (первый важнее)
+            registry = SourceRegistry()
+            for i, client in enumerate(clients):
+                registry.register(client.__class__.__name__, client, priority=-i)
+            clients = registry
+        self.registry = clients
         self.storage = storage
+        self.bus = event_bus or bus
         self.logger = logging.getLogger(__name__)
 
     def run_update(self) -> dict[str, dict]:
-        merged: dict[str, dict] = {}
-
-        for client in self.clients:
-            name = client.__class__.__name__
-            try:
-                self.logger.info("Fetching rates from %s ...", name)
-                got = client.fetch_rates()
-                self.logger.info("OK %s: %d rates", name, len(got))
-                merged.update(got)
-            except ApiRequestError as e:
-                self.logger.error("Failed %s: %s", name, e)
+        self.logger.info("Fetching rates from %s ...", ", ".join(self.registry.sources))
+        results = self.registry.fetch_all()
+        merged = self.registry.merge(results, self.storage.read_pairs())
 
         if not merged:
             raise ApiRequestError("не удалось обновить курсы: все источники недоступны")
 
         self.storage.write_rates_snapshot(merged)
-        self.storage.append_history(merged)
+        # Перенесенные без подтверждения курсы не пишутся в историю
+        # и не исполняют ордера/алерты
+        fresh = {pair: info for pair, info in merged.items() if not info.get("stale")}
+        self.storage.append_history(fresh)
+
+        self.bus.publish(RatesUpdated(fresh, self.storage.version))
         return merged
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+
+# Модуль, импорт которого замеряется в сводке (точка входа CLI)
+ENTRY_MODULE = "valutatrade_hub.cli.interface"
+
+
+def import_times(module: str = ENTRY_MODULE, top: int = 15) -> list[tuple[int, int, str]]:
+    """
+    Время импорта модулей, как у `python -X importtime`.
+    Замер в отдельном процессе, чтобы кеш sys.modules не мешал.
+    Возвращает [(self_us, cumulative_us, module)] по убыванию cumulative.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, timeout=60,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        rows.append((int(parts[0]), int(parts[1]), parts[2].rstrip()))
+    rows.sort(key=lambda r: r[1], reverse=True)
+    return rows[:top]
+
+
+def profile_call(func: Callable[[], Any], path: str, top: int = 20) -> Any:
+    """
+    Выполняет func под cProfile и tracemalloc.
+    Пишет .pstats в path и печатает сводку: top функций по cumulative,
+    пиковую память и время импорта модулей CLI.
+    """
+    tracemalloc.start()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    try:
+        return profiler.runcall(func)
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profiler.dump_stats(path)
+
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(top)
+
+        print("\n" + "=" * 50, file=sys.stderr)
+        print(f"Профиль: {elapsed * 1000:.1f} мс, пик памяти {peak / 1024:.1f} КБ", file=sys.stderr)
+        print(f"Файл статистики: {path} (python -m pstats {path})", file=sys.stderr)
+        print(out.getvalue(), file=sys.stderr)
+
+        print("Импорт модулей (мкс, self / cumulative):", file=sys.stderr)
+        try:
+            for self_us, cum_us, name in import_times(top=top):
+                print(f"  {self_us:>8} {cum_us:>8} {name}", file=sys.stderr)
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"  не удалось замерить: {e}", file=sys.stderr)